@@ -0,0 +1,53 @@
+import os
+import sys
+import argparse
+import json
+
+def emit_result(manifest, result):
+    with open(manifest["result_path"], 'w') as f:
+        json.dump(result, f)
+
+def read_msg(entry):
+    msg = {**entry.get("inputs", {}), **entry.get("values", {})}.get("msg", "no msg")
+    if os.path.isfile(msg):
+        with open(msg, 'r') as f:
+            return f.read()
+    return msg
+
+def run_from_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+        mode = manifest.get("mode", "run")
+
+        if mode == "test":
+            emit_result(manifest, {"status": "success"})
+
+        elif mode == "run":
+            print(f"Processing task {manifest.get('task_id', 'unknown')}")
+            emit_result(manifest, {"response": f"Echo: {read_msg(manifest)} (batch of 1)"})
+
+        elif mode == "batch":
+            # Multi-task manifest: one result per task_id, or a per-task error
+            tasks = manifest.get("tasks", [])
+            results = {}
+            for entry in tasks:
+                print(f"Processing task {entry['task_id']}")
+                msg = read_msg(entry)
+                if msg == "bad":
+                    results[entry["task_id"]] = {"error": "Refusing bad input"}
+                else:
+                    results[entry["task_id"]] = {"response": f"Echo: {msg} (batch of {len(tasks)})"}
+            emit_result(manifest, {"status": "success", "results": results})
+
+    except Exception as e:
+        print(f"Error reading manifest: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", required=True, help="Path to input manifest JSON")
+
+    args = parser.parse_args()
+    run_from_manifest(args.manifest)
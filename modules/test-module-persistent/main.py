@@ -0,0 +1,64 @@
+import os
+import sys
+import argparse
+import json
+
+def emit_result(manifest, result):
+    with open(manifest["result_path"], 'w') as f:
+        json.dump(result, f)
+
+def handle_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+        mode = manifest.get("mode", "run")
+        inputs = {**manifest.get("inputs", {}), **manifest.get("values", {})}
+
+        if mode == "test":
+            emit_result(manifest, {"status": "success", "pid": os.getpid()})
+
+        elif mode == "run":
+            msg = inputs.get("msg", "no msg")
+            if os.path.isfile(msg):
+                with open(msg, 'r') as f:
+                    msg = f.read()
+            print(f"Processing task {manifest.get('task_id', 'unknown')}")
+            if msg == "crash":
+                # Dies mid-task, before the end marker
+                sys.stdout.flush()
+                os._exit(3)
+            # The pid tells the tests which warm process served the task
+            emit_result(manifest, {"response": f"Echo: {msg}", "pid": os.getpid()})
+        return 0
+
+    except Exception as e:
+        print(f"Error reading manifest: {e}")
+        return 1
+
+def serve():
+    # Persistent mode: one {"manifest": path} request per stdin line,
+    # each answered with an end marker carrying the task's exit code
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            exit_code = handle_manifest(json.loads(line)["manifest"])
+        except Exception as e:
+            print(f"Bad request: {e}")
+            exit_code = 1
+        print(f"__TASK_END__ {exit_code}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", help="Path to input manifest JSON")
+    parser.add_argument("--serve", action="store_true", help="Stay alive and read manifests from stdin")
+
+    args = parser.parse_args()
+    if args.serve:
+        serve()
+    elif args.manifest:
+        sys.exit(handle_manifest(args.manifest))
+    else:
+        parser.error("one of --manifest or --serve is required")
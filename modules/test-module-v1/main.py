@@ -2,6 +2,16 @@ import sys
 import argparse
 import json
 
+def emit_result(manifest, result):
+    # Result channel: write to manifest["result_path"] if the engine provided
+    # one, otherwise fall back to printing it (legacy contract)
+    result_path = manifest.get("result_path")
+    if result_path:
+        with open(result_path, 'w') as f:
+            json.dump(result, f)
+    else:
+        print(json.dumps(result))
+
 def run_from_manifest(manifest_path):
     try:
         with open(manifest_path, 'r') as f:
@@ -13,11 +23,11 @@ def run_from_manifest(manifest_path):
         if mode == "test":
             # Test logic
             if "msg" in inputs:
-                print(json.dumps({"status": "success", "echo": inputs["msg"]}))
+                emit_result(manifest, {"status": "success", "echo": inputs["msg"]})
             elif "test_key" in inputs:
-                 print(json.dumps({"status": "success", "echo": inputs["test_key"]}))
+                 emit_result(manifest, {"status": "success", "echo": inputs["test_key"]})
             else:
-                print(json.dumps({"status": "success", "message": "No input key found, but alive"}))
+                emit_result(manifest, {"status": "success", "message": "No input key found, but alive"})
                 
         elif mode == "run":
             # Task logic
@@ -26,7 +36,7 @@ def run_from_manifest(manifest_path):
                 "status": "success",
                 "response": f"Echo: {inputs.get('msg', 'no msg')}"
             }
-            print(json.dumps(result))
+            emit_result(manifest, result)
             
     except Exception as e:
         print(f"Error reading manifest: {e}")
@@ -2,6 +2,8 @@ from src.services.asset_service.manager import AssetManager
 from src.services.task_runner.task_orchestrator import TaskOrchestrator
 from src.services.task_runner.registry.orchestrator import RegistryOrchestrator
 from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.task_log_repository import TaskLogRepository
+from src.services.task_runner.memo_repository import MemoRepository
 from src.services.asset_service.repository import AssetRepository
 from src.shared.database.mongo import ModuleRegistryRepository
 
@@ -10,6 +12,8 @@ _asset_manager = AssetManager()
 _task_orchestrator = TaskOrchestrator()
 _registry_orchestrator = RegistryOrchestrator(modules_root="modules")
 _task_repo = TaskRepository()
+_task_log_repo = TaskLogRepository()
+_memo_repo = MemoRepository()
 _asset_repo = AssetRepository()
 _registry_repo = ModuleRegistryRepository()
 
@@ -25,6 +29,12 @@ def get_registry_orchestrator():
 def get_task_repo():
     return _task_repo
 
+def get_task_log_repo():
+    return _task_log_repo
+
+def get_memo_repo():
+    return _memo_repo
+
 def get_asset_repo():
     return _asset_repo
 
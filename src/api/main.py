@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from src.api.routers import modules, assets, tasks
+from src.api.routers import modules, assets, tasks, pipelines
 
 app = FastAPI(
     title="Atomic Task Runner API",
@@ -30,6 +30,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(modules.router)
 app.include_router(assets.router)
 app.include_router(tasks.router)
+app.include_router(pipelines.router)
 
 @app.get("/")
 def read_root():
@@ -1 +1 @@
-from . import modules, assets, tasks
+from . import modules, assets, tasks, pipelines
@@ -1,35 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse
 from typing import List, Optional
 import os
-from src.api.schemas import AssetResponse
+from src.api.schemas import AssetResponse, AssetFromHashRequest
+from src.api.streaming import RangeFileResponse
+from src.api.uploads import MultipartUpload, UploadError, UPLOAD_OPENAPI
 from src.api.dependencies import get_asset_manager, get_asset_repo
 
 router = APIRouter(prefix="/assets", tags=["Assets"])
 
-@router.post("/upload", response_model=AssetResponse)
-async def upload_asset(
-    file: UploadFile = File(...),
-    label: Optional[str] = Form(None),
-    asset_mgr=Depends(get_asset_manager)
-):
-    # Save temporary file to ingest
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
-    
+@router.post("/upload", response_model=AssetResponse, openapi_extra=UPLOAD_OPENAPI)
+async def upload_asset(request: Request, asset_mgr=Depends(get_asset_manager)):
+    """
+    Uploads a file (multipart form: "file", optional "label"). The body is
+    parsed as it arrives and the file written once, straight into the blob
+    store; nothing is spooled to a temp file first.
+    """
+    upload = MultipartUpload(asset_mgr.blobs)
+    try:
+        await upload.read(request)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    label = upload.fields.get("label") or upload.filename
+    asset_id = await anyio.to_thread.run_sync(
+        asset_mgr.ingest_written,
+        upload.writer,
+        upload.filename,
+        label,
+        upload.content_type or "application/octet-stream"
+    )
+    # Fetch the created asset
+    return await anyio.to_thread.run_sync(asset_mgr.repo.get_asset, asset_id)
+
+@router.post("/from-hash", response_model=AssetResponse)
+def create_asset_from_hash(req: AssetFromHashRequest, asset_mgr=Depends(get_asset_manager)):
+    """
+    Registers an asset for content the store already holds, without
+    uploading it again. 404 if no stored content has that hash.
+    """
     try:
-        asset_id = asset_mgr.create_upload_asset(
-            source_file_path=temp_path,
-            label=label or file.filename,
-            media_type=file.content_type
+        asset_id = asset_mgr.create_blob_asset(
+            req.content_hash,
+            filename=req.filename or req.label,
+            label=req.label,
+            media_type=req.media_type
         )
-        # Fetch the created asset
-        asset = asset_mgr.repo.get_asset(asset_id)
-        return asset
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return asset_mgr.repo.get_asset(asset_id)
 
 @router.get("/", response_model=List[AssetResponse])
 def list_assets(status: Optional[str] = None, tag: Optional[str] = None, repo=Depends(get_asset_repo)):
@@ -58,4 +78,47 @@ def download_asset(asset_id: str, repo=Depends(get_asset_repo)):
     if not path or not os.path.exists(path):
         raise HTTPException(status_code=404, detail="File missing on disk")
         
-    return FileResponse(path, media_type=asset["media_type"], filename=os.path.basename(path))
+    return FileResponse(path, media_type=asset["media_type"], filename=asset.get("filename") or os.path.basename(path))
+
+@router.get("/{asset_id}/value")
+def get_asset_value(asset_id: str, asset_mgr=Depends(get_asset_manager)):
+    """
+    Returns a VALUE asset's content as JSON. Large values live in the blob
+    store and are loaded only here; JSON ones are streamed from disk as is.
+    """
+    asset = asset_mgr.repo.get_asset(asset_id)
+    if not asset or asset["status"] != "AVAILABLE" or asset["type"] != "VALUE":
+        raise HTTPException(status_code=404, detail="Asset value not available")
+
+    if asset.get("blob") and asset.get("value_encoding") == "json":
+        path = asset.get("storage_path")
+        if not path or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Value missing on disk")
+        return FileResponse(path, media_type="application/json")
+    try:
+        return JSONResponse(asset_mgr.load_value(asset))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Value missing on disk")
+
+@router.api_route("/{asset_id}/stream", methods=["GET", "HEAD"])
+def stream_asset(asset_id: str, asset_mgr=Depends(get_asset_manager)):
+    """
+    Streams a FILE asset for media players: byte ranges, If-Range and
+    conditional requests, with the content hash as a strong ETag.
+    """
+    asset = asset_mgr.repo.get_asset(asset_id)
+    if not asset or asset["status"] != "AVAILABLE" or asset["type"] != "FILE":
+        raise HTTPException(status_code=404, detail="Asset file not available")
+
+    path = asset.get("storage_path")
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File missing on disk")
+
+    # Known for blobs and uploads; older records are hashed once and remember it
+    etag = asset_mgr.content_hash(asset)
+    return RangeFileResponse(
+        path,
+        etag=etag,
+        media_type=asset["media_type"],
+        filename=asset.get("filename") or os.path.basename(path)
+    )
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from src.api.schemas import ModuleResponse
-from src.api.dependencies import get_registry_repo, get_registry_orchestrator
+from src.api.dependencies import get_registry_repo, get_registry_orchestrator, get_memo_repo
 
 router = APIRouter(prefix="/modules", tags=["Modules"])
 
@@ -36,6 +36,13 @@ def get_module(module_id: str, repo=Depends(get_registry_repo)):
         "version_hash": m["version_hash"]
     }
 
+@router.get("/{module_id}/memo")
+def get_module_memo_stats(module_id: str, repo=Depends(get_registry_repo), memo_repo=Depends(get_memo_repo)):
+    if not repo.get_module(module_id):
+        raise HTTPException(status_code=404, detail="Module not found")
+    # Hit/miss counters and live entries of the module's result memo
+    return memo_repo.get_stats(module_id)
+
 @router.post("/scan")
 def scan_modules(orch=Depends(get_registry_orchestrator)):
     orch.discover_and_register()
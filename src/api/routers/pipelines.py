@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException
+from src.api.schemas import PipelineCreateRequest, PipelineResponse
+from src.api.dependencies import get_task_orchestrator
+
+router = APIRouter(prefix="/pipelines", tags=["Pipelines"])
+
+@router.post("/", response_model=PipelineResponse)
+def create_pipeline(req: PipelineCreateRequest, orch=Depends(get_task_orchestrator)):
+    """
+    Submits a whole task graph at once. Nodes refer to each other's outputs
+    as "@<node_key>.<output_key>"; the graph is validated before anything is stored.
+    """
+    try:
+        return orch.create_pipeline(
+            nodes=[node.model_dump() for node in req.nodes],
+            priority=req.priority,
+            tenant=req.tenant
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from src.api.schemas import TaskCreateRequest, TaskResponse
-from src.api.dependencies import get_task_orchestrator, get_task_repo
+from src.api.dependencies import get_task_orchestrator, get_task_repo, get_task_log_repo
+from src.services.task_runner.task_log_repository import TaskLogRepository
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Lines returned by GET /tasks/{id}/logs unless the caller asks otherwise
+DEFAULT_LOG_TAIL = 1000
+
 @router.post("/", response_model=TaskResponse)
 def create_task(req: TaskCreateRequest, orch=Depends(get_task_orchestrator)):
     try:
         result = orch.validate_and_create_task(
             module_id=req.module_id,
             input_map=req.input_mapping,
-            config=req.config
+            config=req.config,
+            priority=req.priority,
+            tenant=req.tenant
         )
         # Fetch the full task record
         task = orch.task_repo.get_task(result["task_id"])
@@ -28,13 +34,48 @@ def get_task(task_id: str, repo=Depends(get_task_repo)):
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
+@router.delete("/{task_id}", response_model=TaskResponse)
+def cancel_task(task_id: str, orch=Depends(get_task_orchestrator)):
+    """
+    Cancels a BLOCKED, QUEUED or RUNNING task. Its pending outputs (and the
+    tasks depending on them) fail; a running module is killed by its engine.
+    """
+    try:
+        task = orch.cancel_task(task_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
 @router.get("/{task_id}/logs")
-def get_task_logs(task_id: str, repo=Depends(get_task_repo)):
+def get_task_logs(
+    task_id: str,
+    tail: int = Query(DEFAULT_LOG_TAIL, ge=0, le=TaskLogRepository.MAX_PAGE_LINES),
+    after_seq: Optional[int] = Query(None, ge=-1),
+    repo=Depends(get_task_repo),
+    log_repo=Depends(get_task_log_repo)
+):
+    """
+    Returns the last `tail` lines of the task's output. The whole log is
+    read page by page instead: start with after_seq=-1 and pass back
+    `next_seq` while `has_more` is true.
+    """
     task = repo.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {
+    response = {
         "status": task["status"],
-        "error_log": task.get("error_log"),
-        "logs": task.get("logs", [])
+        "error_log": task.get("error_log")
     }
+    if after_seq is not None:
+        response.update(log_repo.get_logs_page(task_id, after_seq=after_seq))
+        response["logs"] = response.pop("lines")
+        return response
+
+    logs = []
+    if tail:
+        # Full output lives in the log store; older tasks only have the inline copy
+        logs = log_repo.get_logs(task_id, tail=tail) or task.get("logs", [])[-tail:]
+    response["logs"] = logs
+    return response
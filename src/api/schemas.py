@@ -38,28 +38,73 @@ class AssetResponse(BaseModel):
     created_at: Optional[datetime] = None
     tags: List[str] = []
     error: Optional[str] = None
+    # sha256 of the content, once known (uploads: computed while ingesting)
+    content_hash: Optional[str] = None
+    size_bytes: Optional[int] = None
 
     class Config:
         populate_by_name = True
 
+class AssetFromHashRequest(BaseModel):
+    # sha256 of content already in the store (e.g. from an earlier upload)
+    content_hash: str
+    label: str
+    media_type: str
+    filename: Optional[str] = None
+
 # --- Task Schemas ---
 
+TaskStatus = Literal["CREATED", "BLOCKED", "QUEUED", "RUNNING", "COMPLETED", "FAILED", "CANCELLED"]
+
 class TaskCreateRequest(BaseModel):
     module_id: str
     input_mapping: Dict[str, str]
     config: Optional[Dict[str, Any]] = {}
+    # Higher runs first; tasks of equal priority share the engine fairly per tenant
+    priority: int = 0
+    tenant: Optional[str] = None
 
 class TaskResponse(BaseModel):
     id: str = Field(alias="_id")
     module_id: str
-    status: Literal["CREATED", "BLOCKED", "QUEUED", "RUNNING", "COMPLETED", "FAILED"]
+    status: TaskStatus
     input_map: Dict[str, str]
     output_map: Dict[str, str]
     config: Dict[str, Any]
+    priority: int = 0
+    tenant: Optional[str] = None
     created_at: datetime
     started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
     error_log: Optional[str] = None
+    # True if the task was completed from a memoized earlier run
+    memo_hit: bool = False
 
     class Config:
         populate_by_name = True
+
+# --- Pipeline Schemas ---
+
+class PipelineNode(BaseModel):
+    # Symbolic name other nodes use to refer to this node's outputs
+    key: str
+    module_id: str
+    # Values are asset ids, or "@<node_key>.<output_key>" for another node's output
+    input_mapping: Dict[str, str]
+    config: Optional[Dict[str, Any]] = {}
+
+class PipelineCreateRequest(BaseModel):
+    nodes: List[PipelineNode]
+    priority: int = 0
+    tenant: Optional[str] = None
+
+class PipelineTaskResponse(BaseModel):
+    task_id: str
+    # Usually BLOCKED or QUEUED; an input settled while the graph was stored
+    # can already have failed the task, or an engine claimed it
+    status: TaskStatus
+    outputs: Dict[str, str]
+
+class PipelineResponse(BaseModel):
+    pipeline_id: str
+    tasks: Dict[str, PipelineTaskResponse]
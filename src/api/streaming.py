@@ -0,0 +1,196 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+_RANGE_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+class RangeFileResponse(Response):
+    """
+    Serves a file with HTTP range and conditional request support, for
+    scrubbing through large media without re-downloading it:
+
+    - Range (single byte range) -> 206, unsatisfiable -> 416; multi-range
+      and malformed headers are ignored (whole file, as RFC 9110 allows)
+    - If-Range, If-None-Match and If-Modified-Since against the strong ETag
+      (the content hash) and Last-Modified -> 304 / full response
+    - the body goes out through the server's zero-copy sendfile extension
+      ("http.response.zerocopysend") when it offers one, else in bounded
+      chunks read off the event loop; the file is never loaded whole
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        etag: str,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None
+    ):
+        self.path = path
+        self.status_code = 200
+        self.media_type = media_type or "application/octet-stream"
+        self.background = None
+        self.stat_result = stat_result or os.stat(path)
+        self.etag = f'"{etag}"'
+        self.last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+        self.init_headers({
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": self.last_modified
+        })
+        if filename:
+            self.headers["content-disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        request_headers = Headers(scope=scope)
+        head_only = scope["method"].upper() == "HEAD"
+        size = self.stat_result.st_size
+
+        if self._not_modified(request_headers):
+            await self._start(send, 304, {})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = 0, size - 1
+        status = 200
+        requested = request_headers.get("range")
+        if requested and self._if_range_matches(request_headers.get("if-range")):
+            byte_range = self._parse_range(requested, size)
+            if byte_range == "unsatisfiable":
+                await self._start(send, 416, {"content-range": f"bytes */{size}", "content-length": "0"})
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            if byte_range:
+                start, end = byte_range
+                status = 206
+
+        length = max(end - start + 1, 0)
+        extra = {"content-length": str(length)}
+        if status == 206:
+            extra["content-range"] = f"bytes {start}-{end}/{size}"
+        await self._start(send, status, extra)
+
+        if head_only or length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": start,
+                    "count": length,
+                    "more_body": False
+                })
+            return
+
+        await self._send_chunks(receive, send, start, length)
+
+    async def _send_chunks(self, receive: Receive, send: Send, start: int, length: int):
+        async def stream(cancel_scope: anyio.CancelScope):
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                offset = start
+                remaining = length
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, remaining), offset)
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    # File shrank underneath us; end the body rather than hang
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+            finally:
+                os.close(fd)
+            cancel_scope.cancel()
+
+        async def watch_disconnect(cancel_scope: anyio.CancelScope):
+            # A viewer that seeks away drops the connection: stop reading the file
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    cancel_scope.cancel()
+                    return
+
+        async with anyio.create_task_group() as group:
+            group.start_soon(stream, group.cancel_scope)
+            group.start_soon(watch_disconnect, group.cancel_scope)
+
+    async def _start(self, send: Send, status: int, extra: dict):
+        headers = dict(self.headers)
+        headers.pop("content-length", None)
+        headers.update(extra)
+        if status in (200, 206):
+            headers["content-type"] = self.media_type
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        })
+
+    def _not_modified(self, headers: Headers) -> bool:
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            since = _parse_http_date(if_modified_since)
+            return since is not None and int(self.stat_result.st_mtime) <= since
+        return False
+
+    def _if_range_matches(self, if_range: Optional[str]) -> bool:
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            # Strong comparison only: a weak tag never validates a range
+            return if_range == self.etag
+        since = _parse_http_date(if_range)
+        return since is not None and int(self.stat_result.st_mtime) <= since
+
+    @staticmethod
+    def _parse_range(header: str, size: int):
+        """
+        Returns (start, end) for one satisfiable byte range, "unsatisfiable",
+        or None when the header should be ignored.
+        """
+        unit, _, spec = header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in spec:
+            return None
+        match = _RANGE_RE.match(spec)
+        if not match or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0 or size == 0:
+                return "unsatisfiable"
+            return max(size - suffix, 0), size - 1
+
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            return "unsatisfiable"
+        end = int(last) if last else size - 1
+        return start, min(end, size - 1)
+
+def _parse_http_date(value: str) -> Optional[int]:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
@@ -0,0 +1,158 @@
+from typing import Dict, Optional
+
+import anyio
+from python_multipart.multipart import MultipartParser, MultipartParseError, parse_options_header
+from starlette.requests import Request
+
+from src.services.asset_service.blob_store import BlobStore, BlobWriter
+
+# Request body documented for endpoints that parse it with MultipartUpload
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "label": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+class UploadError(ValueError):
+    """The request body is not a usable upload; `status_code` says why."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class MultipartUpload:
+    """
+    Parses a multipart/form-data request body as it arrives, writing the
+    file part straight into a BlobStore writer.
+
+    Starlette's request.form() spools every file part first (to a temp
+    file past 1 MB), so the upload would hit the disk twice; here the body
+    goes through once: request stream -> parser -> the store's .part file.
+    Parsing and writing run off the event loop, one CHUNK_SIZE at a time.
+    Other fields are kept as (small) strings.
+    """
+    MAX_FIELD_BYTES = 64 * 1024
+
+    def __init__(self, blobs: BlobStore, file_field: str = "file"):
+        self.blobs = blobs
+        self.file_field = file_field
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.writer: Optional[BlobWriter] = None
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._part_name: Optional[str] = None
+        self._part_data = bytearray()
+        self._in_file = False
+        self._complete = False
+
+    async def read(self, request: Request):
+        """
+        Consumes the request body. Afterwards `writer` holds the file (commit
+        it, e.g. via AssetManager.ingest_written) and `fields` the rest.
+        Raises UploadError; nothing is left in the store if it does.
+        """
+        content_type, options = parse_options_header(request.headers.get("content-type"))
+        if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+            raise UploadError("Expected a multipart/form-data body.", status_code=415)
+
+        parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end
+        })
+        pending = bytearray()
+        try:
+            async for chunk in request.stream():
+                pending += chunk
+                if len(pending) >= self.blobs.CHUNK_SIZE:
+                    await anyio.to_thread.run_sync(parser.write, bytes(pending))
+                    pending.clear()
+            if pending:
+                await anyio.to_thread.run_sync(parser.write, bytes(pending))
+            parser.finalize()
+        except MultipartParseError as e:
+            self.abort()
+            raise UploadError(f"Malformed multipart body: {e}")
+        except BaseException:
+            self.abort()
+            raise
+
+        if not self._complete:
+            # Truncated (client gave up mid-upload): don't store half a file
+            self.abort()
+            raise UploadError("Incomplete multipart body.")
+        if self.writer is None:
+            raise UploadError(f"Missing file field '{self.file_field}'.", status_code=422)
+
+    def abort(self):
+        """Drops a partly written file."""
+        if self.writer:
+            self.writer.abort()
+            self.writer = None
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part_name = None
+        self._part_data = bytearray()
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        if b"name" not in options:
+            raise UploadError('Every part needs a Content-Disposition "name".')
+        self._part_name = options[b"name"].decode("utf-8", "replace")
+
+        if self._part_name == self.file_field and b"filename" in options:
+            if self.writer is not None:
+                raise UploadError("Only one file per upload.")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            content_type = self._headers.get(b"content-type")
+            self.content_type = content_type.decode("latin-1") if content_type else None
+            self.writer = self.blobs.open_writer()
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.writer.write(data[start:end])
+            return
+        if len(self._part_data) + end - start > self.MAX_FIELD_BYTES:
+            raise UploadError(f"Field '{self._part_name}' is larger than {self.MAX_FIELD_BYTES} bytes.")
+        self._part_data += data[start:end]
+
+    def _on_part_end(self):
+        if not self._in_file:
+            self.fields[self._part_name] = self._part_data.decode("utf-8", "replace")
+
+    def _on_end(self):
+        self._complete = True
@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from pymongo import ReturnDocument
+from src.shared.database.mongo import MongoDBConnection
+
+class BlobRepository:
+    """
+    Reference counts of the content-addressed blobs (see BlobStore).
+    One document per distinct content: {_id: sha256, size_bytes, refcount}.
+    """
+    COLLECTION_NAME = "blobs"
+
+    def __init__(self):
+        self.conn = MongoDBConnection()
+        try:
+            self.conn.db
+        except ConnectionError:
+            self.conn.connect()
+        self.collection = self.conn.db[self.COLLECTION_NAME]
+
+    def get_blob(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"_id": digest})
+
+    def incref(self, digest: str, size_bytes: Optional[int] = None) -> int:
+        """
+        Adds a reference, creating the record for new content.
+        Returns the refcount after the increment (1 means the content was
+        unreferenced, so its file may have to be put in place).
+        """
+        now = datetime.utcnow()
+        update: Dict[str, Any] = {
+            "$inc": {"refcount": 1},
+            "$set": {"last_referenced_at": now},
+            "$setOnInsert": {"created_at": now}
+        }
+        if size_bytes is not None:
+            update["$set"]["size_bytes"] = size_bytes
+        blob = self.collection.find_one_and_update(
+            {"_id": digest}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return blob["refcount"]
+
+    def incref_many(self, digests: List[str]) -> List[str]:
+        """
+        References already-stored blobs once per occurrence in `digests`.
+        Returns the digests referenced (with their repeats); unknown ones are left out.
+        """
+        counts: Dict[str, int] = {}
+        for digest in digests:
+            counts[digest] = counts.get(digest, 0) + 1
+        referenced = []
+        for digest, count in counts.items():
+            result = self.collection.update_one(
+                {"_id": digest},
+                {"$inc": {"refcount": count}, "$set": {"last_referenced_at": datetime.utcnow()}}
+            )
+            if result.matched_count:
+                referenced.extend([digest] * count)
+        return referenced
+
+    def decref(self, digest: str) -> Optional[int]:
+        """Drops a reference. Returns the refcount left, or None for unknown content."""
+        blob = self.collection.find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refcount": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        return blob["refcount"] if blob else None
+
+    def delete_if_unreferenced(self, digest: str) -> bool:
+        """Removes the record only if nothing re-referenced it meanwhile."""
+        return self.collection.delete_one({"_id": digest, "refcount": {"$lte": 0}}).deleted_count == 1
+
+    def find_unreferenced(self, limit: int = 100) -> List[str]:
+        return [b["_id"] for b in self.collection.find({"refcount": {"$lte": 0}}, {"_id": 1}, limit=limit)]
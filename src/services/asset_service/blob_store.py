@@ -0,0 +1,172 @@
+import os
+import stat
+import uuid
+import hashlib
+from pathlib import Path
+from typing import Tuple, BinaryIO, List
+
+from src.services.asset_service.blob_repository import BlobRepository
+
+class BlobStore:
+    """
+    Content-addressed file storage.
+
+    Every distinct content is stored once, under its sha256 in sharded
+    fan-out directories (blobs/ab/cd/abcd...), read-only, and shared by all
+    the assets that hold it. Assets reference a blob by digest; the blob's
+    file is removed when the last reference is released.
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: Path):
+        self.root = Path(root).absolute()
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.repo = BlobRepository()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        blob = self.repo.get_blob(digest)
+        return bool(blob and blob["refcount"] > 0 and self.path_for(digest).exists())
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        """
+        Stores a stream's content (hashing it on the way) and takes one
+        reference to it. Returns (digest, size). Known content is not kept twice.
+        """
+        writer = self.open_writer()
+        try:
+            for chunk in iter(lambda: stream.read(self.CHUNK_SIZE), b""):
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def open_writer(self) -> "BlobWriter":
+        """
+        For content that arrives in pushed chunks (e.g. a request body being
+        parsed): write() each chunk, then commit() like put_stream, or abort().
+        """
+        return BlobWriter(self)
+
+    def put_file(self, source: Path) -> Tuple[str, int]:
+        """
+        Takes over a file produced on this host (e.g. a module output): it is
+        moved into the store, or dropped if the content is already stored.
+        Returns (digest, size).
+        """
+        source = Path(source)
+        hasher = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        size = source.stat().st_size
+
+        # Same filesystem: a rename. Otherwise copy once into tmp first.
+        tmp_path = self._tmp_path()
+        try:
+            try:
+                os.replace(source, tmp_path)
+            except OSError:
+                with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+                    for chunk in iter(lambda: src.read(self.CHUNK_SIZE), b""):
+                        dst.write(chunk)
+                source.unlink()
+            self._commit(tmp_path, digest, size)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return digest, size
+
+    def acquire(self, digests: List[str]) -> List[str]:
+        """
+        Adds a reference per digest to already-stored blobs (no I/O on the
+        content). Returns the digests referenced; a collected blob is missing.
+        """
+        return self.repo.incref_many(digests)
+
+    def release(self, digest: str):
+        """Drops a reference; the last one removes the blob."""
+        remaining = self.repo.decref(digest)
+        if remaining is not None and remaining <= 0:
+            self._collect(digest)
+
+    def collect_garbage(self, limit: int = 100) -> int:
+        """Removes unreferenced blobs left behind (e.g. by a crash mid-release)."""
+        return sum(1 for digest in self.repo.find_unreferenced(limit=limit) if self._collect(digest))
+
+    def _commit(self, tmp_path: Path, digest: str, size: int):
+        # The reference is taken first: a concurrent release can't collect
+        # the blob between our existence check and our use of it
+        refcount = self.repo.incref(digest, size_bytes=size)
+        path = self.path_for(digest)
+        if refcount == 1 or not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Shared between assets (and handed to modules): never written again
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp_path, path)
+
+    def _collect(self, digest: str) -> bool:
+        """
+        Deletes an unreferenced blob. The file is first renamed aside, so a
+        put racing with us either finds the record still there (and we put
+        the file back) or re-creates both.
+        """
+        path = self.path_for(digest)
+        trash = self._tmp_path()
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            trash = None
+
+        if self.repo.delete_if_unreferenced(digest):
+            if trash:
+                trash.unlink(missing_ok=True)
+            return True
+
+        # Re-referenced meanwhile: restore unless a put already did
+        if trash:
+            if path.exists():
+                trash.unlink(missing_ok=True)
+            else:
+                os.replace(trash, path)
+        return False
+
+    def _tmp_path(self) -> Path:
+        return self.tmp_dir / f"{uuid.uuid4().hex}.part"
+
+
+class BlobWriter:
+    """
+    Content being written into a BlobStore's tmp dir, hashed and measured
+    on the way. commit() stores it and takes one reference, like put_stream.
+    """
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self.tmp_path = store._tmp_path()
+        self._file = open(self.tmp_path, "wb")
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> Tuple[str, int]:
+        """Returns (digest, size)."""
+        try:
+            self._file.close()
+            digest = self._hasher.hexdigest()
+            self.store._commit(self.tmp_path, digest, self.size)
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+        return digest, self.size
+
+    def abort(self):
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
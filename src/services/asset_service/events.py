@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+
+# Asset lifecycle event types
+AVAILABLE = "AVAILABLE"
+FAILED = "FAILED"
+DELETED = "DELETED"
+EVENT_TYPES = (AVAILABLE, FAILED, DELETED)
+
+class AssetEventMetrics:
+    """
+    Default subscriber: counts delivered events per type and tracks how far
+    delivery lags behind publishing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.batches = 0
+        self.max_lag_ms = 0.0
+
+    def __call__(self, events: List[Dict[str, Any]]):
+        now = time.monotonic()
+        with self._lock:
+            self.batches += 1
+            for event in events:
+                self.counts[event["type"]] += 1
+                self.max_lag_ms = max(self.max_lag_ms, (now - event["published"]) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"events": dict(self.counts), "batches": self.batches, "max_lag_ms": round(self.max_lag_ms, 2)}
+
+class AssetEventBus:
+    """
+    In-process channel for asset lifecycle events (AVAILABLE / FAILED / DELETED).
+
+    Producers (the AssetManager) publish and return immediately; a single
+    delivery thread hands subscribers the events in batches, so dependency
+    resolution (unblocking, failure cascades) runs off the worker's critical
+    path and one bulk update can cover many assets.
+
+    Events live in memory only: subscribers must be idempotent, and events
+    published by a process that dies before delivery (or that has no
+    dependency subscriber) are lost. The bus is a latency optimisation; the
+    engine's TaskOrchestrator.reconcile_blocked sweep is what guarantees
+    that BLOCKED tasks are eventually resolved.
+    """
+    _instance = None
+    MAX_BATCH = 500
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super(AssetEventBus, cls).__new__(cls)
+            instance._queue = queue.Queue()
+            instance._subscribers = {}
+            instance._lock = threading.Lock()
+            instance._idle = threading.Condition()
+            instance._in_flight = 0
+            instance._thread = None
+            instance.metrics = AssetEventMetrics()
+            instance._subscribers["metrics"] = (instance.metrics, set(EVENT_TYPES))
+            cls._instance = instance
+        return cls._instance
+
+    def subscribe(
+        self,
+        name: str,
+        handler: Callable[[List[Dict[str, Any]]], None],
+        event_types: Optional[Iterable[str]] = None,
+        replace: bool = True
+    ) -> bool:
+        """
+        Registers `handler(events)` for `event_types` (default: all).
+        Subscribing again under the same name replaces the handler, unless
+        `replace` is False: then the first one stays, for process-wide
+        subscribers that several instances may try to register.
+        Returns whether `handler` was registered.
+        """
+        with self._lock:
+            if not replace and name in self._subscribers:
+                return False
+            self._subscribers[name] = (handler, set(event_types or EVENT_TYPES))
+            return True
+
+    def unsubscribe(self, name: str):
+        with self._lock:
+            self._subscribers.pop(name, None)
+
+    def publish(self, event_type: str, asset_id: str, reason: Optional[str] = None):
+        self.publish_many([(event_type, asset_id, reason)])
+
+    def publish_many(self, events: List[Tuple[str, str, Optional[str]]]):
+        """
+        Publishes (event_type, asset_id, reason) triples together; they are
+        delivered in the same batch, e.g. all outputs of one task.
+        """
+        if not events:
+            return
+        for event_type, _, _ in events:
+            if event_type not in EVENT_TYPES:
+                raise ValueError(f"Unknown asset event type: {event_type}")
+        now = datetime.utcnow()
+        published = time.monotonic()
+        with self._idle:
+            self._in_flight += len(events)
+        self._queue.put([
+            {"type": event_type, "asset_id": asset_id, "reason": reason, "at": now, "published": published}
+            for event_type, asset_id, reason in events
+        ])
+        self._ensure_thread()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every published event has been delivered.
+        Returns False if `timeout` elapsed first.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._deliver_loop, name="asset-event-bus", daemon=True)
+            self._thread.start()
+
+    def _deliver_loop(self):
+        while True:
+            batch = self._queue.get()
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                subscribers = list(self._subscribers.items())
+            for name, (handler, event_types) in subscribers:
+                events = [e for e in batch if e["type"] in event_types]
+                if not events:
+                    continue
+                try:
+                    handler(events)
+                except Exception as e:
+                    # One failing subscriber must not starve the others
+                    print(f"[AssetEvents] Subscriber {name} failed on {len(events)} event(s): {e}")
+
+            with self._idle:
+                self._in_flight -= len(batch)
+                if self._in_flight == 0:
+                    self._idle.notify_all()
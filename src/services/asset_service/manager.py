@@ -1,26 +1,41 @@
-import os
-import shutil
+import io
+import json
+import hashlib
 import uuid
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Iterable
 
 from src.services.asset_service.repository import AssetRepository
+from src.services.asset_service.blob_store import BlobStore, BlobWriter
+from src.services.asset_service.materializer import ValueMaterializer
+from src.services.asset_service.events import AssetEventBus, AVAILABLE, FAILED, DELETED
 
 class AssetManager:
     """
     Manages the lifecycle of Assets (Files and Values).
+    FILE content lives in a content-addressed BlobStore: identical uploads
+    and outputs are stored once and shared by reference ("blob" on the record).
+    VALUE inputs handed to modules are materialized once per content version
+    and shared by the tasks reading them (see ValueMaterializer).
+
+    VALUEs are stored in the asset document up to `value_spill_bytes` of
+    serialized content. Larger ones (segment lists, embeddings...) are
+    spilled to the blob store: the record keeps only a reference and the
+    value is read back on demand (load_value), so documents stay small and
+    clear of the BSON limit.
     """
+    # VALUE inputs a module accepts inline are put in the manifest up to this size
+    INLINE_MAX_BYTES = 16 * 1024
+    # VALUEs larger than this (serialized) go to the blob store
+    VALUE_SPILL_BYTES = 64 * 1024
 
-    def __init__(self, storage_root: str = "storage"):
+    def __init__(self, storage_root: str = "storage", value_spill_bytes: Optional[int] = None):
         self.repo = AssetRepository()
+        self.events = AssetEventBus()
         self.storage_root = Path(storage_root).absolute()
-        self.uploads_dir = self.storage_root / "uploads"
-        self.generated_dir = self.storage_root / "generated"
-        
-        # Ensure directories exist
-        self.uploads_dir.mkdir(parents=True, exist_ok=True)
-        self.generated_dir.mkdir(parents=True, exist_ok=True)
+        self.value_spill_bytes = self.VALUE_SPILL_BYTES if value_spill_bytes is None else value_spill_bytes
+        self.blobs = BlobStore(self.storage_root / "blobs")
+        self.materializer = ValueMaterializer(self.storage_root / "values")
 
     def create_upload_asset(self, source_file_path: str, label: str, media_type: str) -> str:
         """
@@ -30,34 +45,77 @@ class AssetManager:
         if not source_path.exists():
             raise FileNotFoundError(f"Source file {source_file_path} does not exist.")
 
-        # Create a unique storage path: uploads/YYYY-MM-DD/{asset_id}_{filename}
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        dest_dir = self.uploads_dir / date_str
-        dest_dir.mkdir(parents=True, exist_ok=True)
+        with open(source_path, "rb") as source:
+            return self.ingest_stream(source, source_path.name, label, media_type)
 
-        asset_id = str(uuid.uuid4())
-        dest_path = dest_dir / f"{asset_id}_{source_path.name}"
-        
-        # Copy file to storage
-        shutil.copy2(source_path, dest_path)
+    def ingest_stream(self, stream: BinaryIO, filename: str, label: str, media_type: str) -> str:
+        """
+        Streams an upload into the blob store in chunks, hashing and
+        measuring it on the way, and registers it as AVAILABLE.
+        Memory use is one chunk whatever the file size; the content is written
+        once, and not kept at all if the same bytes are already stored.
+        """
+        digest, size = self.blobs.put_stream(stream)
+        return self._register_blob(digest, size, filename, label, media_type)
 
-        asset_data = {
-            "_id": asset_id,
+    def ingest_written(self, writer: BlobWriter, filename: str, label: str, media_type: str) -> str:
+        """
+        Like ingest_stream, for an upload already written chunk by chunk into
+        a BlobStore.open_writer() (the API parses request bodies that way).
+        """
+        digest, size = writer.commit()
+        return self._register_blob(digest, size, filename, label, media_type)
+
+    def _register_blob(self, digest: str, size: int, filename: str, label: str, media_type: str) -> str:
+        # Holds the reference the store just took; given back if the record can't be written
+        try:
+            return self.repo.create_asset(self._blob_record(digest, size, filename, label, media_type))
+        except Exception:
+            self.blobs.release(digest)
+            raise
+
+    def create_blob_asset(self, content_hash: str, filename: str, label: str, media_type: str) -> str:
+        """
+        Registers a new asset for content that is already stored, without
+        transferring it again. Raises ValueError for unknown content.
+        """
+        if not self.blobs.exists(content_hash) or not self.blobs.acquire([content_hash]):
+            raise ValueError(f"No stored content with hash {content_hash}.")
+        size = self.blobs.repo.get_blob(content_hash).get("size_bytes")
+        try:
+            return self.repo.create_asset(self._blob_record(content_hash, size, filename, label, media_type))
+        except Exception:
+            self.blobs.release(content_hash)
+            raise
+
+    def _blob_record(self, digest: str, size: Optional[int], filename: str, label: str, media_type: str) -> Dict[str, Any]:
+        return {
             "label": label,
             "status": "AVAILABLE",
             "type": "FILE",
             "media_type": media_type,
-            "storage_path": str(dest_path),
+            "storage_path": str(self.blobs.path_for(digest)),
+            "blob": digest,
+            "content_hash": digest,
+            "size_bytes": size,
+            # Client-supplied names are kept for downloads only, never used as paths
+            "filename": Path(filename or "upload").name,
             "tags": ["upload"]
         }
-        
-        return self.repo.create_asset(asset_data)
 
     def create_pending_asset(self, task_id: str, label: str, media_type: str) -> str:
         """
         Creates a PENDING asset promised by a specific task.
         """
-        asset_data = {
+        return self.repo.create_asset(self.pending_asset_record(task_id, label, media_type))
+
+    def pending_asset_record(self, task_id: str, label: str, media_type: str) -> Dict[str, Any]:
+        """
+        Builds (without inserting) the record of a PENDING task output,
+        for callers that insert many at once.
+        """
+        return {
+            "_id": str(uuid.uuid4()),
             "label": label,
             "status": "PENDING",
             "type": "FILE",
@@ -66,41 +124,141 @@ class AssetManager:
             "storage_path": None,
             "tags": ["task-output"]
         }
-        return self.repo.create_asset(asset_data)
 
     def fulfill_asset(self, asset_id: str, value: Any = None, is_path: bool = True) -> bool:
         """
         Fulfills a PENDING asset.
         - If is_path=True, 'value' is assumed to be a file path to move.
-        - If is_path=False, 'value' is stored raw in value_content.
+        - If is_path=False, 'value' is stored raw in value_content (or spilled
+          to the blob store when large).
         """
         asset = self.repo.get_asset(asset_id)
         if not asset:
             return False
-        
+
+        updates = self._fulfillment(value, is_path)
+        self.repo.update_asset(asset_id, updates)
+        self.events.publish(AVAILABLE, asset_id)
+        return True
+
+    def settle_task_outputs(
+        self,
+        task_id: str,
+        values: Dict[str, Tuple[Any, bool]],
+        errors: Dict[str, str],
+        publish: bool = True
+    ) -> Dict[str, str]:
+        """
+        Fulfills and fails the outputs of a finished task with a single bulk
+        write, then publishes their events together.
+        `values` maps asset_id -> (value, is_path) like fulfill_asset; an output
+        that can't be fulfilled is failed instead. `errors` maps asset_id ->
+        error for outputs to fail. Returns every failed asset_id with its error.
+        With publish=False the caller publishes later via publish_outcomes().
+        """
+        errors = dict(errors)
+        updates = {}
+        for asset_id, (value, is_path) in values.items():
+            try:
+                updates[asset_id] = self._fulfillment(value, is_path)
+            except Exception as e:
+                errors[asset_id] = f"Fulfillment failed: {e}"
+        for asset_id, error in errors.items():
+            updates[asset_id] = {"status": "FAILED", "error": error}
+
+        # Stamp this write: a re-run can produce the very same blob, so only
+        # the stamp tells which outputs we actually settled
+        settle_id = uuid.uuid4().hex
+        for fields in updates.values():
+            fields["settle_id"] = settle_id
+
+        # Outputs already failed by a cancellation stay failed
+        matched = self.repo.update_assets(updates, match={"status": "PENDING"})
+        if matched < len(updates):
+            # Give back the blob references of outputs we didn't get to write
+            stored = self.repo.get_assets(list(updates), fields=["settle_id"])
+            for asset_id, fields in updates.items():
+                if fields.get("blob") and stored.get(asset_id, {}).get("settle_id") != settle_id:
+                    self.blobs.release(fields["blob"])
+        if publish:
+            self.publish_outcomes(list(updates), errors)
+        return errors
+
+    def publish_outcomes(self, asset_ids: List[str], errors: Dict[str, str]):
+        """Publishes FAILED for the ids in `errors` and AVAILABLE for the rest, as one batch."""
+        self.events.publish_many([
+            (FAILED, asset_id, errors[asset_id]) if asset_id in errors else (AVAILABLE, asset_id, None)
+            for asset_id in asset_ids
+        ])
+
+    def publish_current(self, asset_ids: List[str]):
+        """
+        Publishes events matching the assets' stored state (PENDING ones are
+        skipped), for callers that lost track of what their writes did.
+        """
+        assets = self.repo.get_assets(asset_ids, fields=["status", "error"])
+        settled = [a for a in asset_ids if assets.get(a, {}).get("status") in (AVAILABLE, FAILED)]
+        errors = {a: assets[a].get("error") for a in settled if assets[a]["status"] == FAILED}
+        self.publish_outcomes(settled, errors)
+
+    def _fulfillment(self, value: Any, is_path: bool) -> Dict[str, Any]:
+        """Moves an output file into the blob store if needed; returns the asset's $set."""
         updates = {"status": "AVAILABLE"}
 
         if is_path and value:
-            task_id = asset.get("created_by_task", "unknown")
-            dest_dir = self.generated_dir / task_id
-            dest_dir.mkdir(parents=True, exist_ok=True)
-
             source_path = Path(value)
             if not source_path.exists():
                 raise FileNotFoundError(f"Output file {value} not found.")
-                
-            dest_path = dest_dir / source_path.name
 
-            # Atomically move file
-            shutil.move(str(source_path), str(dest_path))
-            updates["storage_path"] = str(dest_path)
+            # Identical outputs (e.g. re-runs) end up sharing one blob
+            digest, size = self.blobs.put_file(source_path)
+            updates["storage_path"] = str(self.blobs.path_for(digest))
+            updates["blob"] = digest
+            updates["content_hash"] = digest
+            updates["size_bytes"] = size
+            updates["filename"] = source_path.name
             updates["type"] = "FILE"
         else:
-            updates["value_content"] = value
-            updates["type"] = "VALUE"
+            updates.update(self._value_fields(value))
+        return updates
 
-        self.repo.update_asset(asset_id, updates)
-        return True
+    def _value_fields(self, value: Any) -> Dict[str, Any]:
+        """
+        The record fields storing a VALUE: the value itself, or past
+        value_spill_bytes a blob holding it. The blob holds exactly what a
+        module reads (JSON for dicts and lists, text otherwise), so
+        resolve_to_path hands it out as is.
+        """
+        fields = {"type": "VALUE", "value_content": value}
+        if value is None or isinstance(value, (bool, int, float)):
+            return fields
+        try:
+            data = ValueMaterializer.serialize(value).encode()
+        except (TypeError, ValueError):
+            # Not JSON: kept in the document as before
+            return fields
+        if len(data) <= self.value_spill_bytes:
+            return fields
+
+        digest, size = self.blobs.put_stream(io.BytesIO(data))
+        return {
+            "type": "VALUE",
+            "value_content": None,
+            "value_encoding": "json" if isinstance(value, (dict, list)) else "text",
+            "storage_path": str(self.blobs.path_for(digest)),
+            "blob": digest,
+            "content_hash": digest,
+            "size_bytes": size
+        }
+
+    def load_value(self, asset: Dict[str, Any]) -> Any:
+        """Returns a VALUE asset's content, reading it from the blob store if it was spilled."""
+        if not asset.get("blob"):
+            return asset.get("value_content")
+        with open(asset["storage_path"], "r") as f:
+            if asset.get("value_encoding") == "json":
+                return json.load(f)
+            return f.read()
 
     def fail_asset(self, asset_id: str, error_msg: str):
         """
@@ -110,49 +268,155 @@ class AssetManager:
             "status": "FAILED",
             "error": error_msg
         })
+        self.events.publish(FAILED, asset_id, reason=error_msg)
+
+    def fail_pending_assets(self, asset_ids: List[str], error: str) -> List[str]:
+        """
+        Fails the assets among `asset_ids` that are still PENDING (outputs of
+        a cancelled task) and publishes their events. Returns their ids.
+        """
+        assets = self.repo.get_assets(asset_ids, fields=["status"])
+        pending = [asset_id for asset_id, asset in assets.items() if asset["status"] == "PENDING"]
+        if pending:
+            self.repo.fail_pending_assets(pending, error)
+            self.publish_outcomes(pending, {asset_id: error for asset_id in pending})
+        return pending
+
+    def delete_asset(self, asset_id: str):
+        """
+        Removes an asset record (and its reference to the stored content).
+        Tasks still waiting on it are failed by the dependency subscriber.
+        """
+        asset = self.repo.get_asset(asset_id)
+        self.repo.delete_asset(asset_id)
+        if asset and asset.get("blob"):
+            self.blobs.release(asset["blob"])
+        self.events.publish(DELETED, asset_id, reason=f"Asset {asset_id} was deleted")
 
     def create_value_asset(self, label: str, value: Any, media_type: str = "application/json") -> str:
         """
-        Creates a VALUE type asset (stored in DB).
+        Creates a VALUE type asset (stored in DB, or in the blob store if large).
         """
         asset_data = {
             "label": label,
             "status": "AVAILABLE",
-            "type": "VALUE",
             "media_type": media_type,
-            "value_content": value,
-            "storage_path": None
+            "storage_path": None,
+            **self._value_fields(value)
         }
-        return self.repo.create_asset(asset_data)
+        try:
+            return self.repo.create_asset(asset_data)
+        except Exception:
+            if asset_data.get("blob"):
+                self.blobs.release(asset_data["blob"])
+            raise
+
+    def content_hash(self, asset: Dict[str, Any]) -> str:
+        """
+        sha256 of an AVAILABLE asset's content. VALUE assets hash their
+        canonical JSON (spilled ones: their stored bytes); FILE assets are
+        hashed once and the digest is stored on the record as "content_hash".
+        """
+        digest = self.known_content_hash(asset)
+        if digest:
+            return digest
+
+        hasher = hashlib.sha256()
+        with open(asset["storage_path"], "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        self.repo.update_asset(asset["_id"], {"content_hash": digest})
+        return digest
+
+    def known_content_hash(self, asset: Dict[str, Any]) -> Optional[str]:
+        """
+        content_hash without reading any file: the stored digest, or an
+        in-document VALUE's hash. None for a FILE never hashed (records from
+        before hashing at ingest; see hash_file_assets).
+        """
+        if asset.get("content_hash"):
+            return asset["content_hash"]
+        if asset["type"] == "VALUE":
+            return hashlib.sha256(json.dumps(asset.get("value_content"), sort_keys=True, default=str).encode()).hexdigest()
+        return None
+
+    def hash_file_assets(self, asset_ids: List[str]) -> int:
+        """
+        Hashes (and records) the AVAILABLE FILE assets among `asset_ids`
+        that have no content_hash yet. For background callers such as the
+        engine; returns how many were hashed.
+        """
+        assets = self.repo.get_assets(asset_ids, fields=["status", "type", "storage_path", "content_hash"])
+        hashed = 0
+        for asset in assets.values():
+            if asset["status"] != "AVAILABLE" or asset["type"] != "FILE" or asset.get("content_hash"):
+                continue
+            try:
+                self.content_hash(asset)
+                hashed += 1
+            except OSError as e:
+                print(f"[AssetManager] Could not hash asset {asset['_id']}: {e}")
+        return hashed
 
-    def resolve_to_path(self, asset_id: str, temp_dir: Optional[str] = None) -> Optional[str]:
+    def resolve_to_path(self, asset_id: str, owner: str) -> Optional[str]:
         """
-        Resolves an asset to a physical file path.
-        If it's a VALUE, it writes it to a temporary file.
+        Resolves an AVAILABLE asset to a physical file path.
+        A VALUE is materialized as a shared read-only file, held for `owner`
+        (a task id) until release_inputs(owner).
         """
         asset = self.repo.get_asset(asset_id)
         if not asset or asset["status"] != "AVAILABLE":
             return None
+        return self._path_of(asset, owner)
+
+    def resolve_inputs(
+        self,
+        input_map: Dict[str, str],
+        owner: str,
+        inline_keys: Iterable[str] = ()
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        Resolves a task's inputs ({key: asset_id}) with one query.
+        Returns (paths, values): VALUE inputs under `inline_keys` whose JSON
+        fits in INLINE_MAX_BYTES come back as values to put in the manifest
+        (no file at all); every other input comes back as a path.
+        Raises ValueError for an input that isn't AVAILABLE.
+        """
+        assets = self.repo.get_assets(list(input_map.values()))
+        inline_keys = set(inline_keys)
+        paths: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        for key, asset_id in input_map.items():
+            asset = assets.get(asset_id)
+            if not asset or asset["status"] != "AVAILABLE":
+                raise ValueError(f"Could not resolve input asset {asset_id} for key {key}")
+            if (key in inline_keys and asset["type"] == "VALUE" and not asset.get("blob")
+                    and self._inlinable(asset["value_content"])):
+                values[key] = asset["value_content"]
+                continue
+            path = self._path_of(asset, owner)
+            if not path:
+                raise ValueError(f"Could not resolve input asset {asset_id} for key {key}")
+            paths[key] = path
+        return paths, values
+
+    def release_inputs(self, owner: str) -> int:
+        """Releases the VALUE files materialized for `owner`; returns how many were deleted."""
+        return self.materializer.release(owner)
 
+    def _path_of(self, asset: Dict[str, Any], owner: str) -> Optional[str]:
         if asset["type"] == "FILE":
             return asset["storage_path"]
-        
         if asset["type"] == "VALUE":
-            # Write value to temp file
-            import tempfile
-            from pathlib import Path
-            
-            content = asset["value_content"]
-            suffix = ".json" if asset["media_type"] == "application/json" else ".txt"
-            
-            # Use provided temp_dir or system default
-            fd, path = tempfile.mkstemp(suffix=suffix, dir=temp_dir, prefix=f"asset_{asset_id}_")
-            with os.fdopen(fd, 'w') as f:
-                if isinstance(content, (dict, list)):
-                    import json
-                    json.dump(content, f)
-                else:
-                    f.write(str(content))
-            return path
-        
+            if asset.get("blob"):
+                # Spilled: the blob already is the read-only shared file
+                return asset["storage_path"]
+            return self.materializer.acquire(asset, owner)
         return None
+
+    def _inlinable(self, value: Any) -> bool:
+        try:
+            return len(json.dumps(value).encode()) <= self.INLINE_MAX_BYTES
+        except (TypeError, ValueError):
+            return False
@@ -0,0 +1,120 @@
+import os
+import json
+import shutil
+import socket
+import stat
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Tuple, Set
+
+class ValueMaterializer:
+    """
+    Writes VALUE assets to files for modules that read their inputs from disk.
+
+    Each (asset_id, content version) is written once, read-only, and shared
+    by every task that takes it as input; the file is removed when the last
+    of those tasks releases it. A fan-out of N tasks over one config VALUE
+    costs one file instead of N.
+
+    Reference counts are held in memory, so every process materializes into
+    its own directory (values/<host>_<pid>); directories left by dead
+    processes on this host are swept on startup.
+    """
+    _instances: Dict[Path, "ValueMaterializer"] = {}
+    _instances_lock = threading.Lock()
+
+    def __new__(cls, root: Path):
+        root = Path(root).absolute()
+        with cls._instances_lock:
+            instance = cls._instances.get(root)
+            if instance is None:
+                instance = super(ValueMaterializer, cls).__new__(cls)
+                instance.root = root
+                instance.dir = root / f"{socket.gethostname()}_{os.getpid()}"
+                instance._lock = threading.Lock()
+                instance._entries = {}
+                instance._owners = {}
+                instance._sweep()
+                cls._instances[root] = instance
+            return instance
+
+    def acquire(self, asset: Dict[str, Any], owner: str) -> str:
+        """
+        Returns the path of the asset's materialized value, writing it on
+        first use, and records `owner` (a task id) as one of its users.
+        """
+        key = (asset["_id"], self._version(asset))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"path": self._write(asset, key[1]), "owners": set()}
+                self._entries[key] = entry
+            entry["owners"].add(owner)
+            self._owners.setdefault(owner, set()).add(key)
+            return entry["path"]
+
+    def release(self, owner: str) -> int:
+        """Drops everything `owner` acquired; files nobody uses anymore are deleted. Returns how many."""
+        removed = 0
+        with self._lock:
+            for key in self._owners.pop(owner, set()):
+                entry = self._entries.get(key)
+                if not entry:
+                    continue
+                entry["owners"].discard(owner)
+                if not entry["owners"]:
+                    del self._entries[key]
+                    Path(entry["path"]).unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._entries), "owners": len(self._owners)}
+
+    @staticmethod
+    def serialize(value: Any) -> str:
+        """The file content for a value: JSON for dicts and lists, str() otherwise."""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return str(value)
+
+    @staticmethod
+    def _version(asset: Dict[str, Any]) -> str:
+        # updated_at changes with every write to the record, hence to the value
+        updated_at = asset.get("updated_at")
+        return updated_at.strftime("%Y%m%dT%H%M%S%f") if updated_at else "0"
+
+    def _write(self, asset: Dict[str, Any], version: str) -> str:
+        suffix = ".json" if asset.get("media_type") == "application/json" else ".txt"
+        path = self.dir / f"asset_{asset['_id']}_{version}{suffix}"
+        tmp_path = self.dir / f"{uuid.uuid4().hex}.part"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w") as f:
+            f.write(self.serialize(asset.get("value_content")))
+        # Shared between tasks: a module must not be able to alter another's input
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+        return str(path)
+
+    def _sweep(self):
+        """Removes our own leftovers (pid reuse) and those of dead processes on this host."""
+        if not self.root.exists():
+            return
+        host = socket.gethostname()
+        for child in self.root.iterdir():
+            name, _, pid = child.name.rpartition("_")
+            if name != host or not pid.isdigit():
+                continue
+            if int(pid) == os.getpid() or not _pid_alive(int(pid)):
+                shutil.rmtree(child, ignore_errors=True)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
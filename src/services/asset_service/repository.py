@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+from pymongo import UpdateOne
 from src.shared.database.mongo import MongoDBConnection
 
 class AssetRepository:
@@ -26,9 +27,34 @@ class AssetRepository:
         self.collection.insert_one(asset_data)
         return asset_data["_id"]
 
+    def create_assets(self, assets: List[Dict[str, Any]]) -> List[str]:
+        """
+        Inserts several asset records in one round trip. Returns their ids.
+        """
+        now = datetime.utcnow()
+        for asset_data in assets:
+            if "_id" not in asset_data:
+                asset_data["_id"] = str(uuid.uuid4())
+            asset_data["created_at"] = now
+            asset_data["updated_at"] = now
+        if assets:
+            self.collection.insert_many(assets)
+        return [a["_id"] for a in assets]
+
     def get_asset(self, asset_id: str) -> Optional[Dict[str, Any]]:
         return self.collection.find_one({"_id": asset_id})
 
+    def get_assets(self, asset_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches several assets in one query, keyed by id. Missing ids are absent.
+        With `fields`, only those fields (plus _id) are returned.
+        """
+        if not asset_ids:
+            return {}
+        projection = {field: 1 for field in fields} if fields else None
+        cursor = self.collection.find({"_id": {"$in": list(asset_ids)}}, projection)
+        return {a["_id"]: a for a in cursor}
+
     def update_asset(self, asset_id: str, updates: Dict[str, Any]):
         updates["updated_at"] = datetime.utcnow()
         self.collection.update_one(
@@ -36,8 +62,39 @@ class AssetRepository:
             {"$set": updates}
         )
 
+    def update_assets(self, updates: Dict[str, Dict[str, Any]], match: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Applies a $set per asset ({asset_id: fields}) in one bulk_write.
+        `match` adds conditions every asset must meet (e.g. still PENDING).
+        Returns the number of assets matched.
+        """
+        if not updates:
+            return 0
+        now = datetime.utcnow()
+        result = self.collection.bulk_write(
+            [
+                UpdateOne({**(match or {}), "_id": asset_id}, {"$set": {**fields, "updated_at": now}})
+                for asset_id, fields in updates.items()
+            ],
+            ordered=False
+        )
+        return result.matched_count
+
+    def fail_pending_assets(self, asset_ids: List[str], error: str) -> int:
+        """Marks the still-PENDING assets among `asset_ids` FAILED. Returns how many."""
+        if not asset_ids:
+            return 0
+        result = self.collection.update_many(
+            {"_id": {"$in": list(asset_ids)}, "status": "PENDING"},
+            {"$set": {"status": "FAILED", "error": error, "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
     def list_assets(self, query: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         return list(self.collection.find(query or {}))
 
     def delete_asset(self, asset_id: str):
         self.collection.delete_one({"_id": asset_id})
+
+    def delete_assets(self, asset_ids: List[str]):
+        self.collection.delete_many({"_id": {"$in": list(asset_ids)}})
@@ -0,0 +1,179 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Set
+
+from src.services.task_runner.execution_engine import ExecutionEngine
+from src.services.task_runner.registry.async_runner import AsyncModuleRunner
+from src.services.task_runner.registry.warm_pool import get_runtime
+from src.services.task_runner.registry.runner import legacy_stdout_result
+
+class AsyncExecutionEngine(ExecutionEngine):
+    """
+    Event-loop variant of the ExecutionEngine.
+    One supervisor per node: module processes are driven by asyncio
+    subprocesses, so `concurrency` running tasks cost coroutines rather
+    than OS threads. Claiming, leases, scheduling and finalization are the
+    same as the threaded engine.
+
+    pymongo is blocking, so repository calls run on a small dedicated
+    thread pool (`db_threads`) and never stall the loop.
+    """
+
+    def __init__(self, *args, db_threads: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_runner = AsyncModuleRunner()
+        self._db_executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="engine-db")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._jobs: Set[asyncio.Task] = set()
+
+    async def run(self, concurrency: int = 64, poll_interval: float = 1.0, watch: bool = True):
+        """
+        Claims and supervises tasks until stop() is called, with at most
+        `concurrency` running at once. Idle waits use the TaskDispatcher
+        like start_worker(); returns once running tasks are drained.
+        """
+        if self._loop:
+            raise RuntimeError("Engine is already running.")
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        slots = asyncio.Semaphore(concurrency)
+
+        if watch and await self._db(self.dispatcher.watch, self.task_repo.collection):
+            poll_interval = max(poll_interval, self.WATCHED_POLL_INTERVAL)
+
+        self._reap_enabled = True
+        await self._db(self.reconcile_dependencies)
+        self._ensure_maintenance()
+        self._ensure_reconciler()
+        print(f"[Engine] Async supervisor {self.worker_id} started with {concurrency} slot(s).")
+
+        try:
+            while not self._stopping.is_set():
+                await slots.acquire()
+                if self._stopping.is_set():
+                    slots.release()
+                    break
+
+                seen = self.dispatcher.generation
+                try:
+                    task = await self._db(self._claim_task)
+                except Exception as e:
+                    # Never let a DB hiccup kill the supervisor
+                    print(f"[Engine] Claim error: {e}")
+                    task = None
+
+                if not task:
+                    slots.release()
+                    await asyncio.to_thread(self.warm_pool.evict_idle)
+                    await self._wait_for_work(seen, poll_interval)
+                    continue
+
+                job = asyncio.create_task(self._supervise(task))
+                self._jobs.add(job)
+                job.add_done_callback(self._jobs.discard)
+                job.add_done_callback(lambda _: slots.release())
+        finally:
+            # Drain (or, after stop(cancel=True), collect the cancelled jobs)
+            if self._jobs:
+                await asyncio.gather(*list(self._jobs), return_exceptions=True)
+            await asyncio.to_thread(self.events.flush, 30.0)
+            await asyncio.to_thread(self.warm_pool.shutdown)
+            await asyncio.to_thread(self._stop_maintenance)
+            self._loop = None
+            print(f"[Engine] Async supervisor {self.worker_id} stopped.")
+
+    def stop(self, cancel: bool = False):
+        """
+        Stops claiming new tasks; run() returns once running ones finish.
+        With `cancel`, running modules are killed and their tasks requeued.
+        Safe to call from any thread.
+        """
+        loop = self._loop
+        if not loop:
+            return
+
+        def _stop():
+            self._stopping.set()
+            if cancel:
+                for job in list(self._jobs):
+                    job.cancel()
+
+        loop.call_soon_threadsafe(_stop)
+        # Wake the idle wait so the supervisor notices the stop flag
+        self.dispatcher.notify()
+
+    async def _wait_for_work(self, seen: int, timeout: float):
+        waiter = asyncio.ensure_future(asyncio.to_thread(self.dispatcher.wait_for_work, seen, timeout))
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait([waiter, stopping], return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+
+    async def _supervise(self, task: Dict[str, Any]):
+        run = None
+        try:
+            run = await self._db(self._prepare_run, task)
+            if not run:
+                return
+
+            try:
+                result = await self._run_module_async(run)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = {"success": False, "logs": [], "result": None, "error": f"Execution failed: {e}"}
+
+            await self._db(self._complete_run, run, result)
+
+        except asyncio.CancelledError:
+            tasks = run["tasks"] if run else [task]
+            await self._db(self._requeue_tasks, tasks, "Cancelled by engine shutdown")
+            if run:
+                self._unregister_run(run)
+                self._release_inputs(run["task_ids"])
+                await self._db(self._cleanup_manifest, run["manifest_path"])
+            raise
+        except Exception as e:
+            print(f"[Engine] Task {task['_id']} supervisor error: {e}")
+        finally:
+            await self._db(self._release_task, task)
+
+    async def _run_module_async(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        module = run["module"]
+        if get_runtime(module["config"])["mode"] == "persistent":
+            # Warm workers are thread-driven; the call still runs off the loop
+            return await asyncio.to_thread(
+                self._run_module, module, run["manifest_path"], run["timeout"], run["task_ids"], run["cancel"]
+            )
+
+        return await self.async_runner.run_module(
+            python_exec=module["python_exec"],
+            script_path=os.path.join(module["path"], module["config"]["entry_point"]),
+            manifest_path=run["manifest_path"],
+            timeout=run["timeout"],
+            log_sink=self.log_repo.writer(run["task_ids"]),
+            tail_lines=self.LOG_TAIL_LINES,
+            cancel_event=run["cancel"],
+            legacy_stdout=legacy_stdout_result(module["config"])
+        )
+
+    def _requeue_tasks(self, tasks: List[Dict[str, Any]], reason: str):
+        for task in tasks:
+            self._untrack(task["_id"])
+            # A task cancelled meanwhile stays CANCELLED
+            requeued = self.task_repo.update_if_running(task["_id"], {
+                "status": "QUEUED",
+                "worker_id": None,
+                "lease_expires_at": None,
+                "requeue_reason": reason
+            }, worker_id=task.get("worker_id"))
+            if requeued:
+                print(f"[Engine] Task {task['_id']} requeued: {reason}")
+        self.dispatcher.notify(len(tasks))
+
+    async def _db(self, fn, *args):
+        return await self._loop.run_in_executor(self._db_executor, fn, *args)
@@ -0,0 +1,108 @@
+import threading
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+class TaskDispatcher:
+    """
+    Push-based wake-up channel between the Orchestrator and the Engine.
+
+    Producers call notify() whenever a task becomes QUEUED; idle engine slots
+    block in wait_for_work() instead of hammering the tasks collection.
+    Works in-process out of the box (condition variable). Engines running in
+    a different process than the Orchestrator can additionally follow a
+    MongoDB change stream (requires a replica set); polling stays as the
+    safety net when neither source fires.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super(TaskDispatcher, cls).__new__(cls)
+            instance._cond = threading.Condition()
+            instance._generation = 0
+            instance._watch_thread = None
+            instance._watch_stop = threading.Event()
+            cls._instance = instance
+        return cls._instance
+
+    @property
+    def generation(self) -> int:
+        """
+        Monotonic signal counter. Read it *before* looking for work and pass it
+        to wait_for_work(), so a notify landing in between is never lost.
+        """
+        return self._generation
+
+    def notify(self, count: int = 1):
+        """
+        Signals that `count` tasks became QUEUED, waking up to `count` idle slots.
+        Nothing accumulates while no one is waiting, so a burst of signals
+        never turns into a burst of empty queue queries later.
+        """
+        if count <= 0:
+            return
+        with self._cond:
+            self._generation += 1
+            self._cond.notify(count)
+
+    def wait_for_work(self, since: int, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until a signal newer than `since` arrives or `timeout` elapses.
+        Returns True if signalled, False on timeout (caller should fall back
+        to a poll).
+        """
+        with self._cond:
+            if self._generation == since:
+                self._cond.wait(timeout)
+            return self._generation != since
+
+    @property
+    def is_watching(self) -> bool:
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def watch(self, collection) -> bool:
+        """
+        Follows QUEUED transitions on the tasks collection via a change stream.
+        Returns False if the server does not support change streams
+        (standalone mongod), in which case the caller keeps polling.
+        """
+        if self.is_watching:
+            return True
+
+        pipeline = [{"$match": {"$or": [
+            {"operationType": "insert", "fullDocument.status": "QUEUED"},
+            {"operationType": "update", "updateDescription.updatedFields.status": "QUEUED"}
+        ]}}]
+
+        try:
+            stream = collection.watch(pipeline)
+        except (PyMongoError, NotImplementedError) as e:
+            print(f"[Dispatcher] Change streams unavailable, falling back to polling: {e}")
+            return False
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(stream,),
+            name="task-dispatcher-watch",
+            daemon=True
+        )
+        self._watch_thread.start()
+        return True
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout=5)
+        self._watch_thread = None
+
+    def _watch_loop(self, stream):
+        try:
+            with stream:
+                while not self._watch_stop.is_set() and stream.alive:
+                    change = stream.try_next()
+                    if change is not None:
+                        self.notify()
+        except PyMongoError as e:
+            print(f"[Dispatcher] Change stream closed, falling back to polling: {e}")
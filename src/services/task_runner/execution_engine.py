@@ -1,180 +1,705 @@
 import os
 import json
 import logging
+import socket
 import tempfile
+import threading
+import time
+import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.task_log_repository import TaskLogRepository
+from src.services.task_runner.task_orchestrator import TaskOrchestrator
 from src.services.asset_service.manager import AssetManager
-from src.services.task_runner.registry.runner import ModuleRunner
+from src.services.asset_service.events import AssetEventBus
+from src.services.task_runner.registry.runner import ModuleRunner, result_path_for, legacy_stdout_result
+from src.services.task_runner.registry.warm_pool import WarmWorkerPool, get_runtime
+from src.services.task_runner.registry.contract_cache import ModuleContractCache
+from src.services.task_runner.memo_repository import MemoRepository
+from src.services.task_runner.dispatcher import TaskDispatcher
+from src.services.task_runner.scheduler import ResourceScheduler
+from src.services.task_runner.reaper import LeaseReaper
+from src.services.task_runner.fair_share import FairShareSelector
 from src.shared.database.mongo import ModuleRegistryRepository
 
+def get_batching(module_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the module's "batching" block from module.json, e.g.
+    {"enabled": true, "max_batch_size": 16}. Batching is off unless declared.
+    """
+    batching = module_config.get("batching") or {}
+    max_batch_size = int(batching.get("max_batch_size", 8))
+    return {
+        "enabled": bool(batching.get("enabled", False)) and max_batch_size > 1,
+        "max_batch_size": max_batch_size
+    }
+
 class ExecutionEngine:
     """
     The Muscle. Stateless consumer that runs QUEUED tasks.
     """
 
-    def __init__(self):
+    # Safety-net poll used while a change stream is delivering wake-ups
+    WATCHED_POLL_INTERVAL = 30.0
+    # Log lines kept on the task document; the full output lives in task_logs
+    LOG_TAIL_LINES = 200
+    # Expired leases are looked for this often while in worker mode
+    REAP_INTERVAL = 30.0
+    # Running tasks are checked for cancellation this often
+    CANCEL_CHECK_INTERVAL = 2.0
+    # BLOCKED tasks are reconciled against stored asset states this often,
+    # at most RECONCILE_PAGES pages of RECONCILE_PAGE_SIZE tasks per round
+    RECONCILE_INTERVAL = 30.0
+    RECONCILE_PAGE_SIZE = 500
+    RECONCILE_PAGES = 10
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        scheduler: Optional[ResourceScheduler] = None,
+        lease_seconds: float = TaskRepository.DEFAULT_LEASE_SECONDS,
+        max_attempts: int = 3,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        orchestrator: Optional[TaskOrchestrator] = None
+    ):
         self.task_repo = TaskRepository()
+        self.log_repo = TaskLogRepository()
         self.asset_mgr = AssetManager()
         self.registry_repo = ModuleRegistryRepository()
+        self.contracts = ModuleContractCache()
+        self.memo_repo = MemoRepository()
         self.runner = ModuleRunner()
+        self.dispatcher = TaskDispatcher()
+        self.scheduler = scheduler or ResourceScheduler()
+        # Idle warm processes count against the scheduler's memory budget
+        self.warm_pool = WarmWorkerPool(scheduler=self.scheduler)
+        self.reaper = LeaseReaper(self.task_repo, self.asset_mgr, max_attempts=max_attempts)
+        self.fair_share = FairShareSelector(self.task_repo, tenant_weights=tenant_weights)
+        # Makes sure the process has a dependency subscriber on the asset
+        # event bus: outputs published by this engine unblock (or fail)
+        # their dependents off the worker's critical path
+        self.orchestrator = orchestrator or TaskOrchestrator()
+        self.events = AssetEventBus()
 
-    def run_once(self) -> bool:
+        # Claimed tasks carry a lease, renewed by the heartbeat at a third of its length
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = lease_seconds / 3
+        # task_id -> worker_id it was claimed under, for tasks this engine holds
+        self._running: Dict[str, str] = {}
+        # task_id -> run plan, for tasks whose module is executing
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._running_lock = threading.Lock()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._maintenance_stop = threading.Event()
+        self._reap_enabled = False
+        self._reconcile_thread: Optional[threading.Thread] = None
+        self._reconcile_stop = threading.Event()
+        # Last BLOCKED task _id swept; the next round continues after it
+        self._reconcile_after: Optional[str] = None
+
+        # Identifies this engine on the task records it claims
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        # Worker mode state
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run_once(self, slot: Optional[str] = None) -> bool:
         """
-        Polls for one QUEUED task and executes it.
+        Claims one QUEUED task and executes it.
         Returns True if a task was processed, False otherwise.
         """
-        # 1. Poll for next QUEUED task
-        # Note: In a real system we'd use find_one_and_update to avoid race conditions.
-        # But for now, we'll simplify.
-        task = self.task_repo.get_next_queued_task()
+        task = self._claim_task(slot)
         if not task:
             return False
 
+        try:
+            self._execute_task(task)
+        finally:
+            self._release_task(task)
+        return True
+
+    def _claim_task(self, slot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # 1. Atomically claim the next QUEUED task that fits this host
+        #    (QUEUED -> RUNNING in one op, resources reserved locally),
+        #    picked by priority and fair share across tenants/modules
+        worker_id = f"{self.worker_id}/{slot}" if slot else self.worker_id
+        task = self.scheduler.admit(
+            lambda limits: self.fair_share.claim(
+                lambda match: self.task_repo.claim_next_task(
+                    worker_id, resource_limits=limits, lease_seconds=self.lease_seconds, match=match
+                )
+            ),
+            # A task that needs the memory of idle warm processes gets it
+            reclaim=lambda memory_mb: self.warm_pool.evict_idle(free_memory_mb=memory_mb)
+        )
+        if task:
+            self._track(task)
+        return task
+
+    def _release_task(self, task: Dict[str, Any]):
+        self._untrack(task["_id"])
+        self.scheduler.release(task["_id"])
+        # Freed capacity may let a slot that was waiting on resources proceed
+        self.dispatcher.notify()
+
+    def start_worker(self, concurrency: int = 1, poll_interval: float = 1.0, watch: bool = True):
+        """
+        Starts `concurrency` worker threads, each claiming and running tasks.
+        Module code runs in subprocesses, so threads only supervise and
+        N slots give N modules running in parallel on this host.
+
+        Idle slots sleep on the TaskDispatcher and are woken as soon as a
+        task is QUEUED. `poll_interval` is only the fallback re-check; when
+        `watch` is set and the DB supports change streams it is relaxed to
+        WATCHED_POLL_INTERVAL.
+        """
+        if self._threads:
+            raise RuntimeError("Worker is already running.")
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+
+        if watch and self.dispatcher.watch(self.task_repo.collection):
+            poll_interval = max(poll_interval, self.WATCHED_POLL_INTERVAL)
+
+        self._stop_event.clear()
+        self._reap_enabled = True
+        # Dependents of outputs whose events were lost (e.g. we crashed) first
+        self._reconcile_after = None
+        self.reconcile_dependencies()
+        self._ensure_maintenance()
+        self._ensure_reconciler()
+        for i in range(concurrency):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(str(i), poll_interval),
+                name=f"engine-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Engine] Worker {self.worker_id} started with {concurrency} slot(s).")
+
+    def stop_worker(self, timeout: Optional[float] = None):
+        """
+        Graceful shutdown: no new tasks are claimed, running ones are
+        allowed to finish (drain) before this returns.
+        """
+        self._stop_event.set()
+        # Wake idle slots so they notice the stop flag
+        self.dispatcher.notify(len(self._threads))
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = [t for t in self._threads if t.is_alive()]
+        if self._threads:
+            print(f"[Engine] {len(self._threads)} slot(s) still draining after timeout.")
+        else:
+            # Let dependents of the last outputs be resolved before we go
+            self.events.flush(timeout)
+            self.warm_pool.shutdown()
+            self._stop_maintenance()
+            print(f"[Engine] Worker {self.worker_id} stopped.")
+
+    def _worker_loop(self, slot: str, poll_interval: float):
+        while not self._stop_event.is_set():
+            seen = self.dispatcher.generation
+            try:
+                processed = self.run_once(slot=slot)
+            except Exception as e:
+                # Never let a DB hiccup kill the slot
+                print(f"[Engine] Slot {slot} error: {e}")
+                processed = False
+
+            if not processed and not self._stop_event.is_set():
+                self.warm_pool.evict_idle()
+                self.dispatcher.wait_for_work(seen, timeout=poll_interval)
+
+    def reap_expired_leases(self) -> Dict[str, int]:
+        """
+        Requeues (or fails, past max_attempts) tasks whose worker stopped heartbeating.
+        """
+        return self.reaper.reap_once()
+
+    def reconcile_dependencies(self, max_pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Unblocks (or fails) BLOCKED tasks from the stored asset states, so
+        dependency resolution doesn't rely on in-memory events alone
+        (see TaskOrchestrator.reconcile_blocked).
+        Sweeps page by page, continuing where the previous call stopped;
+        without `max_pages` it runs to the end of the backlog.
+        Returns the summed counts.
+        """
+        totals = {"available": 0, "lost": 0, "promoted": 0}
+        pages = 0
+        try:
+            while max_pages is None or pages < max_pages:
+                swept = self.orchestrator.reconcile_blocked(self._reconcile_after, self.RECONCILE_PAGE_SIZE)
+                pages += 1
+                for key in totals:
+                    totals[key] += swept[key]
+                self._reconcile_after = swept["next"]
+                if self._reconcile_after is None:
+                    break
+        except Exception as e:
+            print(f"[Engine] Dependency reconciliation error: {e}")
+        return totals
+
+    def _track(self, task: Dict[str, Any]):
+        with self._running_lock:
+            self._running[task["_id"]] = task["worker_id"]
+        self._ensure_maintenance()
+
+    def _untrack(self, task_id: str):
+        with self._running_lock:
+            self._running.pop(task_id, None)
+
+    def _ensure_maintenance(self):
+        """
+        Starts the background heartbeat (and, in worker mode, reaper) thread.
+        Started lazily so plain run_once() callers also keep their leases alive.
+        """
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop,
+            name="engine-heartbeat",
+            daemon=True
+        )
+        self._maintenance_thread.start()
+
+    def _stop_maintenance(self):
+        self._maintenance_stop.set()
+        self._reconcile_stop.set()
+        for thread in (self._maintenance_thread, self._reconcile_thread):
+            if thread:
+                thread.join(timeout=5)
+        self._maintenance_thread = None
+        self._reconcile_thread = None
+        self._reap_enabled = False
+
+    def _ensure_reconciler(self):
+        """
+        Starts the worker-mode dependency sweep on its own thread, so a slow
+        sweep over a large backlog never delays lease renewal.
+        """
+        if self._reconcile_thread and self._reconcile_thread.is_alive():
+            return
+        self._reconcile_stop.clear()
+        self._reconcile_thread = threading.Thread(
+            target=self._reconcile_loop,
+            name="engine-reconcile",
+            daemon=True
+        )
+        self._reconcile_thread.start()
+
+    def _reconcile_loop(self):
+        # The event bus is only a latency optimisation: this sweep picks up
+        # whatever it lost, a bounded number of pages per round
+        while not self._reconcile_stop.wait(self.RECONCILE_INTERVAL):
+            self.reconcile_dependencies(max_pages=self.RECONCILE_PAGES)
+
+    def _maintenance_loop(self):
+        last_reap = 0.0
+        last_renew = time.monotonic()
+        while not self._maintenance_stop.wait(min(self.heartbeat_interval, self.CANCEL_CHECK_INTERVAL)):
+            try:
+                with self._running_lock:
+                    running = dict(self._running)
+                self._check_cancellations(list(running))
+
+                # Heartbeat: one update renews every lease held by this engine
+                if time.monotonic() - last_renew >= self.heartbeat_interval:
+                    last_renew = time.monotonic()
+                    self._renew_leases(running)
+
+                if self._reap_enabled and time.monotonic() - last_reap >= self.REAP_INTERVAL:
+                    last_reap = time.monotonic()
+                    self.reaper.reap_once()
+
+                # Even while every slot is busy: expired warm processes go, and
+                # idle ones give back memory the host is overcommitted by
+                self.warm_pool.evict_idle(free_memory_mb=self.scheduler.overcommitted_mb())
+            except Exception as e:
+                print(f"[Engine] Heartbeat error: {e}")
+
+    def _check_cancellations(self, running: List[str]):
+        """
+        Kills runs whose tasks were cancelled (see TaskOrchestrator.cancel_task).
+        """
+        self._abandon(self.task_repo.find_cancelled(running), "cancelled")
+
+    def _renew_leases(self, running: Dict[str, str]):
+        """
+        Renews the leases of `running` ({task_id: worker_id}). A task whose
+        renewal didn't match was reaped (and maybe re-claimed elsewhere),
+        cancelled or finished: it is no longer ours, so it is dropped.
+        """
+        renewed = set(self.task_repo.renew_leases(running, lease_seconds=self.lease_seconds))
+        self._abandon([task_id for task_id in running if task_id not in renewed], "lost its lease")
+
+    def _abandon(self, task_ids: List[str], reason: str):
+        """
+        Stops tracking tasks this engine no longer owns and discards their
+        results. A batch invocation is only killed once every task in it is
+        abandoned; until then only those tasks' results are dropped.
+        """
+        for task_id in task_ids:
+            self._untrack(task_id)
+            with self._running_lock:
+                run = self._runs.get(task_id)
+                if not run:
+                    continue
+                run["cancelled"].add(task_id)
+                kill = run["cancelled"] >= set(run["task_ids"]) and not run["cancel"].is_set()
+            if kill:
+                print(f"[Engine] Task {task_id} {reason}, killing {run['module']['_id']}.")
+                run["cancel"].set()
+
+    def _register_run(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        run["cancel"] = threading.Event()
+        run["cancelled"] = set()
+        with self._running_lock:
+            for task_id in run["task_ids"]:
+                self._runs[task_id] = run
+        return run
+
+    def _unregister_run(self, run: Dict[str, Any]):
+        with self._running_lock:
+            for task_id in run["task_ids"]:
+                self._runs.pop(task_id, None)
+
+    def _execute_task(self, task: Dict[str, Any]):
+        run = self._prepare_run(task)
+        if not run:
+            return
+
+        # 3. Execute
+        try:
+            result = self._run_module(
+                run["module"], run["manifest_path"], run["timeout"], run["task_ids"], cancel_event=run["cancel"]
+            )
+        except Exception as e:
+            result = {"success": False, "logs": [], "result": None, "error": f"Execution failed: {e}"}
+
+        # 4. Finalize
+        self._complete_run(run, result)
+
+    def _prepare_run(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Resolves the module, optionally gathers a batch, and materializes the manifest.
+        Returns a run plan {"module", "tasks", "task_ids", "manifest_path",
+        "timeout", "batch", "cancel", "cancelled"}, or None if nothing is left
+        to run (failures have already been recorded).
+        """
         task_id = task["_id"]
         print(f"[Engine] Starting Task: {task_id}")
-
-        # Mark as RUNNING
-        self.task_repo.update_task(task_id, {
-            "status": "RUNNING",
-            "started_at": datetime.utcnow()
-        })
+        batch = [task]
 
         try:
             # 2. Prepare Execution
             # Get Module Info
             module_id = task["module_id"]
-            module = self.registry_repo.get_module(module_id)
-            if not module or module["status"] != "AVAILABLE":
+            contract = self.contracts.get(module_id)
+            if not contract or contract.status != "AVAILABLE":
                 raise Exception(f"Module {module_id} is not AVAILABLE")
+            module = contract.module
 
-            python_exec = module["python_exec"]
-            script_path = os.path.join(module["path"], module["config"]["entry_point"])
+            # Opt-in: pull more QUEUED tasks for the same module into one invocation
+            batching = get_batching(module["config"])
+            if batching["enabled"]:
+                batch += self._claim_batch(task, batching["max_batch_size"] - 1)
+            if len(batch) > 1:
+                run = self._prepare_batch(module, batch)
+                return self._register_run(run) if run else None
 
             # Materialize Manifest
             manifest_path = self._prepare_manifest(task)
             print(f"[Engine] Manifest generated: {manifest_path}")
-
-            # 3. Execute
             print(f"[Engine] Executing {module_id}...")
-            result = self.runner.run_module(
+
+            return self._register_run({
+                "module": module,
+                "tasks": [task],
+                "task_ids": [task_id],
+                "manifest_path": manifest_path,
+                "timeout": task.get("config", {}).get("timeout", 600),
+                "batch": False
+            })
+
+        except Exception as e:
+            for t in batch:
+                self._fail_task(t, str(e))
+            return None
+
+    def _claim_batch(self, task: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """
+        Claims up to `limit` further QUEUED tasks of the same module for the
+        worker that owns `task`. They share the first task's invocation (and
+        its resource reservation).
+        """
+        peers = []
+        while len(peers) < limit:
+            peer = self.task_repo.claim_next_task(
+                task["worker_id"], module_id=task["module_id"], lease_seconds=self.lease_seconds
+            )
+            if not peer:
+                break
+            self._track(peer)
+            peers.append(peer)
+        return peers
+
+    def _prepare_batch(self, module: Dict[str, Any], batch: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Builds a multi-task manifest for a batch. Tasks whose inputs can't be
+        resolved are failed individually and left out of the batch.
+        """
+        print(f"[Engine] Executing {module['_id']} as a batch of {len(batch)} tasks...")
+
+        entries = []
+        runnable = []
+        for task in batch:
+            try:
+                inputs, values = self._resolve_inputs(task)
+                entries.append({
+                    "task_id": task["_id"],
+                    "inputs": inputs,
+                    "values": values,
+                    "config": task.get("config", {})
+                })
+                runnable.append(task)
+            except Exception as e:
+                self._fail_task(task, str(e))
+
+        if not runnable:
+            return None
+
+        manifest_path = self._write_manifest(
+            {"mode": "batch", "tasks": entries},
+            prefix=f"manifest_batch_{runnable[0]['_id']}_"
+        )
+        return {
+            "module": module,
+            "tasks": runnable,
+            "task_ids": [t["_id"] for t in runnable],
+            "manifest_path": manifest_path,
+            "timeout": max(t.get("config", {}).get("timeout", 600) for t in runnable),
+            "batch": True
+        }
+
+    def _complete_run(self, run: Dict[str, Any], result: Dict[str, Any]):
+        """
+        Fans the invocation result out through _finalize_task and cleans up.
+        A batch result is expected as {"results": {<task_id>: {<output_key>: value, ...}}}.
+        """
+        per_task = (result.get("result") or {}).get("results") or {}
+        self._unregister_run(run)
+        # The module is done with its inputs
+        self._release_inputs(run["task_ids"])
+
+        for task in run["tasks"]:
+            if task["_id"] in run["cancelled"]:
+                # CANCELLED (outputs failed by the orchestrator) or handed to
+                # another worker after its lease lapsed: not ours to finalize
+                print(f"[Engine] Task {task['_id']} is no longer ours, result discarded.")
+                continue
+            task_result = result
+            if run["batch"]:
+                task_result = dict(result)
+                if result["success"]:
+                    res_data = per_task.get(task["_id"])
+                    if res_data is None:
+                        task_result.update(success=False, result=None, error="Module returned no result for this task in batch")
+                    elif isinstance(res_data, dict) and res_data.get("error"):
+                        task_result.update(success=False, result=None, error=str(res_data["error"]))
+                    else:
+                        task_result["result"] = res_data
+            try:
+                self._finalize_task(task, task_result)
+            except Exception as e:
+                self._fail_task(task, str(e))
+
+        # Cleanup manifest
+        self._cleanup_manifest(run["manifest_path"])
+
+    def _run_module(
+        self,
+        module: Dict[str, Any],
+        manifest_path: str,
+        timeout: int,
+        task_ids: List[str],
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        python_exec = module["python_exec"]
+        script_path = os.path.join(module["path"], module["config"]["entry_point"])
+        # Full output streams to the log store; only a bounded tail comes back
+        log_sink = self.log_repo.writer(task_ids)
+
+        if get_runtime(module["config"])["mode"] == "persistent":
+            # Opt-in: reuse a warm module process instead of a fresh interpreter
+            return self.warm_pool.run_module(
+                module=module,
                 python_exec=python_exec,
                 script_path=script_path,
                 manifest_path=manifest_path,
-                timeout=task.get("config", {}).get("timeout", 600)
+                timeout=timeout,
+                log_sink=log_sink,
+                tail_lines=self.LOG_TAIL_LINES,
+                cancel_event=cancel_event
             )
+        return self.runner.run_module(
+            python_exec=python_exec,
+            script_path=script_path,
+            manifest_path=manifest_path,
+            timeout=timeout,
+            log_sink=log_sink,
+            tail_lines=self.LOG_TAIL_LINES,
+            cancel_event=cancel_event,
+            legacy_stdout=legacy_stdout_result(module["config"])
+        )
 
-            # 4. Finalize
-            self._finalize_task(task, result)
-            
-            # Cleanup manifest
-            if os.path.exists(manifest_path):
-                os.remove(manifest_path)
-            
-            return True
+    def _fail_task(self, task: Dict[str, Any], error: str):
+        task_id = task["_id"]
+        self._untrack(task_id)
+        self._release_inputs([task_id])
+        print(f"[Engine] Task {task_id} FAILED: {error}")
+        failed = self.task_repo.update_if_running(task_id, {
+            "status": "FAILED",
+            "error_log": error,
+            "finished_at": datetime.utcnow()
+        }, worker_id=task.get("worker_id"))
+        # Fail all output assets; their dependents are failed by the event subscriber
+        if failed:
+            self._fail_outputs(task, f"Parent task {task_id} failed: {error}")
 
-        except Exception as e:
-            print(f"[Engine] Task {task_id} FAILED: {str(e)}")
-            self.task_repo.update_task(task_id, {
-                "status": "FAILED",
-                "error_log": str(e),
-                "finished_at": datetime.utcnow()
-            })
-            # Fail all output assets
-            for output_key, asset_id in task["output_map"].items():
-                self.asset_mgr.fail_asset(asset_id, f"Parent task {task_id} failed: {str(e)}")
-            
-            return True
+    def _resolve_inputs(self, task: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        Resolves the task's input asset IDs to physical paths, and small VALUE
+        inputs the module declares "inline" to values carried in the manifest.
+        VALUE files are shared with other tasks and held until _release_inputs.
+        """
+        contract = self.contracts.get(task["module_id"])
+        return self.asset_mgr.resolve_inputs(
+            task["input_map"], owner=task["_id"], inline_keys=contract.inline_inputs if contract else ()
+        )
+
+    def _release_inputs(self, task_ids: List[str]):
+        for task_id in task_ids:
+            self.asset_mgr.release_inputs(task_id)
 
     def _prepare_manifest(self, task: Dict[str, Any]) -> str:
         """
         Resolves asset IDs to physical paths and creates a temporary manifest JSON.
         """
-        input_map = task["input_map"]
-        resolved_inputs = {}
-
-        # Create a task-specific temp dir for Config VALUES materialized as files
-        temp_dir = tempfile.mkdtemp(prefix=f"task_{task['_id']}_")
-        
-        for key, asset_id in input_map.items():
-            path = self.asset_mgr.resolve_to_path(asset_id, temp_dir=temp_dir)
-            if not path:
-                raise Exception(f"Could not resolve input asset {asset_id} for key {key}")
-            resolved_inputs[key] = path
-
+        inputs, values = self._resolve_inputs(task)
         manifest = {
             "mode": "run",
             "task_id": task["_id"],
-            "inputs": resolved_inputs,
+            "inputs": inputs,
+            "values": values,
             "config": task.get("config", {})
         }
+        return self._write_manifest(manifest, prefix=f"manifest_{task['_id']}_")
 
-        fd, manifest_path = tempfile.mkstemp(suffix=".json", prefix=f"manifest_{task['_id']}_")
+    def _write_manifest(self, manifest: Dict[str, Any], prefix: str) -> str:
+        fd, manifest_path = tempfile.mkstemp(suffix=".json", prefix=prefix)
+        # Dedicated result channel: the module writes its result document here
+        manifest["result_path"] = result_path_for(manifest_path)
         with os.fdopen(fd, 'w') as f:
             json.dump(manifest, f)
         
         return manifest_path
 
+    def _cleanup_manifest(self, manifest_path: str):
+        # The result file is normally consumed by the runner, but survives timeouts
+        for path in [manifest_path, result_path_for(manifest_path)]:
+            if os.path.exists(path):
+                os.remove(path)
+
     def _finalize_task(self, task: Dict[str, Any], result: Dict[str, Any]):
         """
         Handles fulfillment of output assets based on execution result and module contract.
+        Costs one bulk write for the outputs and one update of the task record,
+        whatever the number of outputs.
         """
         task_id = task["_id"]
+        self._untrack(task_id)
         
         if result["success"]:
             print(f"[Engine] Task {task_id} succeeded.")
             res_data = result.get("result")
             
-            # Fetch module contract to know output types
-            module = self.registry_repo.get_module(task["module_id"])
-            output_defs = {o["key"]: o for o in module.get("config", {}).get("outputs", [])}
+            # Module contract tells the output types (cached, no registry read)
+            contract = self.contracts.get(task["module_id"])
+            output_defs = contract.output_defs if contract else {}
 
+            # Check for "outputs" sub-dict or top-level keys
+            outputs_from_module = {}
             if res_data and isinstance(res_data, dict):
-                # Check for "outputs" sub-dict or top-level keys
                 outputs_from_module = res_data.get("outputs") or res_data
 
-                for key, asset_id in task["output_map"].items():
-                    val = outputs_from_module.get(key)
-                    out_def = output_defs.get(key, {})
-                    contract_type = out_def.get("contract_type", "VALUE")
-
-                    if val is not None:
-                        try:
-                            if contract_type == "ASSET":
-                                # Fulfill as Path
-                                self.asset_mgr.fulfill_asset(asset_id, value=str(val), is_path=True)
-                            else:
-                                # Fulfill as Value
-                                self.asset_mgr.fulfill_asset(asset_id, value=val, is_path=False)
-                        except Exception as e:
-                            self.asset_mgr.fail_asset(asset_id, f"Fulfillment failed: {e}")
+            values = {}
+            missing = {}
+            for key, asset_id in task["output_map"].items():
+                val = outputs_from_module.get(key)
+                out_def = output_defs.get(key, {})
+                contract_type = out_def.get("contract_type", "VALUE")
+
+                if val is not None:
+                    if contract_type == "ASSET":
+                        # Fulfill as Path
+                        values[asset_id] = (str(val), True)
                     else:
-                        self.asset_mgr.fail_asset(asset_id, f"Module did not provide output for key: {key}")
+                        # Fulfill as Value
+                        values[asset_id] = (val, False)
+                else:
+                    missing[asset_id] = f"Module did not provide output for key: {key}"
+
+            # One bulk write for every output, however many the module declares
+            failed_outputs = self.asset_mgr.settle_task_outputs(task_id, values, missing, publish=False)
 
-            self.task_repo.update_task(task_id, {
+            completed = self.task_repo.update_if_running(task_id, {
                 "status": "COMPLETED",
                 "finished_at": datetime.utcnow(),
                 "logs": result["logs"]
-            })
-            
-            # Trigger unblocking of dependent tasks
-            from src.services.task_runner.task_orchestrator import TaskOrchestrator
-            orch = TaskOrchestrator()
-            for asset_id in task["output_map"].values():
-                 orch.handle_asset_event("AVAILABLE", asset_id)
+            }, worker_id=task.get("worker_id"))
+
+            if not completed:
+                # Cancelled (or handed to another worker) while we finished:
+                # our output writes only applied to still-PENDING assets
+                print(f"[Engine] Task {task_id} left RUNNING before it could complete.")
+                self.asset_mgr.publish_current(list(task["output_map"].values()))
+                return
+
+            # Memoizable module: later identical submissions reuse these outputs
+            if task.get("memo_key") and contract and not failed_outputs:
+                self.memo_repo.store(
+                    task["memo_key"], task["module_id"], contract.version_hash,
+                    task["output_map"], contract.memoize["ttl_seconds"]
+                )
+            elif contract and contract.memoize["enabled"] and not task.get("memo_key"):
+                # An input had no content hash (legacy record); hash it here,
+                # off the request path, so the next submission can be memoized
+                self.asset_mgr.hash_file_assets(list(task["input_map"].values()))
+
+            # Only now let the asset event subscriber unblock (or fail) dependents
+            self.asset_mgr.publish_outcomes(list(task["output_map"].values()), failed_outputs)
 
         else:
             print(f"[Engine] Task {task_id} failed: {result['error']}")
-            self.task_repo.update_task(task_id, {
+            failed = self.task_repo.update_if_running(task_id, {
                 "status": "FAILED",
                 "error_log": result["error"],
                 "logs": result["logs"],
                 "finished_at": datetime.utcnow()
-            })
-            # Fail all output assets
-            for asset_id in task["output_map"].values():
-                self.asset_mgr.fail_asset(asset_id, f"Execution failed: {result['error']}")
+            }, worker_id=task.get("worker_id"))
+            # Fail all output assets; dependents can never run now and are failed too
+            if failed:
+                self._fail_outputs(task, f"Parent task {task_id} failed: {result['error']}")
+
+    def _fail_outputs(self, task: Dict[str, Any], error: str):
+        self.asset_mgr.settle_task_outputs(task["_id"], {}, {asset_id: error for asset_id in task["output_map"].values()})
 
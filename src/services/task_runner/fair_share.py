@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+from src.services.task_runner.task_repository import TaskRepository
+
+DEFAULT_TENANT = "default"
+
+class FairShareSelector:
+    """
+    Chooses which QUEUED task an engine claims next.
+
+    Priority is strict: only the highest queued priority level is considered.
+    Within that level, tenants are served in proportion to their weight and,
+    inside a tenant, modules take turns, so one client submitting thousands of
+    batch tasks can't starve everyone behind it.
+
+    Usage is this engine's exponentially decayed count of claims, so several
+    engines each converge on the same shares without coordinating. Every
+    lookup is an index seek or distinct scan; nothing scans the queue.
+    """
+
+    MAX_GROUP_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        task_repo: TaskRepository,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        half_life: float = 60.0
+    ):
+        self.task_repo = task_repo
+        self.tenant_weights = tenant_weights or {}
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[Any, float]] = {"tenant": {}, "module_id": {}}
+        self._last_decay = time.monotonic()
+
+    def claim(
+        self,
+        claim_fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        `claim_fn(match)` atomically claims the next task matching the extra
+        equality filters `match` (None = plain priority/FIFO order).
+        Falls back to the plain order if the fair-share pick finds nothing
+        claimable (e.g. resource limits exclude that group).
+        """
+        task = None
+        head = self.task_repo.top_queued_priority()
+        if head is None:
+            return None
+
+        match = {"priority": head.get("priority")}
+        tenants = self.task_repo.distinct_queued("tenant", match)
+        # Only the most under-served groups are tried before falling back,
+        # so a claim costs a bounded number of round trips
+        for tenant in self._order("tenant", tenants)[:self.MAX_GROUP_ATTEMPTS]:
+            tenant_match = dict(match, tenant=tenant)
+            modules = self.task_repo.distinct_queued("module_id", tenant_match)
+            module_id = next(iter(self._order("module_id", modules)), None)
+            if module_id is None:
+                continue
+            task = claim_fn(dict(tenant_match, module_id=module_id))
+            if task:
+                break
+
+        if not task:
+            task = claim_fn(None)
+        if task:
+            self.record(task)
+        return task
+
+    def record(self, task: Dict[str, Any]):
+        """Charges a claimed task to its tenant and module."""
+        with self._lock:
+            self._decay()
+            for field in self._usage:
+                key = task.get(field)
+                self._usage[field][key] = self._usage[field].get(key, 0.0) + 1.0
+
+    def _order(self, field: str, values):
+        with self._lock:
+            self._decay()
+            usage = self._usage[field]
+
+            def share(value):
+                weight = self.tenant_weights.get(value or DEFAULT_TENANT, 1.0) if field == "tenant" else 1.0
+                return usage.get(value, 0.0) / max(weight, 1e-9)
+
+            return sorted(values, key=share)
+
+    def _decay(self):
+        now = time.monotonic()
+        factor = math.pow(0.5, (now - self._last_decay) / self.half_life)
+        self._last_decay = now
+        for usage in self._usage.values():
+            for key in list(usage):
+                usage[key] *= factor
+                if usage[key] < 0.01:
+                    del usage[key]
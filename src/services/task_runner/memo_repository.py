@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from pymongo import ASCENDING
+from src.shared.database.mongo import MongoDBConnection
+
+def get_memoize(module_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the module's "memoize" block from module.json, e.g.
+    {"enabled": true, "ttl_seconds": 604800}. Only deterministic modules
+    should opt in; memoization is off unless declared.
+    """
+    memoize = module_config.get("memoize") or {}
+    return {
+        "enabled": bool(memoize.get("enabled", False)),
+        "ttl_seconds": int(memoize.get("ttl_seconds", MemoRepository.DEFAULT_TTL_SECONDS))
+    }
+
+class MemoRepository:
+    """
+    Result memo for deterministic modules.
+    An entry maps a memo key (module version + input content hashes + config)
+    to the output assets of the task that first computed it. Entries expire
+    `ttl_seconds` after their last use (MongoDB TTL index), and a module's
+    entries are dropped when a new version of it is registered.
+    """
+    COLLECTION_NAME = "task_memo"
+    STATS_COLLECTION_NAME = "task_memo_stats"
+    DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+    def __init__(self):
+        self.conn = MongoDBConnection()
+        try:
+            self.conn.db
+        except ConnectionError:
+            self.conn.connect()
+        self.collection = self.conn.db[self.COLLECTION_NAME]
+        self.stats = self.conn.db[self.STATS_COLLECTION_NAME]
+        # Eviction: documents are removed once expires_at has passed
+        self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        self.collection.create_index([("module_id", ASCENDING)])
+
+    def get_entry(self, memo_key: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"_id": memo_key})
+
+    def store(self, memo_key: str, module_id: str, version_hash: str, outputs: Dict[str, str], ttl_seconds: int):
+        """Records (or replaces) the outputs computed for `memo_key`."""
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": memo_key},
+            {
+                "$set": {
+                    "module_id": module_id,
+                    "version_hash": version_hash,
+                    "outputs": outputs,
+                    "last_used_at": now,
+                    "expires_at": now + timedelta(seconds=ttl_seconds)
+                },
+                "$setOnInsert": {"created_at": now, "hits": 0}
+            },
+            upsert=True
+        )
+
+    def touch(self, memo_key: str, ttl_seconds: int):
+        """Counts a hit and extends the entry's lifetime."""
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": memo_key},
+            {
+                "$inc": {"hits": 1},
+                "$set": {"last_used_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}
+            }
+        )
+
+    def delete(self, memo_key: str):
+        self.collection.delete_one({"_id": memo_key})
+
+    def delete_module(self, module_id: str) -> int:
+        return self.collection.delete_many({"module_id": module_id}).deleted_count
+
+    def record_lookup(self, module_id: str, hit: bool):
+        """Per-module hit/miss counters."""
+        self.stats.update_one(
+            {"_id": module_id},
+            {"$inc": {"hits" if hit else "misses": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    def get_stats(self, module_id: str) -> Dict[str, Any]:
+        counters = self.stats.find_one({"_id": module_id}) or {}
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "module_id": module_id,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": self.collection.count_documents({"module_id": module_id})
+        }
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.dispatcher import TaskDispatcher
+from src.services.asset_service.manager import AssetManager
+
+class LeaseReaper:
+    """
+    Recovers tasks from crashed engines.
+    A RUNNING task whose lease was not renewed by its worker's heartbeat is
+    requeued, or FAILED (together with its pending outputs) once it has used
+    up its attempts, so one dead node doesn't stall every downstream task.
+    """
+
+    def __init__(
+        self,
+        task_repo: Optional[TaskRepository] = None,
+        asset_mgr: Optional[AssetManager] = None,
+        max_attempts: int = 3
+    ):
+        self.task_repo = task_repo or TaskRepository()
+        self.asset_mgr = asset_mgr or AssetManager()
+        self.dispatcher = TaskDispatcher()
+        # Default retry limit; a task can override it with config.max_attempts
+        self.max_attempts = max_attempts
+
+    def reap_once(self, limit: int = 100) -> Dict[str, int]:
+        """
+        Processes up to `limit` expired leases.
+        Returns {"requeued": n, "failed": m}.
+        """
+        requeued = 0
+        failed = 0
+
+        for task in self.task_repo.find_expired_leases(limit=limit):
+            task_id = task["_id"]
+            attempts = task.get("attempts", 1)
+            max_attempts = task.get("config", {}).get("max_attempts", self.max_attempts)
+            reason = f"Lease expired on worker {task.get('worker_id', 'unknown')} (attempt {attempts}/{max_attempts})"
+
+            if attempts < max_attempts:
+                if self.task_repo.release_expired_task(task_id, {"status": "QUEUED", "requeue_reason": reason}):
+                    print(f"[Reaper] Task {task_id} requeued: {reason}")
+                    requeued += 1
+            else:
+                released = self.task_repo.release_expired_task(task_id, {
+                    "status": "FAILED",
+                    "error_log": reason,
+                    "finished_at": datetime.utcnow()
+                })
+                if released:
+                    print(f"[Reaper] Task {task_id} FAILED: {reason}")
+                    # The asset event subscriber fails everything downstream
+                    error = f"Parent task {task_id} failed: {reason}"
+                    self.asset_mgr.settle_task_outputs(task_id, {}, {a: error for a in task["output_map"].values()})
+                    failed += 1
+
+        self.dispatcher.notify(requeued)
+        return {"requeued": requeued, "failed": failed}
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import signal
+import threading
+from typing import Dict, Any, Optional, Callable, List
+
+from src.services.task_runner.registry.runner import LogBuffer, settle_exit, CANCEL_GRACE_SECONDS
+
+# Longest single output line a module may print (asyncio's default is 64 KiB)
+MAX_LINE_BYTES = 1024 * 1024
+
+class AsyncModuleRunner:
+    """
+    asyncio counterpart of ModuleRunner.
+    Supervises the module process from the event loop instead of a thread, so
+    one loop can watch hundreds of running modules. Same manifest/result
+    contract and return shape as ModuleRunner.run_module.
+    """
+
+    async def run_module(
+        self,
+        python_exec: str,
+        script_path: str,
+        manifest_path: str,
+        timeout: int = 300,
+        log_sink: Optional[Callable[[List[str]], None]] = None,
+        tail_lines: int = 1000,
+        cancel_event: Optional[threading.Event] = None,
+        legacy_stdout: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Runs <python_exec> <script_path> --manifest <manifest_path>.
+
+        `log_sink` is a blocking writer (e.g. TaskLogRepository.writer); its
+        chunks are written in order on a worker thread so the loop never
+        waits on the DB. `timeout` is wall-clock. If the calling coroutine is
+        cancelled, the module process is killed before CancelledError propagates.
+        Setting `cancel_event` (from any thread) kills the module's whole
+        process group and returns an error result "Cancelled".
+        """
+        cmd = [python_exec, script_path, "--manifest", manifest_path]
+
+        # LogBuffer only queues chunks here; they are persisted by drain()
+        chunks: List[List[str]] = []
+        logs = LogBuffer(sink=chunks.append if log_sink else None, tail_lines=tail_lines)
+        result_data = None
+        success = False
+        error_msg = None
+        process = None
+
+        async def drain():
+            while chunks:
+                chunk = chunks.pop(0)
+                try:
+                    await asyncio.to_thread(log_sink, chunk)
+                except Exception as e:
+                    # Losing a log chunk must never fail the task itself
+                    print(f"[AsyncRunner] Failed to persist log chunk: {e}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT, # Merge stderr into stdout for simple logging
+                limit=MAX_LINE_BYTES,
+                start_new_session=True
+            )
+
+            deadline = loop.time() + timeout
+            while True:
+                if cancel_event and cancel_event.is_set():
+                    error_msg = "Cancelled"
+                    logs.append(error_msg)
+                    await self._kill(process, grace=CANCEL_GRACE_SECONDS)
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    line = await asyncio.wait_for(
+                        process.stdout.readline(),
+                        timeout=min(remaining, logs.flush_interval)
+                    )
+                except asyncio.TimeoutError:
+                    # Quiet module: persist what we have and keep waiting
+                    logs.flush()
+                    await drain()
+                    continue
+                if not line:
+                    break
+                logs.append(line.decode(errors="replace").strip())
+                await drain()
+
+            if error_msg is None:
+                await asyncio.wait_for(process.wait(), timeout=max(deadline - loop.time(), 0.1))
+
+                success, result_data, error_msg = settle_exit(
+                    manifest_path, logs.tail, process.returncode, legacy_stdout
+                )
+
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            error_msg = "Process timed out"
+            logs.append(error_msg)
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        except Exception as e:
+            # The leader may be gone already; its children still hold the group
+            await self._kill(process)
+            error_msg = f"Execution failed: {str(e)}"
+            logs.append(error_msg)
+        finally:
+            if process and process.returncode is None:
+                await self._kill(process)
+            logs.flush()
+            await drain()
+
+        return {
+            "success": success,
+            "logs": logs.tail,
+            "result": result_data,
+            "error": error_msg
+        }
+
+    @staticmethod
+    async def _kill(process: Optional[asyncio.subprocess.Process], grace: float = 0.0):
+        """Kills the module's process group (see runner.kill_process_group)."""
+        if process is None:
+            return
+
+        def signal_group(sig):
+            try:
+                os.killpg(process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+        if grace > 0 and process.returncode is None:
+            signal_group(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=grace)
+            except asyncio.TimeoutError:
+                pass
+        # Children may outlive the leader; the group id stays valid while they run
+        signal_group(signal.SIGKILL)
+        await process.wait()
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+from src.shared.database.mongo import ModuleRegistryRepository
+from src.services.task_runner.scheduler import normalize_resources
+from src.services.task_runner.memo_repository import get_memoize
+
+class ModuleContract:
+    """
+    A module record with its contract pre-parsed for the per-task hot path.
+    """
+
+    def __init__(self, module: Dict[str, Any]):
+        config = module.get("config", {})
+        self.module_id: str = module["_id"]
+        self.version_hash: Optional[str] = module.get("version_hash")
+        self.inputs: List[Dict[str, Any]] = config.get("inputs", [])
+        self.outputs: List[Dict[str, Any]] = config.get("outputs", [])
+        self.output_defs: Dict[str, Dict[str, Any]] = {o["key"]: o for o in self.outputs}
+        # key -> allowed media types, only for ASSET inputs that constrain them
+        self.allowed_media_types: Dict[str, frozenset] = {}
+        for inp_def in self.inputs:
+            media_types = (inp_def.get("constraints") or {}).get("media_types")
+            if inp_def.get("contract_type") == "ASSET" and media_types:
+                self.allowed_media_types[inp_def["key"]] = frozenset(media_types)
+        # VALUE inputs the module accepts in the manifest's "values" instead of as files
+        self.inline_inputs: frozenset = frozenset(
+            inp_def["key"] for inp_def in self.inputs
+            if inp_def.get("contract_type") == "VALUE" and inp_def.get("inline") is True
+        )
+        self.resources: Dict[str, float] = normalize_resources(config.get("resources"))
+        self.memoize: Dict[str, Any] = get_memoize(config)
+        self.module = module
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.module.get("status")
+
+class ModuleContractCache:
+    """
+    In-process cache of module contracts, shared by the Orchestrator and the
+    Engine so task submission and execution don't read the registry per task.
+
+    Contracts are compiled once per (module_id, version_hash). The
+    RegistryOrchestrator invalidates a module whenever it changes its status
+    or hash; in other processes entries are re-read after `ttl` seconds,
+    re-using the compiled contract when the hash did not change.
+    """
+    _instance = None
+    DEFAULT_TTL = 30.0
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super(ModuleContractCache, cls).__new__(cls)
+            instance._lock = threading.Lock()
+            instance._repo = None
+            instance._contracts = {}
+            instance._current = {}
+            instance.ttl = cls.DEFAULT_TTL
+            cls._instance = instance
+        return cls._instance
+
+    @property
+    def repo(self) -> ModuleRegistryRepository:
+        if self._repo is None:
+            self._repo = ModuleRegistryRepository()
+        return self._repo
+
+    def get(self, module_id: str) -> Optional[ModuleContract]:
+        """Returns the module's contract, or None if it isn't registered."""
+        return self.get_many([module_id]).get(module_id)
+
+    def get_many(self, module_ids: Iterable[str]) -> Dict[str, ModuleContract]:
+        """Returns contracts keyed by id; stale or unknown ids cost one $in query in total."""
+        now = time.monotonic()
+        found: Dict[str, ModuleContract] = {}
+        missing = []
+        with self._lock:
+            for module_id in set(module_ids):
+                current = self._current.get(module_id)
+                if current and current[1] > now:
+                    found[module_id] = self._contracts[(module_id, current[0])]
+                else:
+                    missing.append(module_id)
+
+        if missing:
+            modules = self.repo.get_modules(missing)
+            with self._lock:
+                for module_id in missing:
+                    module = modules.get(module_id)
+                    if module:
+                        found[module_id] = self._store(module, now)
+                    else:
+                        self._drop(module_id)
+        return found
+
+    def invalidate(self, module_id: Optional[str] = None):
+        """Forgets one module (or all of them); the next lookup re-reads the registry."""
+        with self._lock:
+            if module_id is None:
+                self._contracts.clear()
+                self._current.clear()
+            else:
+                self._drop(module_id)
+
+    def _store(self, module: Dict[str, Any], now: float) -> ModuleContract:
+        key: Tuple[str, Optional[str]] = (module["_id"], module.get("version_hash"))
+        previous = self._current.get(module["_id"])
+        if previous and previous[0] != key[1]:
+            self._contracts.pop((module["_id"], previous[0]), None)
+
+        contract = self._contracts.get(key)
+        if contract is None:
+            contract = ModuleContract(module)
+            self._contracts[key] = contract
+        else:
+            # Same version: keep the compiled contract, refresh status/exec path
+            contract.module = module
+        self._current[module["_id"]] = (key[1], now + self.ttl)
+        return contract
+
+    def _drop(self, module_id: str):
+        current = self._current.pop(module_id, None)
+        if current:
+            self._contracts.pop((module_id, current[0]), None)
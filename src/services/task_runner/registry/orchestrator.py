@@ -6,7 +6,9 @@ from typing import List, Dict, Any
 from src.shared.database.mongo import ModuleRegistryRepository
 from src.services.task_runner.registry.scanner import ModuleScanner
 from src.services.task_runner.registry.environment_manager import EnvironmentManager
-from src.services.task_runner.registry.runner import ModuleRunner
+from src.services.task_runner.registry.runner import ModuleRunner, result_path_for, legacy_stdout_result
+from src.services.task_runner.registry.contract_cache import ModuleContractCache
+from src.services.task_runner.memo_repository import MemoRepository
 
 class RegistryOrchestrator:
     """
@@ -19,6 +21,8 @@ class RegistryOrchestrator:
         self.scanner = ModuleScanner()
         self.env_manager = EnvironmentManager()
         self.runner = ModuleRunner()
+        self.contracts = ModuleContractCache()
+        self.memo_repo = MemoRepository()
 
     def discover_and_register(self):
         """
@@ -61,10 +65,13 @@ class RegistryOrchestrator:
                     "outputs": module_def.get("outputs", [])
                 }
             })
+            self.contracts.invalidate(module_name)
             needs_install = True
         elif existing_record.get("version_hash") != current_hash:
             print(f"Module changed: {module_name}")
-            self.repo.update_module(module_name, {
+            # Memoized results of the old version can never be hit again
+            self.memo_repo.delete_module(module_name)
+            self._update_module(module_name, {
                 "status": "DETECTED",
                 "version_hash": current_hash,
                 "config": module_def,
@@ -79,16 +86,21 @@ class RegistryOrchestrator:
         if needs_install:
             self._install_module(module_name, full_path)
 
+    def _update_module(self, module_name: str, updates: Dict[str, Any]):
+        # Status/hash changes must be seen by the next task submitted or run
+        self.repo.update_module(module_name, updates)
+        self.contracts.invalidate(module_name)
+
     def _install_module(self, module_name: str, full_path: str):
         print(f"Installing {module_name}...")
-        self.repo.update_module(module_name, {"status": "INSTALLING"})
+        self._update_module(module_name, {"status": "INSTALLING"})
         
         # Create Venv
         success, msg = self.env_manager.create_venv(full_path)
         self.repo.append_log(module_name, f"[Setup] {msg}")
         
         if not success:
-            self.repo.update_module(module_name, {"status": "ERROR"})
+            self._update_module(module_name, {"status": "ERROR"})
             return
 
         # Install Requirements
@@ -98,10 +110,10 @@ class RegistryOrchestrator:
         install_success = self.env_manager.install_requirements(full_path, logger_callback=log_callback)
         
         if install_success:
-            self.repo.update_module(module_name, {"status": "TESTING"})
+            self._update_module(module_name, {"status": "TESTING"})
             self._test_module(module_name, full_path)
         else:
-            self.repo.update_module(module_name, {"status": "ERROR"})
+            self._update_module(module_name, {"status": "ERROR"})
             self.repo.append_log(module_name, "[Setup] Pip installation failed.")
 
     def _test_module(self, module_name: str, full_path: str):
@@ -113,7 +125,7 @@ class RegistryOrchestrator:
         # Test Data as "Payload"
         test_file = os.path.join(full_path, "test_data.json")
         if not os.path.exists(test_file):
-            self.repo.update_module(module_name, {"status": "ERROR"})
+            self._update_module(module_name, {"status": "ERROR"})
             self.repo.append_log(module_name, "[Test] Missing test_data.json")
             return
             
@@ -131,21 +143,24 @@ class RegistryOrchestrator:
             test_manifest = {
                 "mode": "test",
                 "task_id": "TEST_RUN",
-                "inputs": test_payload
+                "inputs": test_payload,
+                "result_path": result_path_for(manifest_path)
             }
             
             with open(manifest_path, 'w') as f:
                 json.dump(test_manifest, f)
                 
         except Exception as e:
-            self.repo.update_module(module_name, {"status": "ERROR"})
+            self._update_module(module_name, {"status": "ERROR"})
             self.repo.append_log(module_name, f"[Test] Failed to create manifest: {e}")
             return
 
+        module_config = (self.repo.get_module(module_name) or {}).get("config", {})
         result = self.runner.run_module(
             python_exec=python_exec,
             script_path=script_path,
-            manifest_path=manifest_path
+            manifest_path=manifest_path,
+            legacy_stdout=legacy_stdout_result(module_config)
         )
 
         # Cleanup Manifest
@@ -159,15 +174,15 @@ class RegistryOrchestrator:
         if result["success"]:
             res_json = result["result"]
             if res_json and res_json.get("status") == "success":
-                self.repo.update_module(module_name, {
+                self._update_module(module_name, {
                     "status": "AVAILABLE",
                     "python_exec": python_exec,
                     "venv_path": self.env_manager.get_venv_path(full_path)
                 })
                 print(f"Module {module_name} is now AVAILABLE.")
             else:
-                self.repo.update_module(module_name, {"status": "ERROR"})
+                self._update_module(module_name, {"status": "ERROR"})
                 self.repo.append_log(module_name, f"[Test] Validation failed. Result: {res_json}")
         else:
-            self.repo.update_module(module_name, {"status": "ERROR"})
+            self._update_module(module_name, {"status": "ERROR"})
             self.repo.append_log(module_name, f"[Test] Execution failed: {result['error']}")
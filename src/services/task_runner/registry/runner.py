@@ -1,7 +1,169 @@
+import os
 import subprocess
 import json
 import logging
-from typing import Dict, Any, Optional
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+class LogBuffer:
+    """
+    Bounded log capture for module output.
+    Keeps only the last `tail_lines` lines in memory and forwards every line,
+    in chunks, to an optional `sink(lines)` (e.g. the task log store) so a
+    chatty module can't grow the engine or the task document without bound.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[Callable[[List[str]], None]] = None,
+        tail_lines: int = 1000,
+        chunk_lines: int = 200,
+        flush_interval: float = 1.0
+    ):
+        self.sink = sink
+        self.chunk_lines = chunk_lines
+        self.flush_interval = flush_interval
+        self._tail = deque(maxlen=tail_lines)
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+
+    def append(self, line: str):
+        self._tail.append(line)
+        if self.sink is None:
+            return
+        self._pending.append(line)
+        if len(self._pending) >= self.chunk_lines or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.sink and self._pending:
+            chunk, self._pending = self._pending, []
+            try:
+                self.sink(chunk)
+            except Exception as e:
+                # Losing a log chunk must never fail the task itself
+                self._tail.append(f"[Runner] Failed to persist log chunk: {e}")
+        self._last_flush = time.monotonic()
+
+    @property
+    def tail(self) -> List[str]:
+        return list(self._tail)
+
+# Seconds a cancelled module gets to exit on SIGTERM before it is SIGKILLed
+CANCEL_GRACE_SECONDS = 5.0
+
+class ModuleCancelled(Exception):
+    """Raised inside a runner when the task's cancel event is set."""
+
+def kill_process_group(process: subprocess.Popen, grace: float = 0.0):
+    """
+    Kills a module started with start_new_session=True together with every
+    process it spawned (ffmpeg, dataloader workers, ...), which share its
+    process group. With `grace`, the group gets SIGTERM first.
+    """
+    def signal_group(sig):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    if grace > 0:
+        signal_group(signal.SIGTERM)
+        try:
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            pass
+    # Even once the leader is gone, children may still hold the group
+    signal_group(signal.SIGKILL)
+    process.wait()
+
+def result_path_for(manifest_path: str) -> str:
+    """
+    Result channel paired with a manifest. The engine passes it to the module
+    as manifest["result_path"]; the module writes one JSON document there.
+    """
+    base, _ = os.path.splitext(manifest_path)
+    return f"{base}.result.json"
+
+def legacy_stdout_result(module_config: Dict[str, Any]) -> bool:
+    """
+    True if the module declares "legacy_stdout_result": true in module.json,
+    i.e. it still prints its result as the last JSON line of stdout instead
+    of writing manifest["result_path"]. Off unless declared.
+    """
+    return module_config.get("legacy_stdout_result") is True
+
+class ModuleResultError(Exception):
+    """The module's result document is missing or unreadable."""
+
+def read_result_file(result_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Reads (and removes) the module's result document, or None if the module
+    didn't write one. Raises ModuleResultError for a truncated or malformed file.
+    """
+    if not os.path.exists(result_path):
+        return None
+    try:
+        with open(result_path, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ModuleResultError(f"Malformed result file: {e}")
+    finally:
+        os.remove(result_path)
+    if not isinstance(data, dict):
+        raise ModuleResultError("Result file does not hold a JSON object")
+    return data
+
+def collect_result(manifest_path: str, logs: List[str], legacy_stdout: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Reads the dedicated result channel. Only modules flagged legacy (see
+    legacy_stdout_result) fall back to scanning the log tail; for every
+    other module a missing result file is an error.
+    """
+    result = read_result_file(result_path_for(manifest_path))
+    if result is not None:
+        return result
+    if legacy_stdout:
+        return extract_result(logs)
+    raise ModuleResultError("Module did not write its result file")
+
+def settle_exit(
+    manifest_path: str,
+    logs: List[str],
+    exit_code: int,
+    legacy_stdout: bool = False
+) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Turns a finished invocation into (success, result, error). A clean exit
+    without a readable result fails the task; it never takes the runner (or
+    a warm worker) down with it.
+    """
+    try:
+        result = collect_result(manifest_path, logs, legacy_stdout)
+    except ModuleResultError as e:
+        if exit_code == 0:
+            return False, None, str(e)
+        result = None
+    if exit_code != 0:
+        return False, result, f"Process exited with code {exit_code}"
+    return True, result, None
+
+def extract_result(lines: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Legacy contract: attempt to extract result from logs (Last valid JSON wins).
+    """
+    for line in reversed(lines):
+        try:
+            possible_json = json.loads(line)
+            if isinstance(possible_json, dict):
+                return possible_json
+        except json.JSONDecodeError:
+            continue
+    return None
 
 class ModuleRunner:
     """
@@ -13,25 +175,41 @@ class ModuleRunner:
         python_exec: str,
         script_path: str,
         manifest_path: str,
-        timeout: int = 300
+        timeout: int = 300,
+        log_sink: Optional[Callable[[List[str]], None]] = None,
+        tail_lines: int = 1000,
+        cancel_event: Optional[threading.Event] = None,
+        legacy_stdout: bool = False
     ) -> Dict[str, Any]:
         """
         Runs the module via CLI using the standardized --manifest argument.
         Command: <python_exec> <script_path> --manifest <manifest_path>
-        
+
+        The module's result is read from manifest["result_path"]
+        (see result_path_for); stdout is treated as plain log text, unless
+        `legacy_stdout` lets a legacy module print its result there.
+
+        Output is streamed: every line goes to `log_sink` in chunks, only the
+        last `tail_lines` are kept in memory. `timeout` is enforced against
+        wall-clock time, even if the module hangs with stdout still open.
+
+        The module runs in its own process group; on timeout or once
+        `cancel_event` is set, the whole group is killed.
+
         Returns:
             Dict containing:
             - success: bool
-            - logs: list of strings (stdout/stderr)
-            - result: parsed JSON result (if any)
+            - logs: list of strings (stdout/stderr), bounded tail
+            - result: parsed result document (if any)
             - error: error message (if any)
         """
         cmd = [python_exec, script_path, "--manifest", manifest_path]
-        
-        logs = []
+
+        logs = LogBuffer(sink=log_sink, tail_lines=tail_lines)
         result_data = None
         success = False
         error_msg = None
+        process = None
 
         try:
             # Run subprocess
@@ -39,43 +217,63 @@ class ModuleRunner:
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT, # Merge stderr into stdout for simple logging
-                text=True
+                text=True,
+                start_new_session=True
             )
 
-            # Capture output
-            for line in process.stdout:
-                line_stripped = line.strip()
-                logs.append(line_stripped)
-                pass
+            # Capture output on a reader thread so the deadline can be enforced here
+            lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+            def pump():
+                for line in process.stdout:
+                    lines.put(line)
+                lines.put(None)
 
-            process.wait(timeout=timeout)
+            threading.Thread(target=pump, daemon=True).start()
 
-            # Attempt to extract result from logs (Last valid JSON wins)
-            for line in reversed(logs):
+            deadline = time.monotonic() + timeout
+            while True:
+                if cancel_event and cancel_event.is_set():
+                    raise ModuleCancelled()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
                 try:
-                    possible_json = json.loads(line)
-                    if isinstance(possible_json, dict):
-                        result_data = possible_json
-                        break
-                except json.JSONDecodeError:
+                    line = lines.get(timeout=min(remaining, logs.flush_interval))
+                except queue.Empty:
+                    logs.flush()
                     continue
+                if line is None:
+                    break
+                logs.append(line.strip())
 
-            if process.returncode == 0:
-                success = True
-            else:
-                error_msg = f"Process exited with code {process.returncode}"
+            process.wait(timeout=max(deadline - time.monotonic(), 0.1))
+
+            success, result_data, error_msg = settle_exit(
+                manifest_path, logs.tail, process.returncode, legacy_stdout
+            )
 
         except subprocess.TimeoutExpired:
-            process.kill()
+            if process:
+                kill_process_group(process)
             error_msg = "Process timed out"
             logs.append(error_msg)
+        except ModuleCancelled:
+            kill_process_group(process, grace=CANCEL_GRACE_SECONDS)
+            error_msg = "Cancelled"
+            logs.append(error_msg)
         except Exception as e:
+            # Whatever failed on our side, nothing the module started may outlive it
+            if process:
+                kill_process_group(process)
             error_msg = f"Execution failed: {str(e)}"
             logs.append(error_msg)
+        finally:
+            logs.flush()
 
         return {
             "success": success,
-            "logs": logs,
+            "logs": logs.tail,
             "result": result_data,
             "error": error_msg
         }
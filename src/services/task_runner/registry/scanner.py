@@ -50,9 +50,45 @@ class ModuleScanner:
                         return None
                     if inp["contract_type"] not in ["ASSET", "VALUE"]:
                         return None
+                    if "inline" in inp and (not isinstance(inp["inline"], bool) or inp["contract_type"] != "VALUE"):
+                        # Only VALUE inputs can be passed inline in the manifest
+                        return None
                         
                 # Extended Validation: Resources (Optional but recommended)
-                # If present, check structure? For now, just ensure it doesn't crash.
+                # The engine's scheduler admits tasks based on these numbers.
+                resources = data.get("resources", {})
+                if not isinstance(resources, dict):
+                    return None
+                for key in ["memory_mb", "cpu"]:
+                    if key in resources:
+                        value = resources[key]
+                        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                            return None
+                if "gpu" in resources and not isinstance(resources["gpu"], bool):
+                    return None
+
+                # Extended Validation: Runtime (Optional)
+                runtime = data.get("runtime", {})
+                if not isinstance(runtime, dict):
+                    return None
+                if runtime.get("mode", "oneshot") not in ["oneshot", "persistent"]:
+                    return None
+
+                # Extended Validation: Batching (Optional)
+                batching = data.get("batching", {})
+                if not isinstance(batching, dict):
+                    return None
+                if "max_batch_size" in batching and (not isinstance(batching["max_batch_size"], int) or batching["max_batch_size"] < 1):
+                    return None
+
+                # Extended Validation: Memoization (Optional, deterministic modules only)
+                memoize = data.get("memoize", {})
+                if not isinstance(memoize, dict):
+                    return None
+                if "enabled" in memoize and not isinstance(memoize["enabled"], bool):
+                    return None
+                if "ttl_seconds" in memoize and (not isinstance(memoize["ttl_seconds"], int) or memoize["ttl_seconds"] < 1):
+                    return None
                     
                 return data
         except Exception:
@@ -0,0 +1,323 @@
+import os
+import json
+import queue
+import subprocess
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from src.services.task_runner.scheduler import ResourceScheduler, normalize_resources
+from src.services.task_runner.registry.runner import (
+    LogBuffer, settle_exit, legacy_stdout_result, kill_process_group, ModuleCancelled, CANCEL_GRACE_SECONDS
+)
+
+# Printed by a serving module on its own line when it finishes a manifest:
+#   __TASK_END__ <exit_code>
+TASK_END_MARKER = "__TASK_END__"
+
+DEFAULT_RUNTIME = {
+    "mode": "oneshot",
+    "pool_size": 1,              # warm idle processes kept per module version
+    "idle_timeout": 300,         # seconds before an idle process is evicted
+    "max_memory_mb": None,       # recycle a process once its RSS exceeds this
+    "max_tasks_per_worker": None # recycle a process after this many tasks
+}
+
+def get_runtime(module_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the module's "runtime" block from module.json merged over defaults.
+    """
+    runtime = dict(DEFAULT_RUNTIME)
+    runtime.update(module_config.get("runtime") or {})
+    return runtime
+
+def _read_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux /proc only)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+class WarmWorker:
+    """
+    A long-lived module process started with `--serve`.
+    Manifests are streamed one per line on stdin as {"manifest": <path>}; the
+    module writes its logs to stdout and ends each task with TASK_END_MARKER.
+    """
+
+    def __init__(self, key: Tuple[str, str], python_exec: str, script_path: str):
+        self.key = key
+        self.tasks_served = 0
+        self.last_used = time.monotonic()
+        # Memory to count against the host budget while idle (declared by the module)
+        self.memory_mb: float = 0.0
+        self.idle_timeout: Optional[float] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        self.process = subprocess.Popen(
+            [python_exec, script_path, "--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=env,
+            start_new_session=True
+        )
+        self._reader = threading.Thread(target=self._pump_stdout, daemon=True)
+        self._reader.start()
+
+    def _pump_stdout(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None) # EOF: process exited
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def rss_mb(self) -> Optional[float]:
+        return _read_rss_mb(self.process.pid)
+
+    @property
+    def hold_key(self) -> str:
+        """Key of this process's memory hold in the ResourceScheduler."""
+        return f"warm:{self.process.pid}"
+
+    def run(
+        self,
+        manifest_path: str,
+        timeout: int,
+        log_sink: Optional[Callable[[List[str]], None]] = None,
+        tail_lines: int = 1000,
+        cancel_event: Optional[threading.Event] = None,
+        legacy_stdout: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Sends one manifest and collects output until the task end marker.
+        Same return shape as ModuleRunner.run_module. A cancelled task takes
+        the warm process (and its process group) down with it.
+        """
+        logs = LogBuffer(sink=log_sink, tail_lines=tail_lines)
+        result_data = None
+        success = False
+        error_msg = None
+
+        try:
+            self.process.stdin.write(json.dumps({"manifest": manifest_path}) + "\n")
+            self.process.stdin.flush()
+
+            deadline = time.monotonic() + timeout
+            exit_code = None
+            while exit_code is None:
+                if cancel_event and cancel_event.is_set():
+                    raise ModuleCancelled()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                try:
+                    line = self._lines.get(timeout=min(remaining, logs.flush_interval))
+                except queue.Empty:
+                    logs.flush()
+                    continue
+
+                if line is None:
+                    raise RuntimeError(f"Worker process exited with code {self.process.wait()}")
+
+                line_stripped = line.strip()
+                if line_stripped.startswith(TASK_END_MARKER):
+                    parts = line_stripped.split()
+                    exit_code = int(parts[1]) if len(parts) > 1 else 0
+                else:
+                    logs.append(line_stripped)
+
+            # A missing or malformed result fails this task, not the warm process
+            success, result_data, error_msg = settle_exit(manifest_path, logs.tail, exit_code, legacy_stdout)
+
+        except TimeoutError:
+            self.kill()
+            error_msg = "Process timed out"
+            logs.append(error_msg)
+        except ModuleCancelled:
+            self.kill(grace=CANCEL_GRACE_SECONDS)
+            error_msg = "Cancelled"
+            logs.append(error_msg)
+        except Exception as e:
+            self.kill()
+            error_msg = f"Execution failed: {str(e)}"
+            logs.append(error_msg)
+        finally:
+            logs.flush()
+            self.tasks_served += 1
+            self.last_used = time.monotonic()
+
+        return {
+            "success": success,
+            "logs": logs.tail,
+            "result": result_data,
+            "error": error_msg
+        }
+
+    def stop(self, grace: float = 5.0):
+        if not self.is_alive():
+            return
+        try:
+            # Closing stdin asks a well-behaved module to exit on its own
+            self.process.stdin.close()
+            self.process.wait(timeout=grace)
+        except Exception:
+            self.kill()
+
+    def kill(self, grace: float = 0.0):
+        kill_process_group(self.process, grace=grace)
+
+class WarmWorkerPool:
+    """
+    Keeps warm module processes per (module_id, version_hash) so interpreter
+    startup and model loading are paid once rather than per task.
+    Processes are evicted when idle too long, recycled when they grow past
+    their memory budget, and dropped when the module version changes.
+
+    With a `scheduler`, the memory of idle processes (their RSS, or the
+    module's declared memory_mb until known) is held against the host's
+    budget, so admission doesn't treat it as free; evict_idle() gives it
+    back, least recently used first, when tasks need it.
+    """
+
+    def __init__(self, scheduler: Optional[ResourceScheduler] = None):
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str], List[WarmWorker]] = {}
+
+    def run_module(
+        self,
+        module: Dict[str, Any],
+        python_exec: str,
+        script_path: str,
+        manifest_path: str,
+        timeout: int = 300,
+        log_sink: Optional[Callable[[List[str]], None]] = None,
+        tail_lines: int = 1000,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        key = (module["_id"], module.get("version_hash", ""))
+        runtime = get_runtime(module.get("config", {}))
+
+        worker = self._acquire(key, python_exec, script_path)
+        worker.memory_mb = normalize_resources(module.get("config", {}).get("resources"))["memory_mb"]
+        result = worker.run(
+            manifest_path, timeout, log_sink=log_sink, tail_lines=tail_lines, cancel_event=cancel_event,
+            legacy_stdout=legacy_stdout_result(module.get("config", {}))
+        )
+        self._release(worker, runtime)
+        return result
+
+    def _acquire(self, key: Tuple[str, str], python_exec: str, script_path: str) -> WarmWorker:
+        stale = []
+        worker = None
+        with self._lock:
+            # A new version of the module invalidates every older warm process
+            for other_key in list(self._idle):
+                if other_key[0] == key[0] and other_key != key:
+                    stale.extend(self._idle.pop(other_key))
+
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate = idle.pop()
+                # Busy now: the task's own reservation covers its memory
+                self._unhold(candidate)
+                if candidate.is_alive():
+                    worker = candidate
+                    break
+                stale.append(candidate)
+
+        for w in stale:
+            self._unhold(w)
+            w.stop()
+
+        if worker is None:
+            print(f"[WarmPool] Starting warm worker for {key[0]}")
+            worker = WarmWorker(key, python_exec, script_path)
+        return worker
+
+    def _release(self, worker: WarmWorker, runtime: Dict[str, Any]):
+        if not worker.is_alive():
+            return
+
+        max_tasks = runtime.get("max_tasks_per_worker")
+        max_memory = runtime.get("max_memory_mb")
+        recycle = bool(max_tasks and worker.tasks_served >= max_tasks)
+        if max_memory:
+            rss = worker.rss_mb()
+            recycle = recycle or (rss is not None and rss > max_memory)
+
+        with self._lock:
+            idle = self._idle.setdefault(worker.key, [])
+            if not recycle and len(idle) < runtime.get("pool_size", 1):
+                worker.idle_timeout = runtime.get("idle_timeout")
+                idle.append(worker)
+                self._hold(worker)
+                return
+
+        print(f"[WarmPool] Recycling warm worker for {worker.key[0]}")
+        worker.stop()
+
+    def evict_idle(self, free_memory_mb: float = 0.0) -> int:
+        """
+        Stops warm processes that have died or been idle past their module's
+        idle_timeout, then, least recently used first, as many idle ones as
+        it takes to free `free_memory_mb` of held memory. Refreshes the
+        memory the remaining ones hold. Returns the number of processes evicted.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = []
+                for w in idle:
+                    if not w.is_alive() or (w.idle_timeout and now - w.last_used > w.idle_timeout):
+                        expired.append(w)
+                    else:
+                        keep.append(w)
+                self._idle[key] = keep
+
+            if free_memory_mb > 0:
+                freed = sum(self._held_mb(w) for w in expired)
+                for w in sorted((w for idle in self._idle.values() for w in idle), key=lambda w: w.last_used):
+                    if freed >= free_memory_mb:
+                        break
+                    self._idle[w.key].remove(w)
+                    expired.append(w)
+                    freed += self._held_mb(w)
+            remaining = [w for idle in self._idle.values() for w in idle]
+
+        for w in expired:
+            self._unhold(w)
+            w.stop()
+        for w in remaining:
+            self._hold(w)
+        return len(expired)
+
+    def shutdown(self):
+        with self._lock:
+            workers = [w for idle in self._idle.values() for w in idle]
+            self._idle = {}
+        for w in workers:
+            self._unhold(w)
+            w.stop()
+
+    def _held_mb(self, worker: WarmWorker) -> float:
+        rss = worker.rss_mb()
+        return rss if rss is not None else worker.memory_mb
+
+    def _hold(self, worker: WarmWorker):
+        if self.scheduler:
+            self.scheduler.hold(worker.hold_key, self._held_mb(worker))
+
+    def _unhold(self, worker: WarmWorker):
+        if self.scheduler:
+            self.scheduler.unhold(worker.hold_key)
@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import Dict, Any, Optional, Callable
+
+# Applied when a module.json does not declare a resource
+DEFAULT_RESOURCES = {"memory_mb": 256, "cpu": 1}
+
+def normalize_resources(declared: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Extracts the schedulable part of a module's "resources" block,
+    filling in defaults for anything not declared.
+    """
+    declared = declared or {}
+    return {
+        "memory_mb": float(declared.get("memory_mb", DEFAULT_RESOURCES["memory_mb"])),
+        "cpu": float(declared.get("cpu", DEFAULT_RESOURCES["cpu"]))
+    }
+
+def detect_host_memory_mb() -> float:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        # Platform without sysconf (Windows): don't constrain on memory
+        return float("inf")
+
+class ResourceScheduler:
+    """
+    Admission control for a single host.
+    Tracks host capacity and the resources reserved by running tasks, and only
+    lets the engine claim a task whose declared resources fit in what is left.
+
+    Idle warm module processes hold memory too (hold()/unhold()). It counts
+    against the budget, but is reclaimable: a task that only fits without
+    it is admitted and the caller's `reclaim` frees the difference.
+    """
+
+    def __init__(self, total_memory_mb: Optional[float] = None, total_cpu: Optional[float] = None):
+        self.total = {
+            "memory_mb": float(total_memory_mb) if total_memory_mb is not None else detect_host_memory_mb(),
+            "cpu": float(total_cpu) if total_cpu is not None else float(os.cpu_count() or 1)
+        }
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, Dict[str, float]] = {}
+        self._held: Dict[str, Dict[str, float]] = {}
+
+    def available(self) -> Dict[str, float]:
+        with self._lock:
+            return self._available()
+
+    def _available(self, include_held: bool = True) -> Dict[str, float]:
+        reserved = list(self._reservations.values()) + (list(self._held.values()) if include_held else [])
+        return {
+            key: self.total[key] - sum(r.get(key, 0.0) for r in reserved)
+            for key in self.total
+        }
+
+    def overcommitted_mb(self) -> float:
+        """Memory in use beyond the host's budget (e.g. warm processes that grew), else 0."""
+        with self._lock:
+            return max(0.0, -self._available()["memory_mb"])
+
+    def hold(self, key: str, memory_mb: float):
+        """Counts memory held outside of tasks (an idle warm process) until unhold(key)."""
+        with self._lock:
+            self._held[key] = {"memory_mb": float(memory_mb)}
+
+    def unhold(self, key: str):
+        with self._lock:
+            self._held.pop(key, None)
+
+    def admit(
+        self,
+        claim_fn: Callable[[Optional[Dict[str, float]]], Optional[Dict[str, Any]]],
+        reclaim: Optional[Callable[[float], Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claims a task that fits the free capacity and reserves its resources.
+        `claim_fn(limits)` must return a task whose "resources" are within
+        `limits`, or None. Claims are serialized per host so two slots can't
+        both grab the last free gigabyte.
+
+        On an idle host no limits are passed, so a task larger than the whole
+        machine still runs (alone) instead of starving forever.
+        With `reclaim`, held memory is given up for a task that needs it:
+        if nothing fits next to it, the claim is retried without it, and
+        `reclaim(memory_mb)` is asked to free whatever the admitted task
+        overcommits (e.g. by evicting idle warm processes).
+        """
+        with self._lock:
+            limits = self._available() if self._reservations else None
+            task = claim_fn(limits)
+            if not task and reclaim and self._held and limits is not None:
+                task = claim_fn(self._available(include_held=False))
+            if task:
+                self._reservations[task["_id"]] = normalize_resources(task.get("resources"))
+        over = self.overcommitted_mb()
+        if task and reclaim and over > 0:
+            reclaim(over)
+        return task
+
+    def release(self, task_id: str) -> bool:
+        with self._lock:
+            return self._reservations.pop(task_id, None) is not None
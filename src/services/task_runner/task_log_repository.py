@@ -0,0 +1,75 @@
+from datetime import datetime
+from itertools import count
+from typing import Dict, Any, List, Optional, Callable
+from pymongo import ASCENDING
+from src.shared.database.mongo import MongoDBConnection
+
+class TaskLogRepository:
+    """
+    Append-only store for module output, kept out of the task documents.
+    Each record is one chunk of lines; a batched invocation writes its
+    chunks once, tagged with every task id in the batch.
+    """
+    COLLECTION_NAME = "task_logs"
+    # Chunks are dropped by a TTL index this long after they were written
+    RETENTION_SECONDS = 14 * 24 * 3600
+    # Most lines a single read returns
+    MAX_PAGE_LINES = 5000
+
+    def __init__(self):
+        self.conn = MongoDBConnection()
+        try:
+            self.conn.db
+        except ConnectionError:
+            self.conn.connect()
+        self.collection = self.conn.db[self.COLLECTION_NAME]
+        self.collection.create_index([("task_ids", ASCENDING), ("seq", ASCENDING)])
+        self.collection.create_index("created_at", expireAfterSeconds=self.RETENTION_SECONDS)
+
+    def append_chunk(self, task_ids: List[str], seq: int, lines: List[str]):
+        self.collection.insert_one({
+            "task_ids": task_ids,
+            "seq": seq,
+            "lines": lines,
+            "created_at": datetime.utcnow()
+        })
+
+    def writer(self, task_ids: List[str]) -> Callable[[List[str]], None]:
+        """
+        Returns a sink for ModuleRunner that appends numbered chunks for these tasks.
+        """
+        seq = count()
+        return lambda lines: self.append_chunk(task_ids, next(seq), lines)
+
+    def get_logs(self, task_id: str, tail: int) -> List[str]:
+        """
+        Returns the last `tail` lines of the task's log in order, reading
+        chunks newest-first until enough lines are collected.
+        """
+        chunks = []
+        collected = 0
+        for chunk in self.collection.find({"task_ids": task_id}, sort=[("seq", -1)]):
+            chunks.append(chunk["lines"])
+            collected += len(chunk["lines"])
+            if collected >= tail:
+                break
+        lines = [line for chunk_lines in reversed(chunks) for line in chunk_lines]
+        return lines[-tail:] if tail else []
+
+    def get_logs_page(self, task_id: str, after_seq: int = -1, max_lines: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reads the task's log forward from the chunk after `after_seq`, whole
+        chunks only, up to `max_lines` (at least one chunk).
+        Returns {"lines", "next_seq", "has_more"}; pass next_seq back as
+        after_seq to continue.
+        """
+        max_lines = min(max_lines or self.MAX_PAGE_LINES, self.MAX_PAGE_LINES)
+        lines: List[str] = []
+        next_seq = after_seq
+        cursor = self.collection.find({"task_ids": task_id, "seq": {"$gt": after_seq}}, sort=[("seq", 1)])
+        for chunk in cursor:
+            if lines and len(lines) + len(chunk["lines"]) > max_lines:
+                return {"lines": lines, "next_seq": next_seq, "has_more": True}
+            lines.extend(chunk["lines"])
+            next_seq = chunk["seq"]
+        return {"lines": lines, "next_seq": next_seq, "has_more": False}
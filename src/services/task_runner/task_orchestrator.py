@@ -1,8 +1,17 @@
 import uuid
+import json
+import hashlib
+from collections import deque
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.dispatcher import TaskDispatcher
+from src.services.task_runner.registry.contract_cache import ModuleContractCache, ModuleContract
+from src.services.task_runner.fair_share import DEFAULT_TENANT
+from src.services.task_runner.memo_repository import MemoRepository
 from src.services.asset_service.manager import AssetManager
 from src.services.asset_service.repository import AssetRepository
+from src.services.asset_service.events import AssetEventBus, AVAILABLE, FAILED, DELETED
 from src.shared.database.mongo import ModuleRegistryRepository
 
 class TaskOrchestrator:
@@ -10,64 +19,93 @@ class TaskOrchestrator:
     The Brain. Validates contracts, manages state, and resolves dependencies.
     """
 
+    # All that input validation needs to know about an asset
+    INPUT_CHECK_FIELDS = ["status", "media_type", "label", "created_by_task"]
+    # ...and what hashing its content for memoization needs on top
+    MEMO_FIELDS = ["type", "value_content", "storage_path", "content_hash"]
+    # Fields a memo hit copies from the cached outputs
+    MEMO_COPY_FIELDS = [
+        "label", "type", "media_type", "value_content", "storage_path",
+        "content_hash", "blob", "size_bytes", "filename", "value_encoding"
+    ]
+    # Pipeline inputs of the form "@<node_key>.<output_key>" refer to another node's output
+    PIPELINE_REF_PREFIX = "@"
+
     def __init__(self):
         self.task_repo = TaskRepository()
         self.asset_manager = AssetManager()
         self.asset_repo = AssetRepository()
         self.registry_repo = ModuleRegistryRepository()
+        self.contracts = ModuleContractCache()
+        self.memo_repo = MemoRepository()
+        self.dispatcher = TaskDispatcher()
+        # Dependency resolution for this process: the first orchestrator
+        # serves the bus; later ones (API, engine, tests) don't displace it
+        AssetEventBus().subscribe("dependencies", self.handle_asset_events, replace=False)
 
-    def validate_and_create_task(self, module_id: str, input_map: Dict[str, str], config: Dict[str, Any] = None) -> Dict[str, Any]:
+    def validate_and_create_task(
+        self,
+        module_id: str,
+        input_map: Dict[str, str],
+        config: Dict[str, Any] = None,
+        priority: int = 0,
+        tenant: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Main Entry Point.
         1. Validates inputs against Module Contract.
         2. Creates PENDING assets for outputs.
         3. Creates Task Record.
         4. Sets status (BLOCKED or QUEUED).
+
+        For modules that opt into memoization, a task whose inputs and
+        config match an earlier successful run is COMPLETED right away with
+        copies of that run's outputs instead of being queued.
         """
-        # 1. Fetch Module Contract
-        module = self.registry_repo.get_module(module_id)
-        if not module:
+        # 1. Fetch Module Contract (cached per module version)
+        contract = self.contracts.get(module_id)
+        if not contract:
             raise ValueError(f"Module {module_id} not found.")
 
-        module_inputs = module.get("config", {}).get("inputs", [])
-        module_outputs = module.get("config", {}).get("outputs", [])
-
         # 2. Validate Inputs & Identify Blockers
         blocking_assets = []
         validated_input_map = {}
 
-        for inp_def in module_inputs:
-            key = inp_def["key"]
-            contract_type = inp_def["contract_type"]
-            input_asset_id = input_map.get(key)
+        for inp_def in contract.inputs:
+            if not input_map.get(inp_def["key"]):
+                raise ValueError(f"Missing required input: {inp_def['key']}")
 
-            if not input_asset_id:
-                raise ValueError(f"Missing required input: {key}")
+        # Check Asset Existence & Status: one $in query for every input
+        memoize = contract.memoize["enabled"]
+        assets = self.asset_repo.get_assets(
+            {input_map[inp_def["key"]] for inp_def in contract.inputs},
+            fields=self.INPUT_CHECK_FIELDS + (self.MEMO_FIELDS if memoize else [])
+        )
 
-            # Check Asset Existence & Status
-            asset = self.asset_repo.get_asset(input_asset_id)
-            if not asset:
-                raise ValueError(f"Input asset {input_asset_id} not found.")
-
-            if asset["status"] == "FAILED":
-                 raise ValueError(f"Input asset {input_asset_id} is FAILED.")
-            
-            # Type Check (Basic Media Type check if applicable)
-            if contract_type == "ASSET":
-                allowed_types = inp_def.get("constraints", {}).get("media_types", [])
-                if allowed_types and asset["media_type"] not in allowed_types:
-                    raise ValueError(f"Asset {asset['label']} type {asset['media_type']} not allowed. Expected: {allowed_types}")
+        for inp_def in contract.inputs:
+            key = inp_def["key"]
+            input_asset_id = input_map[key]
 
-            if asset["status"] == "PENDING":
+            if self._check_input(contract, key, input_asset_id, assets.get(input_asset_id)):
                 blocking_assets.append(input_asset_id)
             
             validated_input_map[key] = input_asset_id
 
+        # Memoized result? Only possible once every input's content exists
+        memo_key = None
+        if memoize and not blocking_assets:
+            memo_key = self._memo_key(contract, validated_input_map, assets, config)
+            memoized = memo_key and self._complete_from_memo(
+                memo_key, contract, validated_input_map, config, priority, tenant
+            )
+            if memoized:
+                return memoized
+
         # 3. Create Output Promises
         task_id = str(uuid.uuid4())
         output_map = {}
         
-        for out_def in module_outputs:
+        for out_def in contract.outputs:
             key = out_def["key"]
             label = out_def.get("label", f"{key}_output")
             media_type = out_def.get("media_type", "application/octet-stream")
@@ -82,47 +120,521 @@ class TaskOrchestrator:
         # 4. Create Task Record
         status = "BLOCKED" if blocking_assets else "QUEUED"
         
-        task_data = {
+        parent_tasks = self._parent_tasks(blocking_assets, assets)
+        task_data = self._task_record(
+            task_id, contract, status, validated_input_map, output_map,
+            blocking_assets, config, priority, tenant, parent_tasks=parent_tasks
+        )
+        if memo_key:
+            # The engine records the outputs under this key once the task succeeds
+            task_data["memo_key"] = memo_key
+        
+        self.task_repo.create_task(task_data)
+        if parent_tasks:
+            # The upstream chain just got longer: re-rank it for the engine
+            self.task_repo.propagate_to_ancestors(parent_tasks, depth=1)
+        if status == "QUEUED":
+            self.dispatcher.notify()
+        elif self._resolve_settled(blocking_assets):
+            # A blocker settled between validation and the insert; its event
+            # found no task to unblock, so resolve it against ours now
+            status = self.task_repo.get_task(task_id)["status"]
+        
+        return {
+            "task_id": task_id,
+            "status": status,
+            "outputs": output_map
+        }
+
+    def create_pipeline(
+        self,
+        nodes: List[Dict[str, Any]],
+        priority: int = 0,
+        tenant: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Creates a whole task graph in one go.
+        Each node is {"key", "module_id", "input_mapping", "config"}; an input
+        is either an existing asset id or "@<node_key>.<output_key>" for the
+        output of another node in the same pipeline.
+
+        The graph is validated as a whole before anything is written (one
+        query for any uncached module contracts, one for the external input assets),
+        then stored with one insert_many for the output promises and one for
+        the tasks.
+
+        Returns {"pipeline_id", "tasks": {<node_key>: {"task_id", "status", "outputs"}}}.
+        """
+        # 1. Index nodes and their dependencies
+        by_key: Dict[str, Dict[str, Any]] = {}
+        for node in nodes:
+            key = node.get("key")
+            if not key:
+                raise ValueError("Every pipeline node needs a key.")
+            if key in by_key:
+                raise ValueError(f"Duplicate pipeline node key: {key}")
+            by_key[key] = node
+        if not by_key:
+            raise ValueError("Pipeline has no nodes.")
+
+        depends_on: Dict[str, set] = {}
+        external_ids = set()
+        for key, node in by_key.items():
+            depends_on[key] = set()
+            for value in (node.get("input_mapping") or {}).values():
+                if value.startswith(self.PIPELINE_REF_PREFIX):
+                    ref_node, _ = self._parse_ref(value)
+                    if ref_node not in by_key:
+                        raise ValueError(f"Node {key} references unknown node {ref_node}.")
+                    depends_on[key].add(ref_node)
+                else:
+                    external_ids.add(value)
+
+        order = self._topological_order(depends_on)
+
+        # 2. Fetch Module Contracts & External Inputs (one query each)
+        contracts = self.contracts.get_many(n["module_id"] for n in by_key.values())
+        assets = self.asset_repo.get_assets(external_ids, fields=self.INPUT_CHECK_FIELDS)
+
+        # 3. Validate & build every record in memory, upstream nodes first
+        pipeline_id = str(uuid.uuid4())
+        node_outputs: Dict[str, Dict[str, str]] = {}
+        new_assets: List[Dict[str, Any]] = []
+        new_tasks: List[Dict[str, Any]] = []
+        created: Dict[str, Dict[str, Any]] = {}
+
+        for key in order:
+            node = by_key[key]
+            try:
+                contract = contracts.get(node["module_id"])
+                if not contract:
+                    raise ValueError(f"Module {node['module_id']} not found.")
+
+                input_map = node.get("input_mapping") or {}
+                blocking_assets = []
+                validated_input_map = {}
+                for inp_def in contract.inputs:
+                    inp_key = inp_def["key"]
+                    value = input_map.get(inp_key)
+                    if not value:
+                        raise ValueError(f"Missing required input: {inp_key}")
+
+                    if value.startswith(self.PIPELINE_REF_PREFIX):
+                        ref_node, out_key = self._parse_ref(value)
+                        input_asset_id = node_outputs[ref_node].get(out_key)
+                        if not input_asset_id:
+                            raise ValueError(f"Node {ref_node} has no output {out_key}.")
+                    else:
+                        input_asset_id = value
+
+                    if self._check_input(contract, inp_key, input_asset_id, assets.get(input_asset_id)):
+                        blocking_assets.append(input_asset_id)
+                    validated_input_map[inp_key] = input_asset_id
+
+            except ValueError as e:
+                raise ValueError(f"Pipeline node {key}: {e}")
+
+            # Create Output Promises
+            task_id = str(uuid.uuid4())
+            output_map = {}
+            for out_def in contract.outputs:
+                out_asset = self.asset_manager.pending_asset_record(
+                    task_id=task_id,
+                    label=out_def.get("label", f"{out_def['key']}_output"),
+                    media_type=out_def.get("media_type", "application/octet-stream")
+                )
+                new_assets.append(out_asset)
+                assets[out_asset["_id"]] = out_asset
+                output_map[out_def["key"]] = out_asset["_id"]
+            node_outputs[key] = output_map
+
+            status = "BLOCKED" if blocking_assets else "QUEUED"
+            task_data = self._task_record(
+                task_id, contract, status, validated_input_map, output_map,
+                blocking_assets, node.get("config"), priority, tenant,
+                parent_tasks=self._parent_tasks(blocking_assets, assets)
+            )
+            task_data["pipeline_id"] = pipeline_id
+            task_data["pipeline_node"] = key
+            new_tasks.append(task_data)
+            created[key] = {"task_id": task_id, "status": status, "outputs": output_map}
+
+        # Critical-path ranks over the whole graph, downstream nodes first
+        task_by_key = {t["pipeline_node"]: t for t in new_tasks}
+        descendants: Dict[str, set] = {key: set() for key in order}
+        for key in reversed(order):
+            task_by_key[key]["descendant_count"] = len(descendants[key])
+            for parent in depends_on[key]:
+                descendants[parent] |= descendants[key] | {key}
+                task_by_key[parent]["downstream_depth"] = max(
+                    task_by_key[parent]["downstream_depth"], task_by_key[key]["downstream_depth"] + 1
+                )
+
+        # 4. Write: promises first, so no task ever points at a missing asset
+        self.asset_repo.create_assets(new_assets)
+        try:
+            self.task_repo.create_tasks(new_tasks)
+        except Exception:
+            self.asset_repo.delete_assets([a["_id"] for a in new_assets])
+            raise
+
+        # Nodes hanging off tasks outside the pipeline extend those chains too
+        internal = {t["_id"] for t in new_tasks}
+        for task in new_tasks:
+            external = [p for p in task["parent_tasks"] if p not in internal]
+            if external:
+                self.task_repo.propagate_to_ancestors(
+                    external, depth=task["downstream_depth"] + 1, added=1 + task["descendant_count"]
+                )
+
+        queued = sum(1 for t in new_tasks if t["status"] == "QUEUED")
+        self.dispatcher.notify(queued)
+
+        # External blockers may have settled while the graph was being built
+        external_blockers = {a for t in new_tasks for a in t["blocking_assets"] if a in external_ids}
+        if self._resolve_settled(list(external_blockers)):
+            statuses = self.task_repo.get_statuses([t["_id"] for t in new_tasks])
+            for key, task in task_by_key.items():
+                created[key]["status"] = statuses.get(task["_id"], created[key]["status"])
+        print(f"[Orchestrator] Pipeline {pipeline_id} created: {len(new_tasks)} tasks, {queued} queued.")
+
+        return {"pipeline_id": pipeline_id, "tasks": created}
+
+    def _memo_key(
+        self,
+        contract: ModuleContract,
+        input_map: Dict[str, str],
+        assets: Dict[str, Dict[str, Any]],
+        config: Optional[Dict[str, Any]]
+    ) -> Optional[str]:
+        """
+        sha256 over the module version, each input's content hash and the
+        canonical task config. Byte-identical inputs uploaded as different
+        assets produce the same key. None if an input has no known hash:
+        files are never read here, on the request path (the engine hashes
+        such inputs once the task has run, so later submissions can hit).
+        """
+        input_hashes = {key: self.asset_manager.known_content_hash(assets[asset_id]) for key, asset_id in input_map.items()}
+        if not all(input_hashes.values()):
+            return None
+
+        payload = {
+            "module_id": contract.module_id,
+            "version_hash": contract.version_hash,
+            "inputs": input_hashes,
+            "config": config or {}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _complete_from_memo(
+        self,
+        memo_key: str,
+        contract: ModuleContract,
+        input_map: Dict[str, str],
+        config: Optional[Dict[str, Any]],
+        priority: int,
+        tenant: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        On a memo hit, creates the task as COMPLETED with copies of the cached
+        outputs (FILE outputs take a reference to the same blob) and returns
+        the usual create result. Returns None on a miss.
+        """
+        entry = self.memo_repo.get_entry(memo_key)
+        cached = self.asset_repo.get_assets(list(entry["outputs"].values())) if entry else {}
+        if entry and not all(
+            cached.get(asset_id, {}).get("status") == "AVAILABLE" for asset_id in entry["outputs"].values()
+        ):
+            # An output was removed or failed since; recompute
+            self.memo_repo.delete(memo_key)
+            entry = None
+
+        # Reference the shared blobs before relying on them: a delete_asset
+        # racing with us may already have collected one, which is a miss
+        blobs = [cached[a]["blob"] for a in entry["outputs"].values() if cached[a].get("blob")] if entry else []
+        taken = self.asset_manager.blobs.acquire(blobs) if blobs else []
+        if len(taken) < len(blobs):
+            for digest in taken:
+                self.asset_manager.blobs.release(digest)
+            self.memo_repo.delete(memo_key)
+            entry = None
+
+        self.memo_repo.record_lookup(contract.module_id, hit=bool(entry))
+        if not entry:
+            return None
+
+        task_id = str(uuid.uuid4())
+        output_map = {}
+        new_assets = []
+        for key, cached_id in entry["outputs"].items():
+            source = cached[cached_id]
+            copy = {field: source.get(field) for field in self.MEMO_COPY_FIELDS}
+            copy.update({
+                "_id": str(uuid.uuid4()),
+                "status": "AVAILABLE",
+                "created_by_task": task_id,
+                "memoized_from": cached_id,
+                "tags": ["task-output", "memoized"]
+            })
+            new_assets.append(copy)
+            output_map[key] = copy["_id"]
+        try:
+            self.asset_repo.create_assets(new_assets)
+        except Exception:
+            for digest in taken:
+                self.asset_manager.blobs.release(digest)
+            raise
+
+        now = datetime.utcnow()
+        task_data = self._task_record(
+            task_id, contract, "COMPLETED", input_map, output_map, [], config, priority, tenant
+        )
+        task_data.update({"memo_key": memo_key, "memo_hit": True, "started_at": now, "finished_at": now})
+        self.task_repo.create_task(task_data)
+        self.memo_repo.touch(memo_key, contract.memoize["ttl_seconds"])
+        print(f"[Orchestrator] Task {task_id} completed from memo ({contract.module_id}).")
+
+        return {
+            "task_id": task_id,
+            "status": "COMPLETED",
+            "outputs": output_map
+        }
+
+    def _parse_ref(self, value: str):
+        """Splits "@<node_key>.<output_key>" into (node_key, output_key)."""
+        node_key, sep, out_key = value[len(self.PIPELINE_REF_PREFIX):].partition(".")
+        if not node_key or not sep or not out_key:
+            raise ValueError(f"Invalid pipeline reference {value!r}, expected '@<node_key>.<output_key>'.")
+        return node_key, out_key
+
+    @staticmethod
+    def _topological_order(depends_on: Dict[str, set]) -> List[str]:
+        """Orders nodes upstream-first; raises if the graph has a cycle."""
+        remaining = {key: len(deps) for key, deps in depends_on.items()}
+        dependents: Dict[str, List[str]] = {key: [] for key in depends_on}
+        for key, deps in depends_on.items():
+            for dep in deps:
+                dependents[dep].append(key)
+
+        ready = deque(key for key, count in remaining.items() if count == 0)
+        order = []
+        while ready:
+            key = ready.popleft()
+            order.append(key)
+            for child in dependents[key]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(depends_on):
+            cyclic = sorted(key for key, count in remaining.items() if count > 0)
+            raise ValueError(f"Pipeline has a dependency cycle between nodes: {cyclic}")
+        return order
+
+    def _task_record(
+        self,
+        task_id: str,
+        contract: ModuleContract,
+        status: str,
+        input_map: Dict[str, str],
+        output_map: Dict[str, str],
+        blocking_assets: List[str],
+        config: Optional[Dict[str, Any]],
+        priority: int,
+        tenant: Optional[str],
+        parent_tasks: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        return {
             "_id": task_id,
-            "module_id": module_id,
+            "module_id": contract.module_id,
             "status": status,
-            "input_map": validated_input_map,
+            "input_map": input_map,
             "output_map": output_map,
             "config": config or {},
+            # Scheduling: higher priority first, fair share across tenants
+            "priority": priority,
+            "tenant": tenant or DEFAULT_TENANT,
+            # Denormalized so the engine can admit tasks without a registry lookup
+            "resources": dict(contract.resources),
             "blocking_assets": blocking_assets,
+            # Critical-path rank: tasks producing our pending inputs, longest
+            # chain of dependents below us, and how many dependents we have
+            "parent_tasks": parent_tasks or [],
+            "downstream_depth": 0,
+            "descendant_count": 0,
             "error_log": None
         }
+
+    @staticmethod
+    def _parent_tasks(blocking_assets: List[str], assets: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Tasks that will produce the still-PENDING inputs."""
+        parents = {assets[a].get("created_by_task") for a in blocking_assets if a in assets}
+        return sorted(p for p in parents if p)
+
+    def _check_input(
+        self,
+        contract: ModuleContract,
+        key: str,
+        input_asset_id: str,
+        asset: Optional[Dict[str, Any]]
+    ) -> bool:
+        """
+        Validates one input asset against the contract entry for `key`.
+        Returns True if the asset is still PENDING (the task must wait for it).
+        """
+        if not asset:
+            raise ValueError(f"Input asset {input_asset_id} not found.")
+
+        if asset["status"] == "FAILED":
+             raise ValueError(f"Input asset {input_asset_id} is FAILED.")
         
-        self.task_repo.create_task(task_data)
-        
+        # Type Check (Basic Media Type check if applicable)
+        allowed_types = contract.allowed_media_types.get(key)
+        if allowed_types and asset["media_type"] not in allowed_types:
+            raise ValueError(f"Asset {asset['label']} type {asset['media_type']} not allowed. Expected: {sorted(allowed_types)}")
+
+        return asset["status"] == "PENDING"
+
+    def cancel_task(self, task_id: str, reason: str = "Cancelled by user") -> Optional[Dict[str, Any]]:
+        """
+        Cancels a BLOCKED, QUEUED or RUNNING task.
+        The task is marked CANCELLED at once; its pending outputs are failed,
+        which fails everything downstream of them. A RUNNING task's engine
+        notices on its next cancel check, kills the module's process group
+        and frees the slot.
+        Returns the updated task, or None if it doesn't exist.
+        Raises ValueError if the task has already finished.
+        """
+        previous = self.task_repo.cancel_task(task_id, reason)
+        if previous is None:
+            task = self.task_repo.get_task(task_id)
+            if task is None:
+                return None
+            raise ValueError(f"Task {task_id} is already {task['status']} and cannot be cancelled.")
+
+        print(f"Task {task_id} cancelled (was {previous['status']}): {reason}")
+        self.asset_manager.fail_pending_assets(
+            list(previous["output_map"].values()), f"Task {task_id} was cancelled: {reason}"
+        )
+        return self.task_repo.get_task(task_id)
+
+    def handle_asset_event(self, event_type: str, asset_id: str, reason: Optional[str] = None):
+        """
+        Triggered when an asset becomes AVAILABLE, FAILED or DELETED.
+        AVAILABLE unblocks tasks waiting for this asset; FAILED and DELETED
+        fail everything downstream of it (see cascade_failure).
+        """
+        self.handle_asset_events([{"type": event_type, "asset_id": asset_id, "reason": reason}])
+
+    def handle_asset_events(self, events: List[Dict[str, Any]]):
+        """
+        Batch form, fed by the AssetEventBus. All AVAILABLE assets of a batch
+        are unblocked with one pair of bulk updates; failures are cascaded
+        once per distinct reason.
+        """
+        available = [e["asset_id"] for e in events if e["type"] == AVAILABLE]
+        lost: Dict[Optional[str], List[str]] = {}
+        for e in events:
+            if e["type"] in (FAILED, DELETED):
+                lost.setdefault(e.get("reason"), []).append(e["asset_id"])
+
+        for reason, asset_ids in lost.items():
+            self.cascade_failure(asset_ids, reason)
+
+        if not available:
+            return
+
+        # Server-side $pullAll + promote: O(1) round trips however many tasks wait
+        promoted = self.task_repo.unblock_assets(available)
+        if promoted:
+            print(f"{promoted} task(s) promoted to QUEUED after {len(available)} asset(s) became available.")
+
+        # Wake idle engine slots right away instead of waiting for their next poll
+        self.dispatcher.notify(promoted)
+
+    def reconcile_blocked(self, after: Optional[str] = None, limit: int = 500) -> Dict[str, Any]:
+        """
+        Durable recovery path for dependency resolution. Events on the
+        AssetEventBus are lost if their process dies before delivery, and
+        never handled in a process without a dependency subscriber; this
+        re-derives them from the stored asset states instead.
+        Sweeps one page of up to `limit` BLOCKED tasks (by _id, after
+        `after`): their AVAILABLE blockers are unblocked, FAILED or missing
+        ones cascaded, through the same handle_asset_events path; tasks of
+        the page left with no blockers are promoted. Idempotent.
+        Returns {"available": a, "lost": l, "promoted": p, "next": <_id to
+        pass as `after` for the next page, or None once the backlog is done>}.
+        """
+        page = self.task_repo.find_blocked_page(after, limit)
+        blockers = sorted({a for t in page for a in t.get("blocking_assets", [])})
+        events = self._resolve_settled(blockers)
+
+        promoted = self.task_repo.promote_unblocked([t["_id"] for t in page if not t.get("blocking_assets")])
+        if promoted:
+            print(f"{promoted} task(s) with no blockers left promoted to QUEUED.")
+            self.dispatcher.notify(promoted)
+
+        available = sum(1 for e in events if e["type"] == AVAILABLE)
         return {
-            "task_id": task_id,
-            "status": status,
-            "outputs": output_map
+            "available": available,
+            "lost": len(events) - available,
+            "promoted": promoted,
+            "next": page[-1]["_id"] if len(page) == limit else None
         }
 
-    def handle_asset_event(self, event_type: str, asset_id: str):
+    def _resolve_settled(self, blockers: List[str]) -> List[Dict[str, Any]]:
         """
-        Triggered when an asset becomes AVAILABLE.
-        Unblocks tasks waiting for this asset.
+        Reads the stored state of `blockers` (one projected query) and feeds
+        an event for every one that has already settled through
+        handle_asset_events: AVAILABLE ones are unblocked, FAILED or missing
+        ones cascaded. Returns the events handled.
         """
-        if event_type != "AVAILABLE":
-            return
+        if not blockers:
+            return []
+        assets = self.asset_repo.get_assets(blockers, fields=["status", "error"])
 
-        blocked_tasks = self.task_repo.find_blocked_tasks_by_asset(asset_id)
-        
-        for task in blocked_tasks:
-            # Remove this asset from blocking list
-            new_blockers = [a for a in task["blocking_assets"] if a != asset_id]
-            
-            updates = {"blocking_assets": new_blockers}
-            
-            # If no more blockers, promote to QUEUED
-            if not new_blockers:
-                updates["status"] = "QUEUED"
-                print(f"Task {task['_id']} promoted to QUEUED.")
-            
-            self.task_repo.update_task(task["_id"], updates)
+        events = []
+        for asset_id in blockers:
+            asset = assets.get(asset_id)
+            if asset is None:
+                events.append({"type": DELETED, "asset_id": asset_id, "reason": f"Asset {asset_id} was deleted"})
+            elif asset["status"] == AVAILABLE:
+                events.append({"type": AVAILABLE, "asset_id": asset_id, "reason": None})
+            elif asset["status"] == FAILED:
+                events.append({"type": FAILED, "asset_id": asset_id, "reason": asset.get("error")})
+        if events:
+            self.handle_asset_events(events)
+        return events
+
+    def cascade_failure(self, asset_ids: List[str], reason: Optional[str] = None) -> Dict[str, int]:
+        """
+        Fails every task that transitively depends on the FAILED `asset_ids`,
+        together with its PENDING outputs, so nothing stays BLOCKED on input
+        that will never arrive.
+        Walks the graph one level at a time with three bulk round trips per
+        level; every record gets the same reason naming the root cause.
+        Returns {"tasks": n, "assets": m}.
+        """
+        roots = ", ".join(asset_ids[:3]) + (f" (+{len(asset_ids) - 3} more)" if len(asset_ids) > 3 else "")
+        cause = f"Upstream asset {roots} failed" + (f": {reason}" if reason else "")
+
+        failed_tasks = 0
+        failed_assets = 0
+        seen = set(asset_ids)
+        frontier = list(asset_ids)
+        while frontier:
+            waiting = self.task_repo.find_blocked_tasks_by_assets(frontier)
+            if not waiting:
+                break
+            failed_tasks += self.task_repo.fail_blocked_tasks([t["_id"] for t in waiting], cause)
+
+            frontier = [a for t in waiting for a in t.get("output_map", {}).values() if a not in seen]
+            seen.update(frontier)
+            failed_assets += self.asset_repo.fail_pending_assets(frontier, cause)
+
+        if failed_tasks:
+            print(f"{failed_tasks} downstream task(s) and {failed_assets} asset(s) FAILED: {cause}")
+        return {"tasks": failed_tasks, "assets": failed_assets}
 
     def get_next_task(self) -> Optional[Dict[str, Any]]:
         return self.task_repo.get_next_queued_task()
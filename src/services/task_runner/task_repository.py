@@ -1,10 +1,22 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
+from pymongo import ASCENDING, ReturnDocument
 from src.shared.database.mongo import MongoDBConnection
+from src.services.task_runner.scheduler import DEFAULT_RESOURCES
 
 class TaskRepository:
     COLLECTION_NAME = "tasks"
+    # How long a claim stays valid without a heartbeat
+    DEFAULT_LEASE_SECONDS = 60
+    # Queue order: higher priority first; within a priority, tasks on the
+    # critical path of a pipeline (longest chain below them, then most
+    # descendants) go first; FIFO otherwise
+    QUEUE_SORT = [("priority", -1), ("downstream_depth", -1), ("descendant_count", -1), ("created_at", 1)]
+    # Guard for the ancestor walk; DAGs are far shallower than this
+    MAX_ANCESTOR_LEVELS = 1000
+    # States a task can still be cancelled from
+    CANCELLABLE_STATUSES = ["CREATED", "BLOCKED", "QUEUED", "RUNNING"]
 
     def __init__(self):
         self.conn = MongoDBConnection()
@@ -13,6 +25,25 @@ class TaskRepository:
         except ConnectionError:
             self.conn.connect()
         self.collection = self.conn.db[self.COLLECTION_NAME]
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        """
+        Index backing the queue pick (status + FIFO order) and the lease reaper.
+        create_index is idempotent, so this is safe to run on every startup.
+        """
+        self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        # Priority pick, and fair-share picks within one priority level
+        self.collection.create_index([("status", ASCENDING)] + [(f, d) for f, d in self.QUEUE_SORT])
+        self.collection.create_index(
+            [("status", ASCENDING), ("priority", ASCENDING), ("tenant", ASCENDING), ("module_id", ASCENDING)]
+            + [(f, d) for f, d in self.QUEUE_SORT[1:]]
+        )
+        # Unblocking: waiters of an asset, and BLOCKED tasks left with no blockers
+        self.collection.create_index([("status", ASCENDING), ("blocking_assets", ASCENDING)])
+        # Reconciliation walks BLOCKED tasks in _id pages
+        self.collection.create_index([("status", ASCENDING), ("_id", ASCENDING)])
 
     def create_task(self, task_data: Dict[str, Any]) -> str:
         """
@@ -26,9 +57,28 @@ class TaskRepository:
         self.collection.insert_one(task_data)
         return task_data["_id"]
 
+    def create_tasks(self, tasks: List[Dict[str, Any]]) -> List[str]:
+        """
+        Inserts several task records in one round trip. Returns their ids.
+        """
+        now = datetime.utcnow()
+        for task_data in tasks:
+            if "_id" not in task_data:
+                task_data["_id"] = str(uuid.uuid4())
+            task_data["created_at"] = now
+            task_data["updated_at"] = now
+        if tasks:
+            self.collection.insert_many(tasks)
+        return [t["_id"] for t in tasks]
+
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         return self.collection.find_one({"_id": task_id})
 
+    def get_statuses(self, task_ids: List[str]) -> Dict[str, str]:
+        """Current status of each of `task_ids` that exists, in one projected query."""
+        cursor = self.collection.find({"_id": {"$in": list(task_ids)}}, {"status": 1})
+        return {t["_id"]: t["status"] for t in cursor}
+
     def update_task(self, task_id: str, updates: Dict[str, Any]):
         updates["updated_at"] = datetime.utcnow()
         self.collection.update_one(
@@ -36,6 +86,46 @@ class TaskRepository:
             {"$set": updates}
         )
 
+    def update_if_running(self, task_id: str, updates: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        """
+        Like update_task, but only while the task is still RUNNING (for
+        `worker_id`, if given), so an engine finishing late can't overwrite a
+        cancellation or a reaper's hand-over to another worker.
+        Returns False if the task had left RUNNING.
+        """
+        updates["updated_at"] = datetime.utcnow()
+        query: Dict[str, Any] = {"_id": task_id, "status": "RUNNING"}
+        if worker_id:
+            query["worker_id"] = worker_id
+        result = self.collection.update_one(query, {"$set": updates})
+        return result.modified_count == 1
+
+    def cancel_task(self, task_id: str, reason: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically moves a not-yet-finished task to CANCELLED.
+        Returns the task as it was before (its status tells whether an engine
+        still has to kill it), or None if it was not cancellable.
+        """
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"_id": task_id, "status": {"$in": self.CANCELLABLE_STATUSES}},
+            {"$set": {
+                "status": "CANCELLED",
+                "error_log": reason,
+                "cancelled_at": now,
+                "finished_at": now,
+                "updated_at": now
+            }},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    def find_cancelled(self, task_ids: List[str]) -> List[str]:
+        """Ids among `task_ids` that have been cancelled (engine cancel check)."""
+        if not task_ids:
+            return []
+        cursor = self.collection.find({"_id": {"$in": task_ids}, "status": "CANCELLED"}, {"_id": 1})
+        return [t["_id"] for t in cursor]
+
     def find_blocked_tasks_by_asset(self, asset_id: str) -> List[Dict[str, Any]]:
         """Finds all BLOCKED tasks waiting for a specific asset."""
         return list(self.collection.find({
@@ -43,9 +133,237 @@ class TaskRepository:
             "blocking_assets": asset_id
         }))
 
+    def find_blocked_tasks_by_assets(self, asset_ids: List[str]) -> List[Dict[str, Any]]:
+        """BLOCKED tasks waiting on any of `asset_ids` (only _id and output_map)."""
+        return list(self.collection.find(
+            {"status": "BLOCKED", "blocking_assets": {"$in": list(asset_ids)}},
+            {"output_map": 1}
+        ))
+
+    def fail_blocked_tasks(self, task_ids: List[str], error: str) -> int:
+        """Marks the still-BLOCKED tasks among `task_ids` FAILED. Returns how many."""
+        now = datetime.utcnow()
+        result = self.collection.update_many(
+            {"_id": {"$in": list(task_ids)}, "status": "BLOCKED"},
+            {"$set": {"status": "FAILED", "error_log": error, "finished_at": now, "updated_at": now}}
+        )
+        return result.modified_count
+
+    def find_blocked_page(self, after: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` BLOCKED tasks with an _id greater than `after`, in _id
+        order (only _id and blocking_assets), for walking the backlog in pages.
+        """
+        query: Dict[str, Any] = {"status": "BLOCKED"}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query, {"blocking_assets": 1}).sort("_id", ASCENDING).limit(limit)
+        return list(cursor)
+
+    def promote_unblocked(self, task_ids: List[str]) -> int:
+        """
+        Promotes the tasks among `task_ids` that are still BLOCKED with no
+        blockers left (e.g. after a crash between unblock_assets' updates).
+        Returns how many.
+        """
+        if not task_ids:
+            return 0
+        result = self.collection.update_many(
+            {"_id": {"$in": list(task_ids)}, "status": "BLOCKED", "blocking_assets": []},
+            {"$set": {"status": "QUEUED", "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    def unblock_assets(self, asset_ids: List[str]) -> int:
+        """
+        Removes `asset_ids` from every BLOCKED task waiting on them, then
+        promotes those of the tasks left with no blockers to QUEUED.
+        Three round trips regardless of fan-out or batch size: the holders
+        are looked up once (ids only) and both updates are scoped to them,
+        so a promotion never scans unrelated BLOCKED tasks. Each document
+        update is atomic, so concurrent events for different assets can't
+        overwrite each other's removals. Returns the number of tasks promoted.
+        """
+        asset_ids = list(asset_ids)
+        holders = [t["_id"] for t in self.collection.find(
+            {"status": "BLOCKED", "blocking_assets": {"$in": asset_ids}}, {"_id": 1}
+        )]
+        if not holders:
+            return 0
+
+        now = datetime.utcnow()
+        self.collection.update_many(
+            {"_id": {"$in": holders}, "status": "BLOCKED"},
+            {"$pullAll": {"blocking_assets": asset_ids}, "$set": {"updated_at": now}}
+        )
+        promoted = self.collection.update_many(
+            {"_id": {"$in": holders}, "status": "BLOCKED", "blocking_assets": []},
+            {"$set": {"status": "QUEUED", "updated_at": now}}
+        )
+        return promoted.modified_count
+
+    def propagate_to_ancestors(self, parent_ids: List[str], depth: int, added: int = 1) -> int:
+        """
+        Keeps critical-path ranks current when new dependents are created.
+        `parent_ids` are the unfinished tasks producing inputs of a new task
+        (or subgraph) whose own downstream_depth is `depth - 1`, and `added`
+        the number of new tasks below them.
+
+        Walks up parent_tasks one level per round trip: an ancestor k levels up
+        gets downstream_depth raised ($max) to depth + k - 1, and every distinct
+        ancestor's descendant_count grows by `added` in one final update.
+        Only BLOCKED/QUEUED tasks are ranked; finished work is not touched.
+        Returns the number of ancestors updated.
+        """
+        unfinished = {"$in": ["BLOCKED", "QUEUED"]}
+        ancestors = set()
+        frontier = set(parent_ids)
+        level = 0
+        while frontier and level < self.MAX_ANCESTOR_LEVELS:
+            self.collection.update_many(
+                {"_id": {"$in": list(frontier)}, "status": unfinished},
+                {"$max": {"downstream_depth": depth + level}}
+            )
+            ancestors.update(frontier)
+            # Only a BLOCKED task still has unfinished parents
+            parents = self.collection.find(
+                {"_id": {"$in": list(frontier)}, "status": "BLOCKED"},
+                {"parent_tasks": 1}
+            )
+            frontier = {p for doc in parents for p in doc.get("parent_tasks", [])}
+            level += 1
+
+        if not ancestors:
+            return 0
+        result = self.collection.update_many(
+            {"_id": {"$in": list(ancestors)}, "status": unfinished},
+            {"$inc": {"descendant_count": added}}
+        )
+        return result.modified_count
+
     def get_next_queued_task(self) -> Optional[Dict[str, Any]]:
         """Returns the oldest QUEUED task (FIFO)."""
         return self.collection.find_one(
             {"status": "QUEUED"},
             sort=[("created_at", 1)]
         )
+
+    def claim_next_task(
+        self,
+        worker_id: str,
+        resource_limits: Optional[Dict[str, float]] = None,
+        module_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        match: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claims the next QUEUED task for a worker
+        (highest priority, then critical path, then oldest; see QUEUE_SORT).
+        The status flip to RUNNING happens in the same operation as the read,
+        so two engines polling the same DB can never pick up the same task.
+
+        If `resource_limits` is given ({"memory_mb": .., "cpu": ..}), only tasks
+        whose declared resources fit are considered, so smaller tasks further
+        back in the queue can skip ahead of one that doesn't fit.
+        `module_id` restricts the claim to one module (used to build batches);
+        `match` adds arbitrary equality filters (used by fair-share picks).
+        The claim carries a lease the worker must renew (renew_leases); once it
+        lapses the reaper can hand the task to someone else.
+        Returns the claimed task (post-update) or None if nothing is claimable.
+        """
+        query: Dict[str, Any] = dict(match or {})
+        query["status"] = "QUEUED"
+        if module_id:
+            query["module_id"] = module_id
+        if resource_limits:
+            query["$and"] = [
+                self._fits_clause(key, limit) for key, limit in resource_limits.items()
+            ]
+
+        now = datetime.utcnow()
+        lease = timedelta(seconds=lease_seconds or self.DEFAULT_LEASE_SECONDS)
+        return self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "RUNNING",
+                    "worker_id": worker_id,
+                    "started_at": now,
+                    "lease_expires_at": now + lease,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=self.QUEUE_SORT,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def top_queued_priority(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"priority": p} for the highest queued priority, or None if the
+        queue is empty. Served from the head of the priority index.
+        """
+        return self.collection.find_one(
+            {"status": "QUEUED"},
+            projection={"_id": 0, "priority": 1},
+            sort=self.QUEUE_SORT
+        )
+
+    def distinct_queued(self, field: str, match: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Distinct values of `field` among QUEUED tasks (index distinct scan)."""
+        query = dict(match or {})
+        query["status"] = "QUEUED"
+        return self.collection.distinct(field, query)
+
+    def renew_leases(self, leases: Dict[str, str], lease_seconds: Optional[float] = None) -> List[str]:
+        """
+        Heartbeat: extends, in a single update, the lease of every task in
+        `leases` ({task_id: worker_id}) that is still RUNNING under one of
+        the listed workers (worker ids are unique per engine). A task that
+        was reaped and re-claimed by another worker, finished or cancelled
+        is left alone. Returns the ids whose lease was renewed.
+        """
+        if not leases:
+            return []
+        now = datetime.utcnow()
+        lease = timedelta(seconds=lease_seconds or self.DEFAULT_LEASE_SECONDS)
+        query = {
+            "_id": {"$in": list(leases)},
+            "status": "RUNNING",
+            "worker_id": {"$in": sorted(set(leases.values()))}
+        }
+        result = self.collection.update_many(query, {"$set": {"lease_expires_at": now + lease}})
+        if result.matched_count == len(leases):
+            return list(leases)
+        # Some leases are no longer ours: tell the caller which ones still are
+        return [t["_id"] for t in self.collection.find(query, {"_id": 1})]
+
+    def find_expired_leases(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """RUNNING tasks whose lease has lapsed (index range scan, no full scan)."""
+        return list(self.collection.find(
+            {"status": "RUNNING", "lease_expires_at": {"$lt": datetime.utcnow()}},
+            sort=[("lease_expires_at", 1)],
+            limit=limit
+        ))
+
+    def release_expired_task(self, task_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Applies `updates` to a task only if its lease is still expired, so a
+        worker that renews at the last moment (or a second reaper) wins the race.
+        """
+        now = datetime.utcnow()
+        updates["updated_at"] = now
+        return self.collection.find_one_and_update(
+            {"_id": task_id, "status": "RUNNING", "lease_expires_at": {"$lt": now}},
+            {"$set": updates, "$unset": {"worker_id": "", "lease_expires_at": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _fits_clause(key: str, limit: float) -> Dict[str, Any]:
+        field = f"resources.{key}"
+        clauses = [{field: {"$lte": limit}}]
+        # Tasks created before resources were recorded fall back to defaults
+        if DEFAULT_RESOURCES.get(key, 0) <= limit:
+            clauses.append({field: {"$exists": False}})
+        return {"$or": clauses}
@@ -42,6 +42,12 @@ class ModuleRegistryRepository:
     def get_module(self, module_id: str) -> Optional[Dict[str, Any]]:
         return self.collection.find_one({"_id": module_id})
 
+    def get_modules(self, module_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches several modules in one query, keyed by id.
+        """
+        return {m["_id"]: m for m in self.collection.find({"_id": {"$in": list(module_ids)}})}
+
     def create_module(self, module_data: Dict[str, Any]):
         """
         Creates a new module record.
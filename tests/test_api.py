@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import hashlib
 import pytest
 from fastapi.testclient import TestClient
 from pathlib import Path
@@ -75,6 +76,142 @@ def test_api_flow():
         if dummy_file.exists():
             dummy_file.unlink()
 
+def test_range_streaming():
+    print("\n--- 1. Upload A Media File ---")
+    payload = os.urandom(2 * 1024 * 1024 + 17)
+    response = client.post(
+        "/assets/upload",
+        files={"file": ("clip.mp4", payload, "video/mp4")},
+        data={"label": "Range Test"}
+    )
+    assert response.status_code == 200
+    asset = response.json()
+    url = f"/assets/{asset['_id']}/stream"
+
+    print("\n--- 2. Full Response Advertises Ranges ---")
+    response = client.get(url)
+    assert response.status_code == 200 and response.content == payload
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    assert etag == f'"{asset["content_hash"]}"', "ETag is the content hash"
+
+    print("\n--- 3. Byte Ranges ---")
+    response = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 1000-1999/{len(payload)}"
+    assert response.content == payload[1000:2000]
+    response = client.get(url, headers={"Range": "bytes=-100"})
+    assert response.status_code == 206 and response.content == payload[-100:]
+    response = client.get(url, headers={"Range": f"bytes={len(payload)}-"})
+    assert response.status_code == 416
+
+    print("\n--- 4. Conditional Requests ---")
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and len(stale.content) == len(payload), "Changed content: send it whole"
+
+    print("\nRANGE STREAMING TEST COMPLETE")
+
+def test_value_endpoint():
+    from src.api.dependencies import get_asset_manager
+    asset_mgr = get_asset_manager()
+    small = {"threshold": 0.8}
+    large = {"segments": [{"start": i, "end": i + 1, "text": "word " * 10} for i in range(2000)]}
+
+    print("--- 1. Inline And Spilled Values Read The Same ---")
+    for value in (small, large, "x" * 100_000):
+        asset_id = asset_mgr.create_value_asset("API Value", value)
+        response = client.get(f"/assets/{asset_id}/value")
+        assert response.status_code == 200
+        assert response.json() == value
+
+    print("\n--- 2. FILE Assets Have No Value ---")
+    upload = client.post("/assets/upload", files={"file": ("v.txt", b"not a value", "text/plain")})
+    assert client.get(f"/assets/{upload.json()['_id']}/value").status_code == 404
+
+    print("\nVALUE ENDPOINT TEST COMPLETE")
+
+def test_pipeline_settled_input():
+    from src.api.dependencies import get_task_orchestrator, get_registry_orchestrator
+    get_registry_orchestrator().discover_and_register()
+    orch = get_task_orchestrator()
+
+    print("--- 1. An External Input Fails While The Pipeline Is Stored ---")
+    upstream_id = orch.asset_manager.create_pending_asset("upstream-api-task", "Upstream", "text/plain")
+    create_tasks = orch.task_repo.create_tasks
+
+    def fail_first(tasks):
+        orch.asset_repo.update_asset(upstream_id, {"status": "FAILED", "error": "Worker crashed"})
+        return create_tasks(tasks)
+
+    orch.task_repo.create_tasks = fail_first
+    try:
+        response = client.post("/pipelines/", json={"nodes": [
+            {"key": "first", "module_id": "test-module-v1", "input_mapping": {"msg": upstream_id}},
+            {"key": "second", "module_id": "test-module-v1", "input_mapping": {"msg": "@first.response"}}
+        ]})
+    finally:
+        orch.task_repo.create_tasks = create_tasks
+
+    print("\n--- 2. The Response Reports The Settled Statuses ---")
+    print(f"Response: {response.status_code} {response.text}")
+    assert response.status_code == 200, "The graph was stored: the response must not turn into a 500"
+    tasks = response.json()["tasks"]
+    assert tasks["first"]["status"] == "FAILED" and tasks["second"]["status"] == "FAILED"
+
+    print("\nPIPELINE SETTLED INPUT TEST COMPLETE")
+
+def test_streaming_upload():
+    from starlette.requests import Request
+    from src.api.dependencies import get_asset_manager
+    blobs = get_asset_manager().blobs
+    payload = os.urandom(3 * 1024 * 1024 + 5)
+    boundary = "streaming-upload-test"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.bin\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + payload + (
+        f"\r\n--{boundary}\r\nContent-Disposition: form-data; name=\"label\"\r\n\r\nStreamed Upload"
+        f"\r\n--{boundary}--\r\n"
+    ).encode()
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+    print("--- 1. The Body Is Never Spooled Through request.form() ---")
+    form = Request.form
+    def spooled(*args, **kwargs):
+        raise AssertionError("The upload must not be parsed into a SpooledTemporaryFile")
+    Request.form = spooled
+    try:
+        response = client.post("/assets/upload", content=body, headers=headers)
+    finally:
+        Request.form = form
+    assert response.status_code == 200, response.text
+    asset = response.json()
+    print(f"Stored {asset['size_bytes']} bytes as {asset['_id']}")
+    assert asset["label"] == "Streamed Upload", "Fields after the file part are read too"
+    assert asset["content_hash"] == hashlib.sha256(payload).hexdigest()
+    assert asset["size_bytes"] == len(payload)
+    assert Path(get_asset_manager().repo.get_asset(asset["_id"])["storage_path"]).read_bytes() == payload
+    assert not list(blobs.tmp_dir.glob("*.part"))
+
+    print("\n--- 2. Bad Bodies Are Rejected Without Leftovers ---")
+    no_file = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"label\"\r\n\r\nNo File\r\n--{boundary}--\r\n"
+    ).encode()
+    assert client.post("/assets/upload", content=no_file, headers=headers).status_code == 422
+    assert client.post("/assets/upload", content=b"raw", headers={"Content-Type": "text/plain"}).status_code == 415
+    truncated = client.post("/assets/upload", content=body[:len(body) // 2], headers=headers)
+    print(f"Truncated body: {truncated.status_code} {truncated.text}")
+    assert truncated.status_code == 400
+    assert not list(blobs.tmp_dir.glob("*.part"))
+
+    print("\nSTREAMING UPLOAD TEST COMPLETE")
+
 if __name__ == "__main__":
     import time
     test_api_flow()
+    test_range_streaming()
+    test_streaming_upload()
+    test_value_endpoint()
+    test_pipeline_settled_input()
@@ -1,5 +1,8 @@
+import io
 import os
+import json
 import sys
+import hashlib
 from pathlib import Path
 
 # Add root to sys.path
@@ -55,14 +58,197 @@ def test_asset_flow():
     )
     print(f"Created Value Asset ID: {value_id}")
     
-    resolved_path = manager.resolve_to_path(value_id)
+    resolved_path = manager.resolve_to_path(value_id, owner="test-asset-flow")
     print(f"Resolved VALUE to path: {resolved_path}")
     if resolved_path and os.path.exists(resolved_path):
         with open(resolved_path, 'r') as f:
             print(f"Content of resolved file: {f.read()}")
-        os.remove(resolved_path) # Cleanup temp file
+    manager.release_inputs("test-asset-flow") # Cleanup materialized file
 
     print("\nASSET MANAGER TEST COMPLETE")
 
+def test_settle_task_outputs():
+    manager = AssetManager()
+    task_id = "test-task-settle"
+
+    print("--- Create Eight Pending Outputs ---")
+    outputs = [manager.create_pending_asset(task_id, f"Output {i}", "text/plain") for i in range(8)]
+    produced = Path(f"temp_output_{task_id}.txt")
+    produced.write_text("file output")
+
+    values = {asset_id: (f"value {i}", False) for i, asset_id in enumerate(outputs[:6])}
+    values[outputs[6]] = (str(produced), True)
+    values[outputs[7]] = ("does/not/exist.txt", True)
+
+    print("\n--- Settle Them In One Bulk Write ---")
+    writes = []
+    bulk_write = manager.repo.collection.bulk_write
+    manager.repo.collection.bulk_write = lambda ops, **kw: writes.append(len(ops)) or bulk_write(ops, **kw)
+    try:
+        failed = manager.settle_task_outputs(task_id, values, {})
+    finally:
+        del manager.repo.collection.bulk_write
+    print(f"Bulk writes: {writes}, failed: {failed}")
+    assert writes == [8], "All outputs should be written by a single bulk_write"
+    assert list(failed) == [outputs[7]] and "Fulfillment failed" in failed[outputs[7]]
+
+    settled = manager.repo.get_assets(outputs)
+    assert [settled[a]["status"] for a in outputs] == ["AVAILABLE"] * 7 + ["FAILED"]
+    assert settled[outputs[0]]["value_content"] == "value 0"
+    assert Path(settled[outputs[6]]["storage_path"]).read_text() == "file output"
+
+    print("\n--- A Late Re-Run With The Same Bytes Gives Its Reference Back ---")
+    digest = settled[outputs[6]]["blob"]
+    refs = manager.blobs.repo.get_blob(digest)["refcount"]
+    produced.write_text("file output")
+    manager.settle_task_outputs(task_id, {outputs[6]: (str(produced), True)}, {})
+    assert manager.repo.get_asset(outputs[6])["settle_id"] == settled[outputs[6]]["settle_id"], "The first settle stands"
+    assert manager.blobs.repo.get_blob(digest)["refcount"] == refs, "No reference may leak"
+    assert manager.events.flush(timeout=10)
+
+    print("\nSETTLE OUTPUTS TEST COMPLETE")
+
+def test_streaming_ingest():
+    manager = AssetManager()
+
+    print("--- Stream An Upload Larger Than One Chunk ---")
+    payload = os.urandom(manager.blobs.CHUNK_SIZE * 3 + 12345)
+    asset_id = manager.ingest_stream(io.BytesIO(payload), "../../clip.bin", "Streamed", "application/octet-stream")
+    asset = manager.repo.get_asset(asset_id)
+    print(f"Stored at {asset['storage_path']} ({asset['size_bytes']} bytes)")
+
+    stored = Path(asset["storage_path"])
+    assert stored == manager.blobs.path_for(asset["content_hash"]), "Client file names are never used as paths"
+    assert asset["filename"] == "clip.bin"
+    assert stored.read_bytes() == payload
+    assert asset["size_bytes"] == len(payload)
+    assert asset["content_hash"] == hashlib.sha256(payload).hexdigest()
+    assert manager.content_hash(asset) == asset["content_hash"], "Hash known at ingest, no re-read"
+    assert not list(manager.blobs.tmp_dir.glob("*.part"))
+
+    print("\nSTREAMING INGEST TEST COMPLETE")
+
+def test_blob_deduplication():
+    manager = AssetManager()
+    payload = os.urandom(4096)
+
+    print("--- Identical Uploads Share One Blob ---")
+    first = manager.ingest_stream(io.BytesIO(payload), "a.bin", "First", "application/octet-stream")
+    second = manager.ingest_stream(io.BytesIO(payload), "b.bin", "Second", "application/octet-stream")
+    a, b = manager.repo.get_asset(first), manager.repo.get_asset(second)
+    digest = a["blob"]
+    print(f"Blob {digest}: {manager.blobs.repo.get_blob(digest)['refcount']} reference(s)")
+    assert a["storage_path"] == b["storage_path"] and b["blob"] == digest
+    assert manager.blobs.repo.get_blob(digest)["refcount"] == 2
+    assert oct(os.stat(a["storage_path"]).st_mode & 0o777) == oct(0o444)
+
+    print("\n--- Known Content Is Registered Without A Transfer ---")
+    third = manager.create_blob_asset(digest, "c.bin", "Third", "application/octet-stream")
+    assert manager.repo.get_asset(third)["size_bytes"] == len(payload)
+    assert manager.blobs.repo.get_blob(digest)["refcount"] == 3
+    try:
+        manager.create_blob_asset("0" * 64, "x.bin", "Unknown", "application/octet-stream")
+        assert False, "Unknown content must be rejected"
+    except ValueError:
+        pass
+
+    print("\n--- The Last Reference Removes The Blob ---")
+    for asset_id in (first, second):
+        manager.delete_asset(asset_id)
+    assert Path(a["storage_path"]).exists()
+    manager.delete_asset(third)
+    assert not Path(a["storage_path"]).exists()
+    assert manager.blobs.repo.get_blob(digest) is None
+    assert manager.events.flush(timeout=10)
+
+    print("\nBLOB DEDUPLICATION TEST COMPLETE")
+
+def test_value_materialization():
+    manager = AssetManager()
+    config_id = manager.create_value_asset("Shared Config", {"threshold": 0.8})
+    big_id = manager.create_value_asset("Big Config", {"rows": ["x" * 100] * 500})
+    task_ids = [f"test-fanout-{i}" for i in range(50)]
+
+    print("--- A Fan-Out Shares One Read-Only File ---")
+    paths = {manager.resolve_to_path(config_id, owner=task_id) for task_id in task_ids}
+    assert len(paths) == 1
+    path = Path(paths.pop())
+    print(f"50 tasks -> {path}")
+    assert path.read_text() == '{"threshold": 0.8}'
+    assert oct(os.stat(path).st_mode & 0o777) == oct(0o444)
+
+    print("\n--- The Last Release Removes It ---")
+    for task_id in task_ids[:-1]:
+        manager.release_inputs(task_id)
+    assert path.exists()
+    assert manager.release_inputs(task_ids[-1]) == 1
+    assert not path.exists()
+
+    print("\n--- A New Content Version Gets A New File ---")
+    first = manager.resolve_to_path(config_id, owner="test-version-a")
+    manager.repo.update_asset(config_id, {"value_content": {"threshold": 0.9}})
+    second = manager.resolve_to_path(config_id, owner="test-version-b")
+    assert first != second and Path(second).read_text() == '{"threshold": 0.9}'
+    manager.release_inputs("test-version-a")
+    manager.release_inputs("test-version-b")
+
+    print("\n--- Small Inline Values Skip The File ---")
+    paths, values = manager.resolve_inputs(
+        {"config": config_id, "big": big_id}, owner="test-inline", inline_keys={"config", "big"}
+    )
+    print(f"Inline: {list(values)}, files: {list(paths)}")
+    assert values == {"config": {"threshold": 0.9}}
+    assert list(paths) == ["big"]
+    assert manager.release_inputs("test-inline") == 1
+    assert manager.materializer.stats() == {"files": 0, "owners": 0}
+
+    print("\nVALUE MATERIALIZATION TEST COMPLETE")
+
+def test_value_spilling():
+    manager = AssetManager(value_spill_bytes=1024)
+    segments = [{"start": i, "end": i + 1} for i in range(200)]
+
+    print("--- Small Values Stay In The Document ---")
+    small_id = manager.create_value_asset("Small", {"threshold": 0.8})
+    small = manager.repo.get_asset(small_id)
+    assert small["value_content"] == {"threshold": 0.8} and not small.get("blob")
+
+    print("\n--- Large Values Spill To The Blob Store ---")
+    large_id = manager.create_value_asset("Segments", segments)
+    large = manager.repo.get_asset(large_id)
+    print(f"Spilled {large['size_bytes']} bytes to {large['storage_path']}")
+    assert large["value_content"] is None and large["blob"]
+    assert manager.load_value(large) == segments
+    assert manager.content_hash(large) == large["blob"]
+
+    print("\n--- Modules Read The Blob Directly ---")
+    path = manager.resolve_to_path(large_id, owner="test-spill")
+    assert path == large["storage_path"]
+    assert json.loads(Path(path).read_text()) == segments
+    manager.release_inputs("test-spill")
+    assert Path(path).exists()
+
+    print("\n--- Large Task Outputs Spill Too ---")
+    outputs = [manager.create_pending_asset("test-task-spill", f"Output {i}", "text/plain") for i in range(2)]
+    manager.settle_task_outputs("test-task-spill", {outputs[0]: ("y" * 5000, False), outputs[1]: ("short", False)}, {})
+    spilled, kept = manager.repo.get_asset(outputs[0]), manager.repo.get_asset(outputs[1])
+    assert spilled["blob"] and manager.load_value(spilled) == "y" * 5000
+    assert Path(spilled["storage_path"]).read_text() == "y" * 5000
+    assert kept["value_content"] == "short" and not kept.get("blob")
+
+    print("\n--- Deleting Releases The Blob ---")
+    for asset_id in (large_id, outputs[0]):
+        stored = manager.repo.get_asset(asset_id)
+        manager.delete_asset(asset_id)
+        assert not Path(stored["storage_path"]).exists()
+    assert manager.events.flush(timeout=10)
+
+    print("\nVALUE SPILLING TEST COMPLETE")
+
 if __name__ == "__main__":
     test_asset_flow()
+    test_settle_task_outputs()
+    test_streaming_ingest()
+    test_blob_deduplication()
+    test_value_materialization()
+    test_value_spilling()
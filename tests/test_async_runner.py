@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Add root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_runner.registry.async_runner import AsyncModuleRunner
+
+HANGING_MODULE = """
+import sys, time
+for i in range(5000):
+    print("line", i)
+sys.stdout.flush()
+time.sleep(60)
+"""
+
+def test_async_supervision():
+    print("--- 1. Write Hanging Module ---")
+    fd, script_path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, 'w') as f:
+        f.write(HANGING_MODULE)
+    manifest_path = os.path.join(tempfile.gettempdir(), "async_runner_test.json")
+    runner = AsyncModuleRunner()
+
+    async def scenario():
+        print("\n--- 2. Timeout With Streamed Logs ---")
+        chunks = []
+        started = time.monotonic()
+        result = await runner.run_module(
+            sys.executable, script_path, manifest_path,
+            timeout=1, log_sink=chunks.append, tail_lines=10
+        )
+        elapsed = time.monotonic() - started
+        print(f"Error: {result['error']} after {elapsed:.1f}s")
+        assert result["success"] is False
+        assert result["error"] == "Process timed out"
+        assert elapsed < 10, "Timeout must be enforced while stdout is still open"
+        assert len(result["logs"]) == 10, "Only the log tail is kept in memory"
+        assert sum(len(c) for c in chunks) >= 5000, "Every line should reach the log sink"
+
+        print("\n--- 3. Cancellation Kills The Process ---")
+        job = asyncio.create_task(runner.run_module(sys.executable, script_path, manifest_path, timeout=60))
+        await asyncio.sleep(0.5)
+        job.cancel()
+        try:
+            await job
+            assert False, "Cancelled run should raise CancelledError"
+        except asyncio.CancelledError:
+            pass
+
+        print("\n--- 4. Many Concurrent Modules On One Loop ---")
+        started = time.monotonic()
+        results = await asyncio.gather(*[
+            runner.run_module(sys.executable, script_path, manifest_path, timeout=1)
+            for _ in range(50)
+        ])
+        elapsed = time.monotonic() - started
+        print(f"50 modules supervised in {elapsed:.1f}s")
+        assert all(r["error"] == "Process timed out" for r in results)
+        assert elapsed < 15, "Modules should be supervised concurrently"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        os.remove(script_path)
+
+    print("\nASYNC RUNNER TEST COMPLETE")
+
+if __name__ == "__main__":
+    test_async_supervision()
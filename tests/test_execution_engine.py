@@ -1,6 +1,9 @@
+import io
 import os
 import sys
 import time
+import tempfile
+import threading
 
 # Add root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -8,6 +11,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.services.task_runner.task_orchestrator import TaskOrchestrator
 from src.services.task_runner.execution_engine import ExecutionEngine
 from src.services.task_runner.registry.orchestrator import RegistryOrchestrator
+from src.services.task_runner.registry.runner import ModuleRunner
+from src.services.task_runner.task_log_repository import TaskLogRepository
 
 def test_full_pipeline():
     print("--- 1. Reset Metadata (Scan Modules) ---")
@@ -78,5 +83,307 @@ def test_full_pipeline():
         print("FAILED: Output asset incorrect")
         sys.exit(1)
 
+def test_memoization():
+    print("--- 1. Enable Memoization For The Test Module ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    reg_orch._update_module("test-module-v1", {"config.memoize": {"enabled": True, "ttl_seconds": 3600}})
+
+    task_orch = TaskOrchestrator()
+    engine = ExecutionEngine()
+    asset_mgr = task_orch.asset_manager
+    before = task_orch.memo_repo.get_stats("test-module-v1")
+
+    try:
+        print("\n--- 2. First Run Computes ---")
+        first_input = asset_mgr.create_value_asset("Memo Input", f"Memo {time.time()}", "text/plain")
+        first = task_orch.validate_and_create_task("test-module-v1", {"msg": first_input})
+        assert first["status"] == "QUEUED"
+        engine.run_once()
+        assert task_orch.task_repo.get_task(first["task_id"])["status"] == "COMPLETED"
+
+        print("\n--- 3. Identical Content Is Served From The Memo ---")
+        content = asset_mgr.repo.get_asset(first_input)["value_content"]
+        second_input = asset_mgr.create_value_asset("Memo Input (re-upload)", content, "text/plain")
+        second = task_orch.validate_and_create_task("test-module-v1", {"msg": second_input})
+        print(f"Second submission: {second['status']}")
+        assert second["status"] == "COMPLETED", "Byte-identical input should hit the memo"
+
+        first_out = asset_mgr.repo.get_asset(first["outputs"]["response"])
+        second_out = asset_mgr.repo.get_asset(second["outputs"]["response"])
+        assert second_out["status"] == "AVAILABLE"
+        assert second_out["value_content"] == first_out["value_content"]
+        assert second_out["_id"] != first_out["_id"], "Hit should get its own output asset"
+
+        print("\n--- 4. A Different Config Misses ---")
+        third = task_orch.validate_and_create_task("test-module-v1", {"msg": second_input}, config={"mode": "other"})
+        assert third["status"] == "QUEUED"
+        engine.run_once()
+
+        stats = task_orch.memo_repo.get_stats("test-module-v1")
+        print(f"Memo stats: {stats}")
+        assert stats["hits"] == before["hits"] + 1
+        assert stats["misses"] == before["misses"] + 2
+    finally:
+        reg_orch._update_module("test-module-v1", {"config.memoize": {"enabled": False}})
+
+    print("\nMEMOIZATION TEST COMPLETE")
+
+def test_memo_references():
+    print("--- 1. Enable Memoization For The Test Module ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    reg_orch._update_module("test-module-v1", {"config.memoize": {"enabled": True, "ttl_seconds": 3600}})
+
+    task_orch = TaskOrchestrator()
+    asset_mgr = task_orch.asset_manager
+    contract = task_orch.contracts.get("test-module-v1")
+
+    def cache_output(input_id):
+        """Records a FILE output in the memo for input_id; returns (memo_key, output)."""
+        assets = task_orch.asset_repo.get_assets([input_id])
+        memo_key = task_orch._memo_key(contract, {"msg": input_id}, assets, None)
+        output_id = asset_mgr.ingest_stream(io.BytesIO(os.urandom(1024)), "out.bin", "Cached", "text/plain")
+        task_orch.memo_repo.store(memo_key, "test-module-v1", contract.version_hash, {"response": output_id}, 3600)
+        return memo_key, asset_mgr.repo.get_asset(output_id)
+
+    try:
+        print("\n--- 2. A Hit References The Cached Blob ---")
+        input_id = asset_mgr.create_value_asset("Memo Ref Input", f"ref {time.time()}", "text/plain")
+        memo_key, output = cache_output(input_id)
+        hit = task_orch.validate_and_create_task("test-module-v1", {"msg": input_id})
+        assert hit["status"] == "COMPLETED"
+        assert asset_mgr.blobs.repo.get_blob(output["blob"])["refcount"] == 2
+
+        print("\n--- 3. A Blob Collected Under Us Is A Miss ---")
+        input_id = asset_mgr.create_value_asset("Memo Ref Input", f"gone {time.time()}", "text/plain")
+        memo_key, output = cache_output(input_id)
+        # As if delete_asset released and collected it after our status check
+        asset_mgr.blobs.repo.collection.delete_one({"_id": output["blob"]})
+        miss = task_orch.validate_and_create_task("test-module-v1", {"msg": input_id})
+        print(f"Submission: {miss['status']}")
+        assert miss["status"] == "QUEUED", "Outputs must never point at a collected blob"
+        assert asset_mgr.blobs.repo.get_blob(output["blob"]) is None, "No reference may be taken on a miss"
+        assert task_orch.memo_repo.get_entry(memo_key) is None
+
+        print("\n--- 4. Unhashed FILE Inputs Are Not Hashed On Submission ---")
+        fd, legacy_path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, 'w') as f:
+            f.write("legacy content")
+        legacy_id = task_orch.asset_repo.create_asset({
+            "label": "Legacy Upload",
+            "status": "AVAILABLE",
+            "type": "FILE",
+            "media_type": "text/plain",
+            "storage_path": legacy_path
+        })
+        queued = task_orch.validate_and_create_task("test-module-v1", {"msg": legacy_id})
+        assert queued["status"] == "QUEUED"
+        assert "memo_key" not in task_orch.task_repo.get_task(queued["task_id"]), "Unhashed input: not memoizable"
+        assert "content_hash" not in task_orch.asset_repo.get_asset(legacy_id)
+
+        print("\n--- 5. ...The Engine Hashes Them Instead ---")
+        assert asset_mgr.hash_file_assets([legacy_id, input_id]) == 1
+        assert task_orch.asset_repo.get_asset(legacy_id)["content_hash"]
+        os.remove(legacy_path)
+        task_orch.task_repo.collection.delete_one({"_id": queued["task_id"]})
+    finally:
+        reg_orch._update_module("test-module-v1", {"config.memoize": {"enabled": False}})
+
+    print("\nMEMO REFERENCES TEST COMPLETE")
+
+def test_persistent_runtime():
+    print("--- 1. Submit Tasks To A Persistent Module ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    task_orch = TaskOrchestrator()
+    engine = ExecutionEngine()
+    task_orch.task_repo.collection.delete_many({"status": "QUEUED"})
+
+    submitted = []
+    for i in range(2):
+        asset_id = task_orch.asset_manager.create_value_asset(f"Warm Input {i}", f"warm {i}", "text/plain")
+        submitted.append(task_orch.validate_and_create_task("test-module-persistent", {"msg": asset_id}))
+
+    try:
+        print("\n--- 2. Both Run In The Same Warm Process ---")
+        assert engine.run_once() and engine.run_once()
+        for i, info in enumerate(submitted):
+            task = task_orch.task_repo.get_task(info["task_id"])
+            output = task_orch.asset_repo.get_asset(info["outputs"]["response"])
+            print(f"Task {i}: {task['status']} -> {output.get('value_content')}")
+            assert task["status"] == "COMPLETED"
+            assert output["value_content"] == f"Echo: warm {i}"
+        module = task_orch.registry_repo.get_module("test-module-persistent")
+        idle = engine.warm_pool._idle[(module["_id"], module["version_hash"])]
+        assert len(idle) == 1, "The engine should keep (and reuse) one warm process"
+    finally:
+        engine.warm_pool.shutdown()
+
+    print("\nPERSISTENT RUNTIME TEST COMPLETE")
+
+def test_batching():
+    print("--- 1. Queue Batched And Unbatched Tasks ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    task_orch = TaskOrchestrator()
+    engine = ExecutionEngine()
+    task_orch.task_repo.collection.delete_many({"status": "QUEUED"})
+
+    def submit(module_id, msg, priority=0):
+        asset_id = task_orch.asset_manager.create_value_asset(f"Batch Input {msg}", msg, "text/plain")
+        return task_orch.validate_and_create_task(module_id, {"msg": asset_id}, priority=priority)
+
+    batched = [submit("test-module-batched", msg) for msg in ("one", "two", "bad", "four")]
+    # Another module's task, queued behind the batch, must not be pulled in
+    other = submit("test-module-v1", "other", priority=-1)
+
+    print("\n--- 2. One Invocation Runs The Whole Batch ---")
+    assert engine.run_once()
+    other_task = task_orch.task_repo.get_task(other["task_id"])
+    print(f"Other module's task: {other_task['status']}")
+    assert other_task["status"] == "QUEUED", "Only tasks of the same module are batched"
+
+    print("\n--- 3. Results Are Split Per Task ---")
+    for info, msg in zip(batched, ("one", "two", "bad", "four")):
+        task = task_orch.task_repo.get_task(info["task_id"])
+        output = task_orch.asset_repo.get_asset(info["outputs"]["response"])
+        print(f"{msg}: {task['status']} -> {output.get('value_content') or output.get('error')}")
+        if msg == "bad":
+            assert task["status"] == "FAILED" and "Refusing bad input" in task["error_log"]
+            assert output["status"] == "FAILED"
+        else:
+            assert task["status"] == "COMPLETED"
+            assert output["value_content"] == f"Echo: {msg} (batch of 4)"
+
+    print("\n--- 4. Nothing Left To Batch: A Single Run ---")
+    assert engine.run_once()
+    assert task_orch.task_repo.get_task(other["task_id"])["status"] == "COMPLETED"
+
+    print("\nBATCHING TEST COMPLETE")
+
+SPAWNING_MODULE = """
+import subprocess, sys, time
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+print("child", child.pid, flush=True)
+time.sleep(60)
+"""
+
+def test_cancellation():
+    print("--- 1. Cancelling A Run Kills The Whole Process Group ---")
+    fd, script_path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, 'w') as f:
+        f.write(SPAWNING_MODULE)
+    manifest_path = os.path.join(tempfile.gettempdir(), "cancel_test.json")
+    cancel = threading.Event()
+    lines = []
+
+    def sink(chunk):
+        lines.extend(chunk)
+        if any(line.startswith("child") for line in lines):
+            cancel.set()
+
+    try:
+        started = time.monotonic()
+        result = ModuleRunner().run_module(
+            sys.executable, script_path, manifest_path, timeout=30, log_sink=sink, cancel_event=cancel
+        )
+    finally:
+        os.remove(script_path)
+    child_pid = int(next(line for line in lines if line.startswith("child")).split()[1])
+    print(f"Result: {result['error']} after {time.monotonic() - started:.1f}s, child {child_pid}")
+    assert result["error"] == "Cancelled"
+
+    deadline = time.monotonic() + 5
+    while os.path.exists(f"/proc/{child_pid}") and time.monotonic() < deadline:
+        with open(f"/proc/{child_pid}/stat") as f:
+            if f.read().split(")")[-1].split()[0] == "Z":
+                break
+        time.sleep(0.1)
+    alive = os.path.exists(f"/proc/{child_pid}") and open(f"/proc/{child_pid}/stat").read().split(")")[-1].split()[0] != "Z"
+    assert not alive, "Processes spawned by the module must die with it"
+
+    print("\n--- 2. Cancelling A Blocked Task Fails Its Subgraph ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    task_orch = TaskOrchestrator()
+    engine = ExecutionEngine(orchestrator=task_orch)
+    root_id = task_orch.asset_manager.create_pending_asset("upstream-task-005", "Root", "text/plain")
+    pipeline = task_orch.create_pipeline([
+        {"key": "a", "module_id": "test-module-v1", "input_mapping": {"msg": root_id}},
+        {"key": "b", "module_id": "test-module-v1", "input_mapping": {"msg": "@a.response"}}
+    ])
+    a, b = pipeline["tasks"]["a"], pipeline["tasks"]["b"]
+
+    cancelled = task_orch.cancel_task(a["task_id"])
+    assert cancelled["status"] == "CANCELLED"
+    assert task_orch.asset_manager.events.flush(timeout=10)
+    assert task_orch.asset_repo.get_asset(a["outputs"]["response"])["status"] == "FAILED"
+    downstream = task_orch.task_repo.get_task(b["task_id"])
+    print(f"Downstream: {downstream['status']} ({downstream['error_log']})")
+    assert downstream["status"] == "FAILED"
+    try:
+        task_orch.cancel_task(b["task_id"])
+        assert False, "A finished task can't be cancelled"
+    except ValueError:
+        pass
+    assert task_orch.cancel_task("no-such-task") is None
+
+    print("\n--- 3. The Engine Notices A Running Task Was Cancelled ---")
+    input_id = task_orch.asset_manager.create_value_asset("Cancel Input", "hello", "text/plain")
+    queued = task_orch.validate_and_create_task("test-module-v1", {"msg": input_id}, priority=100)
+    task = engine._claim_task()
+    assert task["_id"] == queued["task_id"]
+    run = engine._register_run({"module": {"_id": task["module_id"]}, "task_ids": [task["_id"]]})
+
+    task_orch.cancel_task(task["_id"])
+    engine._check_cancellations([task["_id"]])
+    assert run["cancel"].is_set(), "Heartbeat check should signal the running module"
+    engine._unregister_run(run)
+    engine._release_task(task)
+    assert task_orch.task_repo.get_task(task["_id"])["status"] == "CANCELLED"
+    assert not engine.task_repo.update_if_running(task["_id"], {"status": "COMPLETED"}), \
+        "A late finish must not overwrite the cancellation"
+
+    print("\nCANCELLATION TEST COMPLETE")
+
+def test_log_store_paging():
+    print("--- 1. Write 10 Chunks Of 100 Lines ---")
+    log_repo = TaskLogRepository()
+    task_id = f"log-test-{time.time_ns()}"
+    sink = log_repo.writer([task_id])
+    for c in range(10):
+        sink([f"line {c * 100 + i}" for i in range(100)])
+    everything = [f"line {i}" for i in range(1000)]
+
+    print("\n--- 2. Bounded Tail ---")
+    assert log_repo.get_logs(task_id, tail=150) == everything[-150:]
+    assert log_repo.get_logs(task_id, tail=0) == []
+
+    print("\n--- 3. Page Through The Whole Log ---")
+    pages = []
+    after_seq = -1
+    while True:
+        page = log_repo.get_logs_page(task_id, after_seq=after_seq, max_lines=250)
+        pages.append(page["lines"])
+        after_seq = page["next_seq"]
+        if not page["has_more"]:
+            break
+    print(f"Page sizes: {[len(p) for p in pages]}")
+    assert all(len(p) <= 250 for p in pages), "Pages hold whole chunks up to max_lines"
+    assert [line for p in pages for line in p] == everything
+
+    print("\n--- 4. Logs Expire ---")
+    ttl = [i for i in log_repo.collection.index_information().values() if "expireAfterSeconds" in i]
+    assert ttl and ttl[0]["key"] == [("created_at", 1)]
+
+    print("\nLOG STORE TEST COMPLETE")
+
 if __name__ == "__main__":
     test_full_pipeline()
+    test_memoization()
+    test_memo_references()
+    test_persistent_runtime()
+    test_batching()
+    test_cancellation()
+    test_log_store_paging()
@@ -1,13 +1,16 @@
 import os
 import sys
 import time
+import threading
 from pathlib import Path
 
 # Add root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.services.task_runner.task_orchestrator import TaskOrchestrator
+from src.services.task_runner.dispatcher import TaskDispatcher
 from src.services.task_runner.registry.orchestrator import RegistryOrchestrator
+from src.services.asset_service.events import AssetEventBus
 
 def test_orchestrator_flow():
     print("--- 1. Setup Support Systems ---")
@@ -104,5 +107,373 @@ def test_orchestrator_flow():
     if os.path.exists("temp_upstream_video.mp4"):
         os.remove("temp_upstream_video.mp4")
 
+def test_pipeline_submission():
+    print("--- 1. Setup Support Systems ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+
+    task_orch = TaskOrchestrator()
+    source_id = task_orch.asset_manager.create_value_asset(
+        label="Pipeline Source",
+        value="Hello from Pipeline",
+        media_type="text/plain"
+    )
+
+    print("\n--- 2. Submit 3-Step Chain (Listed Out Of Order) ---")
+    pipeline = task_orch.create_pipeline([
+        {"key": "third", "module_id": "test-module-v1", "input_mapping": {"msg": "@second.response"}},
+        {"key": "first", "module_id": "test-module-v1", "input_mapping": {"msg": source_id}},
+        {"key": "second", "module_id": "test-module-v1", "input_mapping": {"msg": "@first.response"}}
+    ])
+    tasks = pipeline["tasks"]
+    print(f"Pipeline {pipeline['pipeline_id']}: {[(k, v['status']) for k, v in tasks.items()]}")
+
+    assert tasks["first"]["status"] == "QUEUED"
+    assert tasks["second"]["status"] == "BLOCKED"
+    assert tasks["third"]["status"] == "BLOCKED"
+
+    second = task_orch.task_repo.get_task(tasks["second"]["task_id"])
+    assert second["input_map"]["msg"] == tasks["first"]["outputs"]["response"], "Reference should resolve to the upstream output"
+    assert second["pipeline_id"] == pipeline["pipeline_id"]
+
+    print("\n--- 3. Reject Cycles Without Writing Anything ---")
+    before = task_orch.task_repo.collection.count_documents({})
+    try:
+        task_orch.create_pipeline([
+            {"key": "a", "module_id": "test-module-v1", "input_mapping": {"msg": "@b.response"}},
+            {"key": "b", "module_id": "test-module-v1", "input_mapping": {"msg": "@a.response"}}
+        ])
+        assert False, "Cyclic pipeline should be rejected"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    assert task_orch.task_repo.collection.count_documents({}) == before
+
+    print("\nPIPELINE TEST COMPLETE")
+
+def test_concurrent_unblocking():
+    print("--- 1. Create Fan-Out Waiting On Two Assets ---")
+    task_orch = TaskOrchestrator()
+    asset_a = task_orch.asset_manager.create_pending_asset("upstream-a", "A", "text/plain")
+    asset_b = task_orch.asset_manager.create_pending_asset("upstream-b", "B", "text/plain")
+    task_ids = [
+        task_orch.task_repo.create_task({
+            "module_id": "test-module-v1",
+            "status": "BLOCKED",
+            "input_map": {},
+            "output_map": {},
+            "config": {},
+            "blocking_assets": [asset_a, asset_b]
+        })
+        for _ in range(100)
+    ]
+
+    print("\n--- 2. Fire Both Asset Events Concurrently ---")
+    events = [
+        threading.Thread(target=task_orch.handle_asset_event, args=("AVAILABLE", asset_id))
+        for asset_id in (asset_a, asset_b)
+    ]
+    for event in events:
+        event.start()
+    for event in events:
+        event.join()
+
+    tasks = [task_orch.task_repo.get_task(t) for t in task_ids]
+    statuses = {t["status"] for t in tasks}
+    print(f"Statuses after both events: {statuses}")
+    assert statuses == {"QUEUED"}, "No task may stay BLOCKED once all its inputs are available"
+    assert all(t["blocking_assets"] == [] for t in tasks)
+
+    print("\nUNBLOCKING TEST COMPLETE")
+
+def test_failure_cascade():
+    print("--- 1. Submit Pipeline With A Pending Root ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+
+    task_orch = TaskOrchestrator()
+    root_id = task_orch.asset_manager.create_pending_asset("upstream-task-002", "Root", "text/plain")
+    pipeline = task_orch.create_pipeline([
+        {"key": "a", "module_id": "test-module-v1", "input_mapping": {"msg": root_id}},
+        {"key": "b1", "module_id": "test-module-v1", "input_mapping": {"msg": "@a.response"}},
+        {"key": "b2", "module_id": "test-module-v1", "input_mapping": {"msg": "@a.response"}},
+        {"key": "c", "module_id": "test-module-v1", "input_mapping": {"msg": "@b2.response"}}
+    ])
+    tasks = pipeline["tasks"]
+
+    print("\n--- 2. Fail The Root Asset ---")
+    task_orch.asset_manager.fail_asset(root_id, "Upstream crashed")
+    task_orch.handle_asset_event("FAILED", root_id, reason="Upstream crashed")
+
+    print("\n--- 3. Verify Whole Subgraph Failed With Root Cause ---")
+    for key, info in tasks.items():
+        task = task_orch.task_repo.get_task(info["task_id"])
+        output = task_orch.asset_repo.get_asset(info["outputs"]["response"])
+        print(f"{key}: {task['status']} / {output['status']} ({task['error_log']})")
+        assert task["status"] == "FAILED"
+        assert output["status"] == "FAILED"
+        assert root_id in task["error_log"] and "Upstream crashed" in task["error_log"]
+
+    print("\nFAILURE CASCADE TEST COMPLETE")
+
+def test_asset_event_bus():
+    print("--- 1. Block Tasks On Pending Assets ---")
+    task_orch = TaskOrchestrator()
+    bus = AssetEventBus()
+    before = bus.metrics.snapshot()["events"]
+    ready_id = task_orch.asset_manager.create_pending_asset("upstream-task-003", "Ready", "text/plain")
+    lost_id = task_orch.asset_manager.create_pending_asset("upstream-task-004", "Lost", "text/plain")
+    waiting = [
+        task_orch.task_repo.create_task({
+            "module_id": "test-module-v1",
+            "status": "BLOCKED",
+            "input_map": {},
+            "output_map": {},
+            "config": {},
+            "blocking_assets": [asset_id]
+        })
+        for asset_id in (ready_id, lost_id)
+    ]
+
+    print("\n--- 2. Publish Through The AssetManager Only ---")
+    task_orch.asset_manager.fulfill_asset(ready_id, value="done", is_path=False)
+    task_orch.asset_manager.delete_asset(lost_id)
+    assert bus.flush(timeout=10), "Events should be delivered"
+
+    ready_task, lost_task = [task_orch.task_repo.get_task(t) for t in waiting]
+    print(f"Statuses: {ready_task['status']} / {lost_task['status']} ({lost_task.get('error_log')})")
+    assert ready_task["status"] == "QUEUED", "Subscriber should unblock without an explicit handle_asset_event"
+    assert lost_task["status"] == "FAILED" and lost_id in lost_task["error_log"]
+
+    after = bus.metrics.snapshot()
+    print(f"Bus metrics: {after}")
+    assert after["events"]["AVAILABLE"] >= before.get("AVAILABLE", 0) + 1
+    assert after["events"]["DELETED"] >= before.get("DELETED", 0) + 1
+
+    print("\n--- 3. More Orchestrators Don't Displace The Subscriber ---")
+    handler = bus._subscribers["dependencies"][0]
+    TaskOrchestrator()
+    TaskOrchestrator()
+    assert bus._subscribers["dependencies"][0] == handler, "One dependency subscriber per process"
+
+    print("\nASSET EVENT BUS TEST COMPLETE")
+
+def test_blocked_reconciliation():
+    print("--- 1. Block Tasks On Assets Whose Events Never Arrive ---")
+    task_orch = TaskOrchestrator()
+    ready_id = task_orch.asset_manager.create_pending_asset("upstream-task-005", "Ready", "text/plain")
+    failed_id = task_orch.asset_manager.create_pending_asset("upstream-task-006", "Failed", "text/plain")
+    lost_id = task_orch.asset_manager.create_pending_asset("upstream-task-007", "Lost", "text/plain")
+    waiting = [
+        task_orch.task_repo.create_task({
+            "module_id": "test-module-v1",
+            "status": "BLOCKED",
+            "input_map": {},
+            "output_map": {},
+            "config": {},
+            "blocking_assets": [asset_id]
+        })
+        for asset_id in (ready_id, failed_id, lost_id)
+    ]
+
+    print("\n--- 2. Settle The Assets Behind The Bus's Back ---")
+    # As if the publishing process died before delivery
+    task_orch.asset_repo.update_asset(ready_id, {"status": "AVAILABLE", "type": "VALUE", "value_content": "done"})
+    task_orch.asset_repo.update_asset(failed_id, {"status": "FAILED", "error": "Worker crashed"})
+    task_orch.asset_repo.delete_asset(lost_id)
+
+    print("\n--- 3. Sweep In Pages ---")
+    pages, after = 0, None
+    while True:
+        swept = task_orch.reconcile_blocked(after, limit=1)
+        pages += 1
+        after = swept["next"]
+        if after is None:
+            break
+    print(f"Swept {pages} page(s)")
+    assert pages > len(waiting), "One BLOCKED task per page, then an empty one"
+    ready_task, failed_task, lost_task = [task_orch.task_repo.get_task(t) for t in waiting]
+    assert ready_task["status"] == "QUEUED"
+    assert failed_task["status"] == "FAILED" and "Worker crashed" in failed_task["error_log"]
+    assert lost_task["status"] == "FAILED" and lost_id in lost_task["error_log"]
+
+    print("\n--- 4. Sweeping Again Changes Nothing ---")
+    task_orch.reconcile_blocked()
+    assert task_orch.task_repo.get_task(waiting[0])["status"] == "QUEUED"
+
+    print("\nRECONCILIATION TEST COMPLETE")
+
+def test_unblock_race():
+    print("--- 1. Setup Support Systems ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    task_orch = TaskOrchestrator()
+
+    print("\n--- 2. Promotion Only Touches The Tasks Just Unblocked ---")
+    asset_id = task_orch.asset_manager.create_pending_asset("upstream-task-008", "Scoped", "text/plain")
+    waiting, stray = [
+        task_orch.task_repo.create_task({
+            "module_id": "test-module-v1",
+            "status": "BLOCKED",
+            "input_map": {},
+            "output_map": {},
+            "config": {},
+            "blocking_assets": blockers
+        })
+        for blockers in ([asset_id], [])
+    ]
+    assert task_orch.task_repo.unblock_assets([asset_id]) == 1
+    assert task_orch.task_repo.get_task(waiting)["status"] == "QUEUED"
+    assert task_orch.task_repo.get_task(stray)["status"] == "BLOCKED", "Left for the reconciliation sweep"
+    task_orch.task_repo.promote_unblocked([stray])
+
+    print("\n--- 3. An Input Settles Between Validation And Insert ---")
+    racing_id = task_orch.asset_manager.create_pending_asset("upstream-task-009", "Racing", "text/plain")
+    create_task = task_orch.task_repo.create_task
+
+    def settle_first(task_data):
+        # The upstream task finishes and its event is handled before our insert lands
+        task_orch.asset_repo.update_asset(racing_id, {"status": "AVAILABLE", "type": "VALUE", "value_content": "done"})
+        task_orch.handle_asset_events([{"type": "AVAILABLE", "asset_id": racing_id, "reason": None}])
+        return create_task(task_data)
+
+    task_orch.task_repo.create_task = settle_first
+    try:
+        res = task_orch.validate_and_create_task("test-module-v1", {"msg": racing_id})
+    finally:
+        task_orch.task_repo.create_task = create_task
+    print(f"Created as {res['status']}")
+    task = task_orch.task_repo.get_task(res["task_id"])
+    assert res["status"] == "QUEUED" and task["status"] == "QUEUED", "The task must not wait for an event that already fired"
+    assert task["blocking_assets"] == []
+
+    print("\nUNBLOCK RACE TEST COMPLETE")
+
+def test_dispatcher_wakeup():
+    print("--- 1. Setup Support Systems ---")
+    reg_orch = RegistryOrchestrator(modules_root="modules")
+    reg_orch.discover_and_register()
+    task_orch = TaskOrchestrator()
+    dispatcher = TaskDispatcher()
+    source_id = task_orch.asset_manager.create_value_asset(label="Wake Source", value="Hello", media_type="text/plain")
+    AssetEventBus().flush()
+
+    def wait_in_background(since):
+        woke = {}
+        def wait():
+            start = time.time()
+            woke["signalled"] = dispatcher.wait_for_work(since, timeout=30)
+            woke["after"] = time.time() - start
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.2)
+        return waiter, woke
+
+    print("\n--- 2. A New QUEUED Task Wakes An Idle Slot ---")
+    waiter, woke = wait_in_background(dispatcher.generation)
+    assert waiter.is_alive(), "Nothing queued yet: the slot must still be waiting"
+    res = task_orch.validate_and_create_task("test-module-v1", {"msg": source_id})
+    waiter.join(timeout=5)
+    print(f"Woke after {woke.get('after', 0):.2f}s")
+    assert res["status"] == "QUEUED"
+    assert woke["signalled"] and woke["after"] < 5, "The slot is woken by the signal, not by its poll timeout"
+
+    print("\n--- 3. So Does A BLOCKED Task Being Promoted ---")
+    pending_id = task_orch.asset_manager.create_pending_asset("upstream-task-010", "Wake", "text/plain")
+    blocked = task_orch.validate_and_create_task("test-module-v1", {"msg": pending_id})
+    assert blocked["status"] == "BLOCKED"
+    waiter, woke = wait_in_background(dispatcher.generation)
+    task_orch.asset_repo.update_asset(pending_id, {"status": "AVAILABLE", "type": "VALUE", "value_content": "done"})
+    task_orch.handle_asset_events([{"type": "AVAILABLE", "asset_id": pending_id, "reason": None}])
+    waiter.join(timeout=5)
+    assert woke["signalled"] and woke["after"] < 5
+    assert task_orch.task_repo.get_task(blocked["task_id"])["status"] == "QUEUED"
+
+    print("\n--- 4. A Signal Between Reading The Generation And Waiting Isn't Lost ---")
+    seen = dispatcher.generation
+    dispatcher.notify()
+    assert dispatcher.generation == seen + 1
+    start = time.time()
+    assert dispatcher.wait_for_work(seen, timeout=30) and time.time() - start < 1
+
+    print("\n--- 5. No Signal, No Wake-Up ---")
+    seen = dispatcher.generation
+    dispatcher.notify(0)
+    assert dispatcher.generation == seen, "notify(0) queued nothing"
+    assert dispatcher.wait_for_work(seen, timeout=0.2) is False, "Timeout means: fall back to one poll"
+
+    print("\nDISPATCHER WAKE-UP TEST COMPLETE")
+
+def test_input_validation():
+    print("--- 1. Register A Module With A Typed Input ---")
+    task_orch = TaskOrchestrator()
+    task_orch.registry_repo.collection.delete_one({"_id": "test-module-typed"})
+    task_orch.registry_repo.create_module({
+        "_id": "test-module-typed",
+        "status": "READY",
+        "version_hash": "typed-v1",
+        "config": {
+            "inputs": [
+                {"key": "image", "contract_type": "ASSET", "constraints": {"media_types": ["image/png"]}},
+                {"key": "msg", "contract_type": "VALUE", "type": "string"}
+            ],
+            "outputs": [{"key": "response", "contract_type": "VALUE", "type": "string"}]
+        }
+    })
+    task_orch.contracts.invalidate("test-module-typed")
+
+    manager = task_orch.asset_manager
+    image_id = manager.create_value_asset(label="Image", value="png bytes", media_type="image/png")
+    msg_id = manager.create_value_asset(label="Msg", value="Hello", media_type="text/plain")
+    failed_id = manager.create_pending_asset("upstream-task-011", "Broken", "image/png")
+    manager.repo.update_asset(failed_id, {"status": "FAILED", "error": "Worker crashed"})
+    AssetEventBus().flush()
+
+    queries = []
+    find = task_orch.asset_repo.collection.find
+    task_orch.asset_repo.collection.find = lambda query, *args, **kw: queries.append((query, args)) or find(query, *args, **kw)
+
+    def submit(image, msg=msg_id):
+        queries.clear()
+        try:
+            return task_orch.validate_and_create_task("test-module-typed", {"image": image, "msg": msg})
+        except ValueError as e:
+            return str(e)
+
+    try:
+        print("\n--- 2. All Inputs Are Checked With One Projected $in Query ---")
+        res = submit(image_id)
+        print(f"Queries: {queries}")
+        assert res["status"] == "QUEUED"
+        assert len(queries) == 1, "One query for every input"
+        query, args = queries[0]
+        assert set(query["_id"]["$in"]) == {image_id, msg_id}
+        assert set(args[0]) - {"_id"} == set(TaskOrchestrator.INPUT_CHECK_FIELDS), "Only the fields validation needs"
+
+        print("\n--- 3. Rejections Are Unchanged ---")
+        checks = [
+            ("missing-asset", "Input asset missing-asset not found."),
+            (failed_id, f"Input asset {failed_id} is FAILED."),
+            (msg_id, "Asset Msg type text/plain not allowed. Expected: ['image/png']")
+        ]
+        for image, expected in checks:
+            error = submit(image)
+            print(f"Rejected: {error}")
+            assert error == expected
+            assert len(queries) == 1, "A rejected submission costs the same single query"
+    finally:
+        del task_orch.asset_repo.collection.find
+        task_orch.registry_repo.collection.delete_one({"_id": "test-module-typed"})
+        task_orch.contracts.invalidate("test-module-typed")
+
+    print("\nINPUT VALIDATION TEST COMPLETE")
+
 if __name__ == "__main__":
     test_orchestrator_flow()
+    test_pipeline_submission()
+    test_concurrent_unblocking()
+    test_failure_cascade()
+    test_asset_event_bus()
+    test_blocked_reconciliation()
+    test_unblock_race()
+    test_dispatcher_wakeup()
+    test_input_validation()
@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.services.task_runner.registry.orchestrator import RegistryOrchestrator
 from src.shared.database.mongo import ModuleRegistryRepository
+from src.services.task_runner.registry.contract_cache import ModuleContractCache
 
 def main():
     # Ensure raw paths for windows compatibility if needed, but python usually handles typical paths fine.
@@ -46,5 +47,31 @@ def main():
         print("FAILED: Module is not available.")
         sys.exit(1)
 
+def test_contract_cache():
+    print("--- 1. Register Modules ---")
+    orchestrator = RegistryOrchestrator(os.path.join(os.getcwd(), "modules"))
+    orchestrator.discover_and_register()
+
+    cache = ModuleContractCache()
+    cache.invalidate()
+
+    print("\n--- 2. Repeated Lookups Hit The Cache ---")
+    first = cache.get("test-module-v1")
+    assert first and first.status == "AVAILABLE"
+    assert "response" in first.output_defs
+    assert cache.get("test-module-v1") is first, "Same version should not be re-read or re-compiled"
+
+    print("\n--- 3. Registry Changes Invalidate ---")
+    orchestrator._update_module("test-module-v1", {"status": "ERROR"})
+    assert cache.get("test-module-v1").status == "ERROR"
+    orchestrator._update_module("test-module-v1", {"status": "AVAILABLE", "version_hash": "changed"})
+    changed = cache.get("test-module-v1")
+    assert changed is not first and changed.version_hash == "changed", "New version should be re-compiled"
+
+    # Restore the real hash so the next scan doesn't reinstall
+    orchestrator._update_module("test-module-v1", {"version_hash": first.version_hash})
+    print("\nCONTRACT CACHE TEST COMPLETE")
+
 if __name__ == "__main__":
     main()
+    test_contract_cache()
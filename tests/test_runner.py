@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Add root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_runner.registry import runner as runner_module
+from src.services.task_runner.registry.runner import ModuleRunner, LogBuffer, result_path_for
+from src.services.task_runner.registry.warm_pool import WarmWorker
+
+# Behaviour is picked by manifest["case"]; --serve answers one manifest per stdin line
+RESULT_MODULE = """
+import sys, json, subprocess
+
+def handle(manifest_path):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    case = manifest["case"]
+    print(json.dumps({"debug": "not the result"}))
+    if case == "ok":
+        with open(manifest["result_path"], "w") as f:
+            json.dump({"response": "done"}, f)
+    elif case == "truncated":
+        with open(manifest["result_path"], "w") as f:
+            f.write('{"response": "do')
+    elif case == "spawn":
+        # Leaves a child behind in its process group
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(manifest["result_path"], "w") as f:
+            json.dump({"child": child.pid}, f)
+    return 0
+
+if sys.argv[1] == "--serve":
+    for line in sys.stdin:
+        code = handle(json.loads(line)["manifest"])
+        print(f"__TASK_END__ {code}", flush=True)
+else:
+    sys.exit(handle(sys.argv[2]))
+"""
+
+def _write(content, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    return path
+
+def _manifest(case):
+    path = _write("", ".json")
+    with open(path, 'w') as f:
+        json.dump({"case": case, "result_path": result_path_for(path)}, f)
+    return path
+
+def test_result_channel():
+    print("--- 1. Write Module ---")
+    script_path = _write(RESULT_MODULE, ".py")
+    runner = ModuleRunner()
+    manifests = []
+
+    def run(case, **kwargs):
+        manifest_path = _manifest(case)
+        manifests.append(manifest_path)
+        return runner.run_module(sys.executable, script_path, manifest_path, timeout=30, **kwargs)
+
+    try:
+        print("\n--- 2. Result File Wins Over Printed JSON ---")
+        result = run("ok")
+        assert result["success"] and result["result"] == {"response": "done"}
+
+        print("\n--- 3. No Result File Fails The Task ---")
+        result = run("missing")
+        print(f"Error: {result['error']}")
+        assert result["success"] is False and result["result"] is None
+        assert "result file" in result["error"], "A debug print must never be taken as the result"
+
+        print("\n--- 4. Legacy Modules Still Print Their Result ---")
+        result = run("missing", legacy_stdout=True)
+        assert result["success"] and result["result"] == {"debug": "not the result"}
+
+        print("\n--- 5. Malformed Result File Fails The Task ---")
+        result = run("truncated")
+        print(f"Error: {result['error']}")
+        assert result["success"] is False and "Malformed result file" in result["error"]
+        assert not os.path.exists(result_path_for(manifests[-1]))
+
+        print("\n--- 6. ...Without Killing A Warm Worker ---")
+        worker = WarmWorker(("result-test", "v1"), sys.executable, script_path)
+        try:
+            manifests.append(_manifest("truncated"))
+            result = worker.run(manifests[-1], timeout=30)
+            assert result["success"] is False and "Malformed result file" in result["error"]
+            assert worker.is_alive(), "A bad result must fail one task, not the persistent worker"
+
+            manifests.append(_manifest("ok"))
+            result = worker.run(manifests[-1], timeout=30)
+            assert result["success"] and result["result"] == {"response": "done"}
+        finally:
+            worker.stop()
+    finally:
+        for path in [script_path] + manifests:
+            os.remove(path)
+
+    print("\nRESULT CHANNEL TEST COMPLETE")
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ")[1][0] != "Z"
+    except FileNotFoundError:
+        return False
+
+def test_group_cleanup():
+    print("--- 1. Write Module ---")
+    script_path = _write(RESULT_MODULE, ".py")
+    manifest_path = _manifest("spawn")
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("settle failed")
+
+    print("\n--- 2. A Failure On Our Side Still Kills The Group ---")
+    settle_exit = runner_module.settle_exit
+    runner_module.settle_exit = broken
+    try:
+        result = ModuleRunner().run_module(sys.executable, script_path, manifest_path, timeout=30)
+        print(f"Error: {result['error']}")
+        assert result["success"] is False and "settle failed" in result["error"]
+        with open(result_path_for(manifest_path)) as f:
+            child = json.load(f)["child"]
+        deadline = time.monotonic() + 5
+        while _alive(child) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _alive(child), "The module's children must not outlive it"
+    finally:
+        runner_module.settle_exit = settle_exit
+        for path in (script_path, manifest_path, result_path_for(manifest_path)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print("\nGROUP CLEANUP TEST COMPLETE")
+
+def test_log_buffer():
+    print("--- 1. Tail Is Bounded ---")
+    chunks = []
+    logs = LogBuffer(sink=chunks.append, tail_lines=10, chunk_lines=4, flush_interval=3600)
+    for i in range(25):
+        logs.append(f"line {i}")
+    assert logs.tail == [f"line {i}" for i in range(15, 25)], "Only the newest lines stay in memory"
+
+    print("\n--- 2. Lines Reach The Sink In Chunks ---")
+    assert [len(c) for c in chunks] == [4] * 6, "A chunk is flushed every chunk_lines lines"
+    logs.flush()
+    assert [len(c) for c in chunks] == [4] * 6 + [1]
+    assert [line for c in chunks for line in c] == [f"line {i}" for i in range(25)], "Nothing is lost on overflow"
+    logs.flush()
+    assert len(chunks) == 7, "An empty flush writes nothing"
+
+    print("\n--- 3. Quiet Modules Flush On Time ---")
+    chunks.clear()
+    logs = LogBuffer(sink=chunks.append, chunk_lines=100, flush_interval=0.05)
+    logs.append("first")
+    time.sleep(0.1)
+    logs.append("second")
+    assert chunks == [["first", "second"]]
+
+    print("\n--- 4. A Failing Sink Doesn't Fail The Task ---")
+    def broken(lines):
+        raise IOError("log store down")
+    logs = LogBuffer(sink=broken, tail_lines=5, chunk_lines=1)
+    logs.append("kept")
+    assert logs.tail[0] == "kept" and "log store down" in logs.tail[-1]
+
+    print("\n--- 5. No Sink: Tail Only ---")
+    logs = LogBuffer(tail_lines=3)
+    for i in range(5):
+        logs.append(str(i))
+    logs.flush()
+    assert logs.tail == ["2", "3", "4"]
+
+    print("\nLOG BUFFER TEST COMPLETE")
+
+if __name__ == "__main__":
+    test_result_channel()
+    test_group_cleanup()
+    test_log_buffer()
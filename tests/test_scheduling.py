@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Add root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.scheduler import ResourceScheduler
+from src.services.task_runner.fair_share import FairShareSelector
+from src.services.task_runner.task_orchestrator import TaskOrchestrator
+from src.services.task_runner.registry.orchestrator import RegistryOrchestrator
+
+def _queue(repo, **fields):
+    task = {
+        "module_id": "test-module-v1",
+        "status": "QUEUED",
+        "input_map": {},
+        "output_map": {},
+        "config": {},
+        "priority": 0,
+        "tenant": "default"
+    }
+    task.update(fields)
+    return repo.create_task(task)
+
+def test_resource_admission():
+    print("--- 1. Reset Tasks ---")
+    repo = TaskRepository()
+    repo.collection.delete_many({})
+    scheduler = ResourceScheduler(total_memory_mb=4000, total_cpu=8)
+
+    def claim(limits):
+        return repo.claim_next_task("worker-res", resource_limits=limits)
+
+    print("\n--- 2. Queue Heavy, Heavy, Light ---")
+    heavy_1 = _queue(repo, resources={"memory_mb": 3000, "cpu": 1})
+    heavy_2 = _queue(repo, resources={"memory_mb": 3000, "cpu": 1})
+    light = _queue(repo, resources={"memory_mb": 512, "cpu": 1})
+
+    print("\n--- 3. Admit ---")
+    first = scheduler.admit(claim)
+    second = scheduler.admit(claim)
+    print(f"Admitted: {first['_id']}, {second['_id']}")
+    assert first["_id"] == heavy_1
+    assert second["_id"] == light, "Light task should skip ahead of the heavy one that doesn't fit"
+    assert scheduler.admit(claim) is None, "Second heavy task must wait for capacity"
+
+    scheduler.release(heavy_1)
+    third = scheduler.admit(claim)
+    assert third["_id"] == heavy_2
+
+    print("\nRESOURCE ADMISSION TEST COMPLETE")
+
+def test_priority_and_fair_share():
+    print("--- 1. Reset Tasks ---")
+    repo = TaskRepository()
+    repo.collection.delete_many({})
+    selector = FairShareSelector(repo)
+
+    print("\n--- 2. Queue Bulk Tenant, Interactive Tenant, Urgent Task ---")
+    for _ in range(50):
+        _queue(repo, tenant="bulk")
+    for _ in range(5):
+        _queue(repo, tenant="interactive")
+    urgent = _queue(repo, tenant="bulk", priority=10)
+
+    print("\n--- 3. Claim ---")
+    claimed = []
+    for _ in range(10):
+        task = selector.claim(lambda match: repo.claim_next_task("worker-fair", match=match))
+        claimed.append(task)
+    tenants = [t["tenant"] for t in claimed]
+    print(f"Claim order: {tenants}")
+
+    assert claimed[0]["_id"] == urgent, "Highest priority task must run first"
+    assert tenants[1:].count("interactive") == 5, "Interactive tenant should not wait behind the bulk submission"
+
+    print("\nSCHEDULING TEST COMPLETE")
+
+def test_critical_path_ranking():
+    print("--- 1. Reset Tasks & Register Modules ---")
+    RegistryOrchestrator(modules_root="modules").discover_and_register()
+    orch = TaskOrchestrator()
+    orch.task_repo.collection.delete_many({})
+    source = orch.asset_manager.create_value_asset("Source", "x", "text/plain")
+
+    print("\n--- 2. Queue Leaves, Then Grow A Chain Step By Step ---")
+    for _ in range(5):
+        orch.validate_and_create_task("test-module-v1", {"msg": source})
+    head = orch.validate_and_create_task("test-module-v1", {"msg": source})
+    middle = orch.validate_and_create_task("test-module-v1", {"msg": head["outputs"]["response"]})
+    orch.validate_and_create_task("test-module-v1", {"msg": middle["outputs"]["response"]})
+
+    head_task = orch.task_repo.get_task(head["task_id"])
+    middle_task = orch.task_repo.get_task(middle["task_id"])
+    print(f"Head rank: depth={head_task['downstream_depth']}, descendants={head_task['descendant_count']}")
+    assert (head_task["downstream_depth"], head_task["descendant_count"]) == (2, 2)
+    assert (middle_task["downstream_depth"], middle_task["descendant_count"]) == (1, 1)
+
+    print("\n--- 3. Claim ---")
+    first = orch.task_repo.claim_next_task("worker-cp")
+    assert first["_id"] == head["task_id"], "Chain head should run before older leaf tasks"
+
+    print("\nCRITICAL PATH TEST COMPLETE")
+
+if __name__ == "__main__":
+    test_resource_admission()
+    test_priority_and_fair_share()
+    test_critical_path_ranking()
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import tempfile
+
+# Add root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_runner.registry.runner import result_path_for
+from src.services.task_runner.registry.warm_pool import WarmWorkerPool, TASK_END_MARKER
+from src.services.task_runner.scheduler import ResourceScheduler
+
+MODULE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules", "test-module-persistent")
+
+def _module(version_hash):
+    with open(os.path.join(MODULE_DIR, "module.json"), 'r') as f:
+        config = json.load(f)
+    return {"_id": "test-module-persistent", "version_hash": version_hash, "config": config}
+
+def _runner(pool, manifests):
+    script_path = os.path.join(MODULE_DIR, "main.py")
+
+    def run(task_id, msg, version_hash="v1"):
+        fd, manifest_path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                "mode": "run",
+                "task_id": task_id,
+                "values": {"msg": msg},
+                "result_path": result_path_for(manifest_path)
+            }, f)
+        manifests.append(manifest_path)
+        return pool.run_module(_module(version_hash), sys.executable, script_path, manifest_path, timeout=30)
+    return run
+
+def test_warm_pool():
+    print("--- 1. Setup ---")
+    pool = WarmWorkerPool()
+    manifests = []
+    run = _runner(pool, manifests)
+
+    try:
+        print("\n--- 2. The Warm Process Is Reused ---")
+        first = run("task-1", "hello")
+        second = run("task-2", "again")
+        print(f"Served by pids {first['result']['pid']} and {second['result']['pid']}")
+        assert first["success"] and second["success"]
+        assert first["result"]["response"] == "Echo: hello"
+        assert first["result"]["pid"] == second["result"]["pid"], "Second task should reuse the warm process"
+
+        print("\n--- 3. Task End Framing ---")
+        assert first["logs"] == ["Processing task task-1"], "Logs stop at the task's end marker"
+        assert second["logs"] == ["Processing task task-2"], "No output bleeds into the next task"
+        assert not any(TASK_END_MARKER in line for line in first["logs"] + second["logs"])
+
+        print("\n--- 4. A Crashed Worker Is Replaced ---")
+        crashed = run("task-3", "crash")
+        print(f"Crash: {crashed['error']}")
+        assert crashed["success"] is False and "exited with code 3" in crashed["error"]
+        assert crashed["logs"][0] == "Processing task task-3"
+        after = run("task-4", "still here")
+        assert after["success"], "The next task gets a fresh warm process"
+        assert after["result"]["pid"] != first["result"]["pid"]
+
+        print("\n--- 5. A New Module Version Replaces Old Processes ---")
+        upgraded = run("task-5", "v2", version_hash="v2")
+        assert upgraded["success"] and upgraded["result"]["pid"] != after["result"]["pid"]
+        assert ("test-module-persistent", "v1") not in pool._idle
+    finally:
+        pool.shutdown()
+        for path in manifests:
+            os.remove(path)
+
+    print("\nWARM POOL TEST COMPLETE")
+
+def test_warm_memory_budget():
+    print("--- 1. Setup ---")
+    scheduler = ResourceScheduler(total_memory_mb=4096, total_cpu=4)
+    pool = WarmWorkerPool(scheduler=scheduler)
+    manifests = []
+    run = _runner(pool, manifests)
+
+    try:
+        print("\n--- 2. An Idle Warm Process Holds Memory ---")
+        first = run("task-1", "hello")
+        held = 4096 - scheduler.available()["memory_mb"]
+        print(f"Held by the idle process: {held:.1f} MB")
+        assert first["success"] and held > 0, "Idle warm memory is not free capacity"
+        run("task-2", "again")
+        assert 4096 - scheduler.available()["memory_mb"] > 0 and len(scheduler._held) == 1, "Held once per process"
+
+        print("\n--- 3. A Task That Only Fits Without It Reclaims It ---")
+        def claim(limits):
+            # One task needing everything the small one leaves
+            if limits is None or limits["memory_mb"] >= 4095:
+                return {"_id": "big-task", "resources": {"memory_mb": 4095, "cpu": 1}}
+            return None
+        scheduler.admit(lambda limits: {"_id": "small-task", "resources": {"memory_mb": 1, "cpu": 1}})
+        task = scheduler.admit(claim, reclaim=lambda mb: pool.evict_idle(free_memory_mb=mb))
+        assert task and task["_id"] == "big-task"
+        assert not scheduler._held and not any(pool._idle.values()), "The idle process was evicted to make room"
+        assert scheduler.overcommitted_mb() == 0 and scheduler.available()["memory_mb"] == 0
+        scheduler.release("big-task")
+        scheduler.release("small-task")
+
+        print("\n--- 4. Overcommit Evicts Least Recently Used First ---")
+        run("task-3", "a")
+        run("task-4", "b", version_hash="v2")
+        assert len(scheduler._held) == 1, "The old version's process was dropped with its hold"
+        assert pool.evict_idle(free_memory_mb=0.001) == 1
+        assert not scheduler._held
+    finally:
+        pool.shutdown()
+        for path in manifests:
+            os.remove(path)
+    assert not scheduler._held
+
+    print("\nWARM MEMORY BUDGET TEST COMPLETE")
+
+if __name__ == "__main__":
+    test_warm_pool()
+    test_warm_memory_budget()
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import threading
+
+# Add root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.task_runner.task_repository import TaskRepository
+from src.services.task_runner.reaper import LeaseReaper
+from src.services.task_runner.execution_engine import ExecutionEngine
+
+def test_atomic_claiming():
+    print("--- 1. Reset Tasks ---")
+    repo = TaskRepository()
+    repo.collection.delete_many({})
+
+    print("\n--- 2. Queue Tasks ---")
+    task_ids = []
+    for i in range(50):
+        task_ids.append(repo.create_task({
+            "module_id": "test-module-v1",
+            "status": "QUEUED",
+            "input_map": {},
+            "output_map": {},
+            "config": {}
+        }))
+    print(f"Queued {len(task_ids)} tasks")
+
+    print("\n--- 3. Claim Concurrently ---")
+    claimed = []
+    lock = threading.Lock()
+
+    def claim_all(worker_id):
+        while True:
+            task = repo.claim_next_task(worker_id)
+            if not task:
+                return
+            with lock:
+                claimed.append(task)
+
+    workers = [threading.Thread(target=claim_all, args=(f"worker-{i}",)) for i in range(8)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    claimed_ids = [t["_id"] for t in claimed]
+    print(f"Claimed {len(claimed_ids)} tasks ({len(set(claimed_ids))} unique)")
+
+    assert len(claimed_ids) == len(task_ids), "Every task should be claimed exactly once"
+    assert set(claimed_ids) == set(task_ids), "Claimed set should match queued set"
+    assert all(t["status"] == "RUNNING" and t["worker_id"] for t in claimed)
+    assert repo.claim_next_task("worker-late") is None
+
+    print("\nWORKER POOL TEST COMPLETE")
+
+def test_lease_recovery():
+    print("--- 1. Reset Tasks ---")
+    repo = TaskRepository()
+    repo.collection.delete_many({})
+    reaper = LeaseReaper(repo)
+    task_id = repo.create_task({
+        "module_id": "test-module-v1",
+        "status": "QUEUED",
+        "input_map": {},
+        "output_map": {},
+        "config": {"max_attempts": 2}
+    })
+
+    print("\n--- 2. The Owner Renews Its Lease ---")
+    task = repo.claim_next_task("worker-a", lease_seconds=0.2)
+    assert task["attempts"] == 1
+    assert repo.renew_leases({task_id: "worker-a"}, lease_seconds=0.2) == [task_id]
+    assert repo.find_expired_leases() == [], "A renewed lease is not expired"
+    assert repo.release_expired_task(task_id, {"status": "QUEUED"}) is None, "Live leases can't be released"
+
+    print("\n--- 3. An Expired Lease Is Requeued ---")
+    time.sleep(0.3)
+    assert [t["_id"] for t in repo.find_expired_leases()] == [task_id]
+    assert reaper.reap_once() == {"requeued": 1, "failed": 0}
+    task = repo.get_task(task_id)
+    assert task["status"] == "QUEUED" and "worker_id" not in task and "Lease expired" in task["requeue_reason"]
+
+    print("\n--- 4. The Stalled Owner Can't Renew A Lease It Lost ---")
+    task = repo.claim_next_task("worker-b", lease_seconds=0.2)
+    assert task["attempts"] == 2
+    assert repo.renew_leases({task_id: "worker-a"}, lease_seconds=3600) == []
+    assert repo.get_task(task_id)["lease_expires_at"] == task["lease_expires_at"], \
+        "The new owner's expiry must not be overwritten"
+    assert repo.renew_leases({task_id: "worker-b"}, lease_seconds=0.2) == [task_id]
+
+    print("\n--- 5. Out Of Attempts: The Task Fails ---")
+    time.sleep(0.3)
+    assert reaper.reap_once() == {"requeued": 0, "failed": 1}
+    task = repo.get_task(task_id)
+    print(f"Final: {task['status']} ({task['error_log']})")
+    assert task["status"] == "FAILED" and "attempt 2/2" in task["error_log"]
+    assert repo.find_expired_leases() == []
+
+    print("\n--- 6. The Engine Drops Tasks Whose Lease It Lost ---")
+    engine = ExecutionEngine(worker_id="engine-lost")
+    lost_id = repo.create_task({
+        "module_id": "test-module-v1",
+        "status": "RUNNING",
+        "worker_id": "someone-else",
+        "input_map": {},
+        "output_map": {},
+        "config": {}
+    })
+    engine._track({"_id": lost_id, "worker_id": engine.worker_id})
+    run = engine._register_run({"module": {"_id": "test-module-v1"}, "task_ids": [lost_id]})
+    engine._renew_leases({lost_id: engine.worker_id})
+    assert lost_id not in engine._running
+    assert run["cancel"].is_set(), "A run nobody else may finish for us is killed"
+    engine._unregister_run(run)
+    engine._stop_maintenance()
+
+    print("\nLEASE RECOVERY TEST COMPLETE")
+
+if __name__ == "__main__":
+    test_atomic_claiming()
+    test_lease_recovery()